@@ -0,0 +1,284 @@
+"""
+Benchmarks of figure export throughput and payload size
+
+Usage:  python benchmarks/bench_export.py [options] [CASE ...]
+
+Each case builds a figure from a family of parametrized figures (long
+lines, scatter plots with per-point styles, many subplots, contours and
+images), and measures for each of fig_to_dict, fig_to_html and save_json:
+
+- time   : the median wall-clock time (in s) over --repeat runs
+- memory : the peak memory (in MB) allocated by python during one run,
+           measured separately with tracemalloc (python 3 only)
+- bytes  : the size of the output (the JSON of the dict for fig_to_dict)
+
+Cases are named "<family>-<size>", e.g. "lines-1e5"; the positional
+arguments select cases by regular expression.  Results can be stored with
+--save-baseline, and compared with a stored baseline with --compare: the
+script then exits with status 1 if any measure grew by more than the
+--threshold factor.  Timings depend on the machine, so baselines should
+only be compared on the machine where they were saved.
+
+Examples
+--------
+    python benchmarks/bench_export.py --quick
+    python benchmarks/bench_export.py lines --save-baseline base.json
+    python benchmarks/bench_export.py lines --compare base.json
+    python benchmarks/bench_export.py -o data_format=base64 scatter
+"""
+from __future__ import print_function
+
+import os
+import re
+import sys
+import gc
+import json
+import time
+import platform
+import argparse
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                ".."))
+import mpld3_rewrite as mpld3
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+MEASURES = ["time", "memory", "bytes"]
+FUNCTIONS = ["fig_to_dict", "fig_to_html", "save_json"]
+
+
+def lines(n):
+    """A single line of n points"""
+    x = np.linspace(0, 100, n)
+    fig, ax = plt.subplots()
+    ax.plot(x, np.sin(x) + 0.1 * np.random.randn(n))
+    return fig
+
+
+def scatter(n):
+    """A scatter plot of n points, with per-point sizes and colors"""
+    fig, ax = plt.subplots()
+    ax.scatter(np.random.rand(n), np.random.rand(n),
+               s=100 * np.random.rand(n), c=np.random.rand(n),
+               alpha=0.5)
+    return fig
+
+
+def subplots(n):
+    """An n x n grid of axes, each with a short line and markers"""
+    fig, axes = plt.subplots(n, n, squeeze=False)
+    x = np.linspace(0, 10, 100)
+    for i, ax in enumerate(axes.ravel()):
+        ax.plot(x, np.sin(x + i), '-o', markersize=2)
+    return fig
+
+
+def contour(n):
+    """Filled contours and contour lines of an n x n grid"""
+    x, y = np.meshgrid(np.linspace(-3, 3, n), np.linspace(-3, 3, n))
+    z = np.sin(x) * np.cos(y) + 0.1 * x
+    fig, ax = plt.subplots()
+    ax.contourf(x, y, z, 10)
+    ax.contour(x, y, z, 10, colors='k')
+    return fig
+
+
+def imshow(n):
+    """An n x n image"""
+    fig, ax = plt.subplots()
+    ax.imshow(np.random.rand(n, n), interpolation='nearest')
+    return fig
+
+
+# the figure families and their sizes
+CASES = [(lines, [1000, 10000, 100000, 1000000, 10000000]),
+         (scatter, [1000, 10000, 100000]),
+         (subplots, [2, 5, 10]),
+         (contour, [50, 200, 500]),
+         (imshow, [100, 500, 2000])]
+
+
+def case_name(family, size):
+    exponent = int(round(np.log10(size)))
+    if size >= 1000 and size == 10 ** exponent:
+        return "{0}-1e{1:d}".format(family.__name__, exponent)
+    return "{0}-{1}".format(family.__name__, size)
+
+
+class CountingWriter(object):
+    """A file-like object which counts the characters written to it"""
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+
+def run(func, fig, options):
+    """Run an export function, and return the size of its output"""
+    if func == "fig_to_dict":
+        return len(json.dumps(mpld3.fig_to_dict(fig, **options)))
+    elif func == "fig_to_html":
+        return len(mpld3.fig_to_html(fig, **options))
+    else:
+        out = CountingWriter()
+        mpld3.save_json(fig, out, **options)
+        return out.size
+
+
+def measure(func, fig, options, repeat):
+    """Return the {"time", "memory", "bytes"} of an export function"""
+    times = []
+    for i in range(repeat):
+        gc.collect()
+        start = time.time()
+        nbytes = run(func, fig, options)
+        times.append(time.time() - start)
+
+    memory = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run(func, fig, options)
+            memory = tracemalloc.get_traced_memory()[1] / 1E6
+        finally:
+            tracemalloc.stop()
+
+    return {"time": float(np.median(times)), "memory": memory,
+            "bytes": nbytes}
+
+
+def parse_options(items):
+    """Parse a list of "key=value" export options; values are JSON or text"""
+    options = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            options[key] = json.loads(value)
+        except ValueError:
+            options[key] = value
+    return options
+
+
+def environment():
+    return {"python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "platform": platform.platform()}
+
+
+def compare(results, baseline, threshold):
+    """Print the ratios of results to the baseline; return the regressions"""
+    regressions = []
+    print("\nComparison with the baseline (ratio new / old):")
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        for func in FUNCTIONS:
+            new = results[name].get(func, {})
+            old = baseline[name].get(func, {})
+            ratios = []
+            for key in MEASURES:
+                if not new.get(key) or not old.get(key):
+                    ratios.append("     -")
+                    continue
+                ratio = new[key] / float(old[key])
+                flag = " "
+                if ratio > threshold:
+                    flag = "!"
+                    regressions.append((name, func, key, ratio))
+                ratios.append("{0:5.2f}{1}".format(ratio, flag))
+            print("{0:<16s} {1:<12s} {2}".format(name, func, " ".join(ratios)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the export of figures by mpld3")
+    parser.add_argument("cases", nargs="*",
+                        help="regular expressions selecting the cases to run")
+    parser.add_argument("--list", action="store_true",
+                        help="list the cases and exit")
+    parser.add_argument("--quick", action="store_true",
+                        help="run only the smallest size of each family")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of timed runs of each function")
+    parser.add_argument("-o", "--option", action="append", default=[],
+                        metavar="KEY=VALUE",
+                        help="export option, e.g. data_format=base64")
+    parser.add_argument("--save-baseline", metavar="FILE",
+                        help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="ratio to the baseline counted as a regression")
+    args = parser.parse_args(argv)
+
+    cases = []
+    for family, sizes in CASES:
+        for size in (sizes[:1] if args.quick else sizes):
+            name = case_name(family, size)
+            if (not args.cases
+                    or any(re.search(p, name) for p in args.cases)):
+                cases.append((name, family, size))
+    if args.list:
+        for name, family, size in cases:
+            print("{0:<16s} {1}".format(name, family.__doc__))
+        return 0
+
+    options = parse_options(args.option)
+    if tracemalloc is None:
+        print("tracemalloc is not available: memory is not measured")
+
+    results = {}
+    print("{0:<16s} {1:<12s} {2:>9s} {3:>9s} {4:>12s}"
+          .format("case", "function", "time (s)", "mem (MB)", "bytes"))
+    for name, family, size in cases:
+        np.random.seed(0)
+        fig = family(size)
+        results[name] = {}
+        for func in FUNCTIONS:
+            result = measure(func, fig, options, args.repeat)
+            results[name][func] = result
+            memory = ("{0:9.1f}".format(result["memory"])
+                      if result["memory"] is not None else "        -")
+            print("{0:<16s} {1:<12s} {2:9.4f} {3} {4:12d}"
+                  .format(name, func, result["time"], memory,
+                          result["bytes"]))
+            sys.stdout.flush()
+        plt.close(fig)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({"environment": environment(), "options": options,
+                       "results": results}, f, indent=1, sort_keys=True)
+        print("\nbaseline saved to {0}".format(args.save_baseline))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("options", {}) != options:
+            print("warning: the baseline used the export options "
+                  "{0}".format(baseline.get("options")))
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print("\n{0} regressions above {1}x:".format(len(regressions),
+                                                          args.threshold))
+            for name, func, key, ratio in regressions:
+                print("  {0} {1} {2}: {3:.2f}x".format(name, func, key, ratio))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,14 +6,26 @@ Functions: General Use
 ----------------------
 - :func:`fig_to_html` : convert a figure to an html string
 
+- :func:`figs_to_html` : convert a list of figures to an html string
+
+- :func:`export_many` : convert many figures in parallel worker processes
+
 - :func:`fig_to_dict` : convert a figure to a dictionary representation
 
-- :func:`save_html` : save a figure to an html file
+- :func:`save_html` : save a figure or list of figures to an html file
 
 - :func:`save_json` : save a JSON representation of a figure to file
 
 - :func:`show` : launch a web server to view an d3/html figure representation
 
+- :func:`update` : send the changes of a figure shown with show() to the
+                   browser
+
+- :func:`append_data` : append rows to a dataset of a figure shown with show()
+
+- :func:`export_stats` : collect timings and sizes of the figure exports
+                         within a block
+
 
 Functions: IPython Notebook
 ---------------------------
@@ -1,18 +1,28 @@
+import math
 import random
 import json
+import base64
 import jinja2
+import hashlib
+import multiprocessing
+import numpy as np
+import threading
+import webbrowser
+from collections import deque
 
-from ._server import serve_and_open
-from .utils import deprecated
+from ._server import get_figure_server
+from ._stats import ExportStats, export_stats, current_stats, timed
+from .utils import deprecated, id_scope, get_id, ELEMENT_LISTS
 from .mplexporter import Exporter
-from .mpld3renderer import MPLD3Renderer
+from .mpld3renderer import MPLD3Renderer, decode_data
 from . import urls
 
-__all__ = ["fig_to_html", "fig_to_dict", "fig_to_d3",
+__all__ = ["fig_to_html", "fig_to_dict", "fig_to_d3", "figs_to_html",
+           "export_many",
            "display_d3", "display",
-           "show_d3", "show",
+           "show_d3", "show", "update", "append_data",
            "enable_notebook", "disable_notebook",
-           "save_html", "save_json"]
+           "save_html", "save_json", "export_stats", "ExportStats"]
 
 
 # Simple HTML template. This works in standalone web pages for single figures,
@@ -104,13 +114,159 @@ if(typeof(mpld3) !== "undefined"){
 </script>
 """)
 
+# Server HTML template, used by show().  The figure JSON is served
+# separately by the local server, and fetched once the libraries are loaded.
+# The page then listens to the updates sent by update().
+SERVER_HTML = jinja2.Template("""
+<script type="text/javascript" src="{{ d3_url }}"></script>
+<script type="text/javascript" src="{{ mpld3_url }}"></script>
+
+<style>
+{{ extra_css }}
+</style>
+
+<div id="fig{{ figid }}"></div>
+<script type="text/javascript">
+  {{ extra_js }}
+  d3.json("{{ json_url }}", function(error, spec){
+    if(error){
+      console.warn("failed to load figure {{ json_url }}");
+      return;
+    }
+    var fig{{ figid }} = mpld3.draw_figure("fig{{ figid }}", spec);
+    mpld3.listen(fig{{ figid }}, "{{ events_url }}");
+  });
+</script>
+""")
+
 TEMPLATE_DICT = {"simple": SIMPLE_HTML,
                  "notebook": REQUIREJS_HTML,
                  "general": GENERAL_HTML}
 
 
+# Multiple-figure HTML template.  This works like GENERAL_HTML, but loads the
+# libraries once for a list of figures.  Datasets used by more than one
+# figure are registered once with mpld3.register_data, and referenced from
+# the figure data as {"shared": key}.
+MULTI_HTML = jinja2.Template("""
+<style>
+{{ extra_css }}
+</style>
+{% for fig in figures %}
+<div id="fig{{ fig.figid }}"></div>
+{%- endfor %}
+<script>
+function mpld3_load_lib(url, callback){
+  var s = document.createElement('script');
+  s.src = url;
+  s.async = true;
+  s.onreadystatechange = s.onload = callback;
+  s.onerror = function(){console.warn("failed to load library " + url);};
+  document.getElementsByTagName("head")[0].appendChild(s);
+}
+
+function create_figs{{ pageid }}(){
+  {{ extra_js }}
+  mpld3.register_data({{ shared_json }});
+{%- for fig in figures %}
+  mpld3.draw_figure("fig{{ fig.figid }}", {{ fig.figure_json }});
+{%- endfor %}
+}
+
+if(typeof(mpld3) !== "undefined"){
+   // already loaded: just create the figures
+   create_figs{{ pageid }}();
+}else if(typeof define === "function" && define.amd){
+   // require.js is available: use it to load d3/mpld3
+   require.config({paths: {d3: "{{ d3_url[:-3] }}"}});
+   require(["d3"], function(d3){
+      window.d3 = d3;
+      mpld3_load_lib("{{ mpld3_url }}", create_figs{{ pageid }});
+    });
+}else{
+    // require.js not available: dynamically load d3 & mpld3
+    mpld3_load_lib("{{ d3_url }}", function(){
+        mpld3_load_lib("{{ mpld3_url }}", create_figs{{ pageid }});})
+}
+</script>
+""")
+
+
+def _run_renderer(fig, dedup=True, data_format="rows", data_dtype="float64",
+                  precision=None, max_points_per_line=None, lod_levels=0,
+                  defer_data=False, deterministic_ids=False,
+                  canvas_threshold=None, image_format=None, image_quality=None,
+                  image_compression=None, image_tile_size=None, **kwargs):
+    """Crawl a figure with MPLD3Renderer and return the renderer
+
+    Renderer options are given as keywords; any additional keywords are
+    passed to mplexporter.Exporter.  Within an export_stats() block, the
+    figure is recorded in its statistics.
+    """
+    renderer = MPLD3Renderer(dedup=dedup, data_format=data_format,
+                             data_dtype=data_dtype, precision=precision,
+                             max_points_per_line=max_points_per_line,
+                             lod_levels=lod_levels, defer_data=defer_data,
+                             deterministic_ids=deterministic_ids,
+                             canvas_threshold=canvas_threshold,
+                             image_format=image_format,
+                             image_quality=image_quality,
+                             image_compression=image_compression,
+                             image_tile_size=image_tile_size)
+    with timed("crawl"):
+        Exporter(renderer, **kwargs).run(fig)
+    stats = current_stats()
+    if stats is not None:
+        for finished in renderer.finished_figures:
+            stats.add_figure(renderer, finished[1])
+    return renderer
+
+
+def _render_figure(fig, **kwargs):
+    """Crawl a figure with MPLD3Renderer
+
+    Returns the (fig, figure_json, extra_css, extra_js) tuple built by the
+    renderer.  Keywords are passed to :func:`_run_renderer`.
+    """
+    return _run_renderer(fig, **kwargs).finished_figures[0]
+
+
+def _figure_id(fig, figure_json, deterministic_ids=False):
+    """Return the id of the html element holding the figure
+
+    With deterministic ids, this is derived from the (content-based) id of
+    the figure; otherwise it is unique for each call.
+    """
+    if deterministic_ids:
+        return figure_json['id']
+    return str(id(fig)) + str(int(random.random() * 1E10))
+
+
+@timed("json")
+def _write_figure_json(fileobj, renderer, figure_json):
+    """Write a figure rendered with defer_data=True as JSON
+
+    The output is identical to ``json.dumps`` of the encoded figure, but the
+    datasets are encoded and written a chunk at a time.
+    """
+    fileobj.write("{")
+    for i, (key, value) in enumerate(figure_json.items()):
+        fileobj.write("{0}{1}: ".format(", " if i else "", json.dumps(key)))
+        if key != "data":
+            fileobj.write(json.dumps(value))
+            continue
+        fileobj.write("{")
+        for j, (datalabel, columns) in enumerate(value.items()):
+            fileobj.write("{0}{1}: ".format(", " if j else "",
+                                            json.dumps(datalabel)))
+            for chunk in renderer.iter_data_json(columns):
+                fileobj.write(chunk)
+        fileobj.write("}")
+    fileobj.write("}")
+
+
 def fig_to_dict(fig, d3_url=None, mpld3_url=None,
-                template_type="general", **kwargs):
+                template_type="general", return_hash=False, **kwargs):
     """Output json representation of the figure
 
     Parameters
@@ -123,6 +279,65 @@ def fig_to_dict(fig, d3_url=None, mpld3_url=None,
     mpld3_url : string (optional)
         The URL of the mpld3 library.  If not specified, a standard web path
         will be used.
+    dedup : boolean (default = True)
+        If True, data columns and marker or collection paths which are shared
+        between figure elements are stored only once.  Set to False to skip
+        the search for duplicates when the data is known to be unique.
+    data_format : string (default = "rows")
+        The encoding of the figure datasets.  Options are
+        - "rows"    : nested lists of [x, y, ...] rows.
+        - "columns" : one list of numbers per column.
+        - "base64"  : one base64-encoded binary array per column.  This is
+                      the most compact, and is decoded by mpld3.js without
+                      parsing numbers from text.
+    data_dtype : string (default = "float64")
+        The float type of the binary arrays for data_format="base64": either
+        "float64" or "float32".
+    precision : integer (optional)
+        If specified, round all exported coordinates (data, vertices, offsets
+        and path transforms) to this number of significant digits.  Four to
+        six digits are plenty for a figure a few hundred pixels wide, and
+        give a much smaller output than full precision.
+    max_points_per_line : integer (optional)
+        If specified, lines with more points than this are decimated to the
+        minimum and maximum points within each horizontal pixel of the axes.
+        Decimated lines are marked with a "decimation" entry in their JSON.
+    lod_levels : integer (default = 0)
+        If nonzero, lines longer than max_points_per_line are not replaced by
+        their decimated version: instead the full data is exported along
+        with up to lod_levels decimated levels of increasing detail, and the
+        browser draws the level which matches the current zoom.
+    deterministic_ids : boolean (default = False)
+        If True, the ids of the figure and its elements are derived from the
+        figure content rather than from the Python objects, so that an
+        unchanged figure is always exported to the same output.  Note that
+        identical figures then share their ids, so should not be shown on
+        the same page.
+    canvas_threshold : integer (optional)
+        If specified, markers and collections with more than this number of
+        points are drawn on an html canvas instead of as individual svg
+        elements, which keeps zooming and panning fast for large scatter
+        plots.  Use 0 to draw all markers and collections on a canvas.
+    image_format : string (optional)
+        If specified, re-encode images in this format: "png", or the lossy
+        "jpeg" or "webp", which are much smaller for photographs and smooth
+        heatmaps.  Requires the Pillow package.
+    image_quality : integer (optional)
+        The quality (1-100) of jpeg and webp images.
+    image_compression : integer (optional)
+        The compression level (0-9) of png images.
+    image_tile_size : integer (optional)
+        If specified, export images at the full resolution of their data,
+        split into tiles of this many pixels at several levels of detail,
+        so that large images stay sharp when zoomed in.  The browser only
+        draws the tiles in view at the current zoom, but all the levels are
+        embedded in the figure: about 4/3 the size of the full-resolution
+        image, which may be much larger than the default screen-resolution
+        image.  Figures shown with :func:`show` are the exception: their
+        tiles are served separately, and only those in view are loaded.
+        Requires the Pillow package.
+    return_hash : boolean (default = False)
+        If True, also return a digest of the figure dictionary.
     **kwargs :
         Additional keyword arguments passed to mplexporter.Exporter
 
@@ -131,6 +346,10 @@ def fig_to_dict(fig, d3_url=None, mpld3_url=None,
     fig_dict : dict
         the Python dictionary representation of the figure, which is
         directly convertible to json using the standard json package.
+    fig_hash : string
+        the hex SHA1 digest of the json of fig_dict (with sorted keys).
+        Returned only if return_hash is True.  Combined with
+        deterministic_ids, this is suitable as a strong HTTP ETag.
 
     See Also
     --------
@@ -143,10 +362,12 @@ def fig_to_dict(fig, d3_url=None, mpld3_url=None,
     """
     d3_url = d3_url or urls.D3_URL
     mpld3_url = mpld3_url or urls.MPLD3_URL
-    figid = str(id(fig)) + str(int(random.random() * 1E10))
-    renderer = MPLD3Renderer()
-    Exporter(renderer, **kwargs).run(fig)
-    fig, figure_json, extra_css, extra_js = renderer.finished_figures[0]
+    fig, figure_json, extra_css, extra_js = _render_figure(fig, **kwargs)
+    if return_hash:
+        with timed("json"):
+            figure_json_str = json.dumps(figure_json, sort_keys=True)
+        fig_hash = hashlib.sha1(figure_json_str.encode('utf-8')).hexdigest()
+        return figure_json, fig_hash
     return figure_json
 
 
@@ -174,6 +395,63 @@ def fig_to_html(fig, d3_url=None, mpld3_url=None, safemode=False,
         - "general"  : more complicated, but works both in and out of the
                        notebook, whether or not require.js and jquery are
                        available
+    dedup : boolean (default = True)
+        If True, data columns and marker or collection paths which are shared
+        between figure elements are stored only once.  Set to False to skip
+        the search for duplicates when the data is known to be unique.
+    data_format : string (default = "rows")
+        The encoding of the figure datasets.  Options are
+        - "rows"    : nested lists of [x, y, ...] rows.
+        - "columns" : one list of numbers per column.
+        - "base64"  : one base64-encoded binary array per column.  This is
+                      the most compact, and is decoded by mpld3.js without
+                      parsing numbers from text.
+    data_dtype : string (default = "float64")
+        The float type of the binary arrays for data_format="base64": either
+        "float64" or "float32".
+    precision : integer (optional)
+        If specified, round all exported coordinates (data, vertices, offsets
+        and path transforms) to this number of significant digits.  Four to
+        six digits are plenty for a figure a few hundred pixels wide, and
+        give a much smaller output than full precision.
+    max_points_per_line : integer (optional)
+        If specified, lines with more points than this are decimated to the
+        minimum and maximum points within each horizontal pixel of the axes.
+        Decimated lines are marked with a "decimation" entry in their JSON.
+    lod_levels : integer (default = 0)
+        If nonzero, lines longer than max_points_per_line are not replaced by
+        their decimated version: instead the full data is exported along
+        with up to lod_levels decimated levels of increasing detail, and the
+        browser draws the level which matches the current zoom.
+    deterministic_ids : boolean (default = False)
+        If True, the ids of the figure and its elements are derived from the
+        figure content rather than from the Python objects, so that an
+        unchanged figure is always exported to the same output.  Note that
+        identical figures then share their ids, so should not be shown on
+        the same page.
+    canvas_threshold : integer (optional)
+        If specified, markers and collections with more than this number of
+        points are drawn on an html canvas instead of as individual svg
+        elements, which keeps zooming and panning fast for large scatter
+        plots.  Use 0 to draw all markers and collections on a canvas.
+    image_format : string (optional)
+        If specified, re-encode images in this format: "png", or the lossy
+        "jpeg" or "webp", which are much smaller for photographs and smooth
+        heatmaps.  Requires the Pillow package.
+    image_quality : integer (optional)
+        The quality (1-100) of jpeg and webp images.
+    image_compression : integer (optional)
+        The compression level (0-9) of png images.
+    image_tile_size : integer (optional)
+        If specified, export images at the full resolution of their data,
+        split into tiles of this many pixels at several levels of detail,
+        so that large images stay sharp when zoomed in.  The browser only
+        draws the tiles in view at the current zoom, but all the levels are
+        embedded in the figure: about 4/3 the size of the full-resolution
+        image, which may be much larger than the default screen-resolution
+        image.  Figures shown with :func:`show` are the exception: their
+        tiles are served separately, and only those in view are loaded.
+        Requires the Pillow package.
     **kwargs :
         Additional keyword arguments passed to mplexporter.Exporter
 
@@ -187,31 +465,262 @@ def fig_to_html(fig, d3_url=None, mpld3_url=None, safemode=False,
     - :func:`save_json`: save json representation of a figure to file
     - :func:`save_html` : save html representation of a figure to file
     - :func:`fig_to_dict` : output dictionary representation of the figure
+    - :func:`figs_to_html` : output html representation of many figures
     - :func:`show` : launch a local server and show a figure in a browser
     - :func:`display` : embed figure within the IPython notebook
     - :func:`enable_notebook` : automatically embed figures in IPython notebook
     """
     template = TEMPLATE_DICT[template_type]
 
-    # TODO: allow fig to be a list of figures?
+    # for lists of figures, see figs_to_html
     d3_url = d3_url or urls.D3_URL
     mpld3_url = mpld3_url or urls.MPLD3_URL
-    figid = str(id(fig)) + str(int(random.random() * 1E10))
-    renderer = MPLD3Renderer()
-    Exporter(renderer, **kwargs).run(fig)
+    fig, figure_json, extra_css, extra_js = _render_figure(fig, **kwargs)
+    figid = _figure_id(fig, figure_json, kwargs.get('deterministic_ids'))
+
+    if safemode:
+        extra_css = ""
+        extra_js = ""
+
+    with timed("json"):
+        figure_json = json.dumps(figure_json)
+    with timed("template"):
+        return template.render(figid=figid,
+                               d3_url=d3_url,
+                               mpld3_url=mpld3_url,
+                               figure_json=figure_json,
+                               extra_css=extra_css,
+                               extra_js=extra_js)
+
+
+def _write_fig_html(fig, fileobj, d3_url=None, mpld3_url=None, safemode=False,
+                    template_type="general", **kwargs):
+    """Write the html representation of the figure to a file object
 
+    This writes the same html as :func:`fig_to_html`, but the figure JSON is
+    streamed into the file rather than built as a string.
+    """
+    template = TEMPLATE_DICT[template_type]
+
+    d3_url = d3_url or urls.D3_URL
+    mpld3_url = mpld3_url or urls.MPLD3_URL
+    renderer = _run_renderer(fig, defer_data=True, **kwargs)
     fig, figure_json, extra_css, extra_js = renderer.finished_figures[0]
+    figid = _figure_id(fig, figure_json, kwargs.get('deterministic_ids'))
 
     if safemode:
         extra_css = ""
         extra_js = ""
 
-    return template.render(figid=figid,
-                           d3_url=d3_url,
-                           mpld3_url=mpld3_url,
-                           figure_json=json.dumps(figure_json),
-                           extra_css=extra_css,
-                           extra_js=extra_js)
+    # render the template around a placeholder for the figure JSON
+    placeholder = "FIGURE_JSON_" + figid
+    with timed("template"):
+        html = template.render(figid=figid,
+                               d3_url=d3_url,
+                               mpld3_url=mpld3_url,
+                               figure_json=placeholder,
+                               extra_css=extra_css,
+                               extra_js=extra_js)
+    head, tail = html.split(placeholder)
+    fileobj.write(head)
+    _write_figure_json(fileobj, renderer, figure_json)
+    fileobj.write(tail)
+
+
+def _dumps_with_data(figure_json, data_json):
+    """Return json.dumps(figure_json), given the JSON of its datasets
+
+    data_json maps the labels of the figure datasets to their JSON text,
+    which is used as it is rather than serializing the datasets again.
+    """
+    items = []
+    for key, value in figure_json.items():
+        if key == "data":
+            text = "{" + ", ".join(json.dumps(label) + ": " + data_json[label]
+                                   for label in value) + "}"
+        else:
+            text = json.dumps(value)
+        items.append(json.dumps(key) + ": " + text)
+    return "{" + ", ".join(items) + "}"
+
+
+def figs_to_html(figs, d3_url=None, mpld3_url=None, safemode=False,
+                 share_data=True, **kwargs):
+    """Output html representation of a list of figures
+
+    The d3 and mpld3 libraries are loaded once for all the figures, and
+    the css and javascript of their plugins are included once.
+
+    Parameters
+    ----------
+    figs : list of matplotlib figures
+        The figures to display
+    d3_url : string (optional)
+        The URL of the d3 library.  If not specified, a standard web path
+        will be used.
+    mpld3_url : string (optional)
+        The URL of the mpld3 library.  If not specified, a standard web path
+        will be used.
+    safemode : boolean
+        If true, scrub any additional html
+    share_data : boolean (default = True)
+        If true, datasets which appear in more than one figure are included
+        in the page only once.
+    **kwargs :
+        Additional keyword arguments passed to :func:`fig_to_dict`
+
+    Returns
+    -------
+    figs_html : string
+        the HTML representation of the figures
+
+    See Also
+    --------
+    - :func:`fig_to_html` : output html representation of a single figure
+    - :func:`save_html` : save html representation of figures to file
+    """
+    d3_url = d3_url or urls.D3_URL
+    mpld3_url = mpld3_url or urls.MPLD3_URL
+
+    figures = []
+    extra_css = []
+    extra_js = []
+    for i, fig in enumerate(figs):
+        fig, figure_json, css, js = _render_figure(fig, **kwargs)
+        figid = _figure_id(fig, figure_json, kwargs.get('deterministic_ids'))
+        # identical figures have the same deterministic id: the index keeps
+        # the ids of the page elements distinct
+        figid = "{0}_{1}".format(figid, i)
+        figures.append(dict(figid=figid, figure_json=figure_json))
+        if css not in extra_css:
+            extra_css.append(css)
+        if js not in extra_js:
+            extra_js.append(js)
+
+    # Find the datasets used in more than one figure; these are moved to
+    # a shared table keyed by a hash of their contents.  The datasets are
+    # serialized once, and their JSON reused in that of the figures.
+    shared = {}
+    if share_data:
+        counts = {}
+        for fig in figures:
+            fig['data_json'] = {}
+            for label, dataset in fig['figure_json']['data'].items():
+                dataset_json = json.dumps(dataset)
+                key = hashlib.sha1(dataset_json.encode('utf-8')).hexdigest()
+                fig['data_json'][label] = (key, dataset_json)
+                counts[key] = counts.get(key, 0) + 1
+        for fig in figures:
+            for label, (key, dataset_json) in fig['data_json'].items():
+                if counts[key] > 1:
+                    shared[key] = dataset_json
+                    dataset_json = json.dumps({"shared": key})
+                fig['data_json'][label] = dataset_json
+
+    with timed("json"):
+        for fig in figures:
+            if share_data:
+                fig['figure_json'] = _dumps_with_data(fig['figure_json'],
+                                                      fig.pop('data_json'))
+            else:
+                fig['figure_json'] = json.dumps(fig['figure_json'])
+
+    if safemode:
+        extra_css = []
+        extra_js = []
+
+    shared_json = "{" + ", ".join(json.dumps(key) + ": " + shared[key]
+                                  for key in sorted(shared)) + "}"
+    if kwargs.get('deterministic_ids'):
+        pageid = hashlib.sha1("".join(fig['figid'] for fig in figures)
+                              .encode('utf-8')).hexdigest()[:16]
+    else:
+        pageid = str(int(random.random() * 1E10))
+
+    with timed("template"):
+        return MULTI_HTML.render(pageid=pageid,
+                                 figures=figures,
+                                 d3_url=d3_url,
+                                 mpld3_url=mpld3_url,
+                                 shared_json=shared_json,
+                                 extra_css="".join(extra_css),
+                                 extra_js="".join(extra_js))
+
+
+def _export_job(args):
+    """Export one figure for export_many.  This runs in a worker process."""
+    i, fig, output, kwargs = args
+    with id_scope("fig{0}_".format(i)):
+        if callable(fig):
+            # import here, in case matplotlib.use(...) is called by user
+            import matplotlib.pyplot as plt
+            fig = fig()
+            close = True
+        else:
+            close = False
+        if output == "html":
+            result = fig_to_html(fig, **kwargs)
+        else:
+            result = fig_to_dict(fig, **kwargs)
+    if close:
+        plt.close(fig)
+    return result
+
+
+def export_many(figs, workers=None, output="dict", **kwargs):
+    """Export many figures in parallel, using a pool of processes
+
+    Parameters
+    ----------
+    figs : list
+        The figures to export.  Each item is either a matplotlib figure,
+        which is pickled and sent to a worker, or a function with no
+        arguments which creates and returns a figure within the worker.
+        Functions must be picklable, i.e. defined at the top level of a
+        module.
+    workers : int (optional)
+        The number of worker processes.  If not specified, the number of
+        CPUs is used.  If workers is 1, the figures are exported in the
+        current process.
+    output : string (default = "dict")
+        "dict" to return the output of :func:`fig_to_dict`, or "html" to
+        return the output of :func:`fig_to_html` for each figure.
+    **kwargs :
+        Additional keyword arguments passed to :func:`fig_to_dict` or
+        :func:`fig_to_html`
+
+    Returns
+    -------
+    results : list
+        The exported figures, in the order of ``figs``.
+
+    Notes
+    -----
+    Element ids are normally built from the process id and the object id,
+    and are stored on the object once assigned.  Figures passed to the pool
+    keep the ids they already had in this process (e.g. those referenced by
+    plugins); any other element of the i-th figure gets a sequential id with
+    the prefix "fig<i>_", so that ids are unique across workers and do not
+    depend on which worker exported the figure.  These ids are not stored
+    on the figures: a figure exported again, by export_many or otherwise,
+    gets ids for its new position.
+
+    See Also
+    --------
+    - :func:`fig_to_dict` : output dictionary representation of the figure
+    - :func:`figs_to_html` : output html representation of many figures
+    """
+    if output not in ["dict", "html"]:
+        raise ValueError("output must be 'dict' or 'html'")
+    jobs = [(i, fig, output, kwargs) for (i, fig) in enumerate(figs)]
+    if workers == 1:
+        return [_export_job(job) for job in jobs]
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(_export_job, jobs)
+    finally:
+        pool.close()
+        pool.join()
 
 
 def display(fig=None, closefig=True, **kwargs):
@@ -247,14 +756,89 @@ def display(fig=None, closefig=True, **kwargs):
     return HTML(fig_to_html(fig, **kwargs))
 
 
+_LIBRARY_FILES = {}
+
+# The figures shown with show(), by the id of the matplotlib figure: the
+# id of the page element, the figure JSON last sent, the keywords used, the
+# datasets appended to by append_data() (as _AppendedData, by label), the
+# labels of those not yet encoded in the figure JSON, and a lock guarding
+# them against the server thread
+_SHOWN_FIGURES = {}
+
+# The keys of axes and axis properties which may be updated without
+# redrawing the figure
+_AXES_LIMITS = ("xlim", "ylim", "xdomain", "ydomain")
+_AXIS_TICKS = ("nticks", "tickvalues", "tickformat")
+
+
+class _AppendedData(object):
+    """The rows of a dataset of a shown figure, as extended by append_data()
+
+    The rows are kept as a list of chunks, and dropped rows are skipped by
+    an offset into the first chunk: appending costs the size of the new
+    rows only, and the chunks are joined when the dataset is encoded for
+    the figure JSON.
+
+    Parameters
+    ----------
+    columns : list of 1D arrays
+        the columns of the dataset
+    """
+    def __init__(self, columns):
+        self.n_columns = len(columns)
+        rows = np.asarray(columns, dtype=float).T.reshape(-1, self.n_columns)
+        self.chunks = deque([rows])
+        self.start = 0
+        self.n_rows = len(rows)
+
+    def append(self, rows, max_rows=None):
+        """Append an (n_rows, n_columns) array, keeping at most max_rows"""
+        self.chunks.append(rows)
+        self.n_rows += len(rows)
+        if max_rows is not None and self.n_rows > max_rows:
+            drop = self.n_rows - max_rows
+            self.n_rows = max_rows
+            # drop the chunks which are entirely before the rows kept
+            while drop >= len(self.chunks[0]) - self.start:
+                drop -= len(self.chunks[0]) - self.start
+                self.chunks.popleft()
+                self.start = 0
+            self.start += drop
+
+    def columns(self):
+        """Return the columns of the dataset, as a list of 1D arrays"""
+        rows = np.concatenate(self.chunks)[self.start:]
+        self.chunks = deque([rows])
+        self.start = 0
+        return list(rows.T)
+
+
+def _library_files():
+    """Return the local d3 and mpld3 libraries, as served by show()
+
+    The files are read from disk the first time only.
+    """
+    if not _LIBRARY_FILES:
+        for path, filename in [('/mpld3.js', urls.MPLD3_LOCAL),
+                               ('/d3.js', urls.D3_LOCAL)]:
+            with open(filename, 'r') as f:
+                _LIBRARY_FILES[path] = ["text/javascript", f.read()]
+    return _LIBRARY_FILES
+
+
 def show(fig=None, ip='127.0.0.1', port=8888, n_retries=50,
-         local=True, **kwargs):
+         local=True, block=True, **kwargs):
     """Open figure in a web browser
 
     Similar behavior to plt.show().  This opens the D3 visualization of the
     specified figure in the web browser.  On most platforms, the browser
     will open automatically.
 
+    The figures are served by a local server, which is started in the
+    background on the first call and keeps running until the process exits.
+    Each figure is served at its own URL, and the server's root page lists
+    all the figures shown so far.
+
     Parameters
     ----------
     fig : matplotlib figure
@@ -270,30 +854,326 @@ def show(fig=None, ip='127.0.0.1', port=8888, n_retries=50,
     local : bool, default = True
         if True, use the local d3 & mpld3 javascript versions, within the
         js/ folder.  If False, use the standard urls.
+    block : bool, default = True
+        if True, wait until interrupted with Ctrl-C before returning.  If
+        False, return immediately, with the server running in the background.
     **kwargs :
-        additional keyword arguments are passed through to :func:`fig_to_html`
+        additional keyword arguments are passed through to :func:`fig_to_dict`
+
+    Returns
+    -------
+    url : string
+        the URL of the figure page
+
+    Notes
+    -----
+    ip, port and n_retries are only used when the server is started.  The
+    tiles of images exported with image_tile_size are served one by one,
+    rather than embedded in the figure JSON: pages only load those in view.
 
     See Also
     --------
-    - :func:`display` : embed figure within the IPython notebook
-    - :func:`enable_notebook` : automatically embed figures in IPython notebook
+    - :func:`update` : send the changes of a shown figure to the browser
+    - :func:`append_data` : append rows to a dataset of a shown figure
     """
+    server = get_figure_server(ip=ip, port=port, n_retries=n_retries,
+                               files=_library_files())
     if local:
-        kwargs['mpld3_url'] = '/mpld3.js'
-        kwargs['d3_url'] = '/d3.js'
-        files = {'/mpld3.js': ["text/javascript",
-                               open(urls.MPLD3_LOCAL, 'r').read()],
-                 '/d3.js': ["text/javascript",
-                            open(urls.D3_LOCAL, 'r').read()]}
+        d3_url = '/d3.js'
+        mpld3_url = '/mpld3.js'
     else:
-        files = None
+        d3_url = urls.D3_URL
+        mpld3_url = urls.MPLD3_URL
 
     if fig is None:
         # import here, in case matplotlib.use(...) is called by user
         import matplotlib.pyplot as plt
         fig = plt.gcf()
-    html = fig_to_html(fig, **kwargs)
-    serve_and_open(html, ip=ip, port=port, n_retries=n_retries, files=files)
+    fig, figure_json, extra_css, extra_js = _render_figure(fig, **kwargs)
+    figid = _figure_id(fig, figure_json, kwargs.get('deterministic_ids'))
+    _serve_tiles(server, figid, figure_json)
+    html = SERVER_HTML.render(figid=figid,
+                              d3_url=d3_url,
+                              mpld3_url=mpld3_url,
+                              json_url=server.json_path(figid),
+                              events_url=server.events_path(figid),
+                              extra_css=extra_css,
+                              extra_js=extra_js)
+    url = server.add_figure(figid, html, _strict_json(figure_json))
+    _SHOWN_FIGURES[get_id(fig)] = dict(figid=figid, figure_json=figure_json,
+                                       kwargs=kwargs, appended={},
+                                       stale=set(), lock=threading.Lock())
+
+    # Use a thread to open a web browser pointing to the figure
+    b = lambda: webbrowser.open(url)
+    threading.Thread(target=b).start()
+
+    if block:
+        print("Serving to {0}    [Ctrl-C to exit]".format(url))
+        server.wait()
+    return url
+
+
+def _figure_patch(old, new):
+    """Return the patch updating the figure dict old to new
+
+    The patch is a dict with optional entries "data" (the new or changed
+    datasets, by label), "geometry" (the new or changed path geometries, by
+    label), "elements" (the new properties of changed elements, by id), and
+    "axes" (the changed limits and ticks of axes, by id).  When
+    anything else changed, e.g. elements were added, the patch is
+    {"replace": new}.  Returns None if the figures are identical.
+    """
+    def structure(fig):
+        """Everything but datasets, geometries, elements, limits and ticks"""
+        axes = []
+        for ax in fig['axes']:
+            date = 'date' in (ax.get('xscale'), ax.get('yscale'))
+            struct = {}
+            for key, value in ax.items():
+                if key in ELEMENT_LISTS:
+                    struct[key] = [el['id'] for el in value]
+                elif key == 'axes':
+                    struct[key] = [dict((k, v) for (k, v) in axis.items()
+                                        if k not in _AXIS_TICKS)
+                                   for axis in value]
+                elif date or key not in _AXES_LIMITS:
+                    struct[key] = value
+            axes.append(struct)
+        return dict((key, (axes if key == 'axes' else value))
+                    for (key, value) in fig.items()
+                    if key not in ('data', 'geometry'))
+
+    if structure(old) != structure(new):
+        return {"replace": new}
+
+    patch = {}
+    data = dict((label, dataset) for (label, dataset) in new['data'].items()
+                if old['data'].get(label) != dataset)
+    if data:
+        patch['data'] = data
+    old_geometry = old.get('geometry', {})
+    geometry = dict((label, geom)
+                    for (label, geom) in new.get('geometry', {}).items()
+                    if old_geometry.get(label) != geom)
+    if geometry:
+        patch['geometry'] = geometry
+
+    elements = {}
+    axes = {}
+    for old_ax, new_ax in zip(old['axes'], new['axes']):
+        limits = dict((key, new_ax[key]) for key in _AXES_LIMITS + ('axes',)
+                      if key in new_ax and new_ax[key] != old_ax.get(key))
+        if limits:
+            axes[new_ax['id']] = limits
+        for key in ELEMENT_LISTS:
+            for old_el, new_el in zip(old_ax[key], new_ax[key]):
+                if old_el != new_el:
+                    elements[new_el['id']] = new_el
+    if elements:
+        patch['elements'] = elements
+    if axes:
+        patch['axes'] = axes
+    return patch or None
+
+
+def _serve_tiles(server, figid, figure_json):
+    """Serve the image tiles of a figure by URL, rather than embedding them
+
+    The tiles of each level of detail of tiled images (see image_tile_size)
+    are replaced in figure_json by a "url" template of the paths at which
+    the server serves them, with "{row}" and "{col}" placeholders: the
+    browser then only loads the tiles in view.  The paths include a digest
+    of the tiles, so that changed tiles get new URLs.
+    """
+    for ax in figure_json['axes']:
+        for image in ax.get('images', []):
+            if image.get('tiles') is None:
+                continue
+            content_type = "image/" + image.get('format', "png")
+            for level in image['tiles']['levels']:
+                if 'tiles' not in level:
+                    continue
+                tiles = level.pop('tiles')
+                digest = hashlib.sha1(json.dumps(tiles).encode('utf-8'))
+                path = server.tiles_path(figid, digest.hexdigest()[:16])
+                for r, row in enumerate(tiles):
+                    for c, data in enumerate(row):
+                        # tiles are decoded when first requested
+                        server.add("{0}/{1}/{2}".format(path, r, c),
+                                   lambda data=data: base64.b64decode(data),
+                                   content_type)
+                level['url'] = path + "/{row}/{col}"
+
+
+def _finite_or_none(obj):
+    """Return a copy of obj with its non-finite floats replaced by None"""
+    if isinstance(obj, float):
+        return None if math.isnan(obj) or math.isinf(obj) else obj
+    elif isinstance(obj, dict):
+        return dict((key, _finite_or_none(value))
+                    for (key, value) in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        return [_finite_or_none(value) for value in obj]
+    return obj
+
+
+def _strict_json(obj):
+    """Serialize obj as JSON which the browser can read with JSON.parse
+
+    json.dumps writes non-finite floats as NaN or Infinity, which are valid
+    javascript (as in the html templates) but not JSON.  These are written
+    as null instead, which mpld3.js reads as NaN: a gap in the data.
+    """
+    try:
+        return json.dumps(obj, allow_nan=False)
+    except ValueError:
+        return json.dumps(_finite_or_none(obj), allow_nan=False)
+
+
+def _shown_figure(fig):
+    """Return the record of a figure shown with show()"""
+    try:
+        return _SHOWN_FIGURES[get_id(fig)]
+    except KeyError:
+        raise ValueError("the figure was not shown with mpld3.show()")
+
+
+def _encode_appended(shown):
+    """Encode the datasets appended to into the figure JSON of a shown figure
+
+    This must be called with the lock of the figure held.
+    """
+    if shown['stale']:
+        kwargs = shown['kwargs']
+        renderer = MPLD3Renderer(data_format=kwargs.get('data_format', "rows"),
+                                 data_dtype=kwargs.get('data_dtype', "float64"))
+        for label in shown['stale']:
+            shown['figure_json']['data'][label] = renderer.encode_data(
+                shown['appended'][label].columns())
+        shown['stale'] = set()
+
+
+def _shown_json(shown):
+    """Return a function serializing the current JSON of a shown figure"""
+    def make_json():
+        with shown['lock']:
+            _encode_appended(shown)
+            return _strict_json(shown['figure_json'])
+    return make_json
+
+
+def update(fig, **kwargs):
+    """Send the changes of a figure shown with show() to the browser
+
+    The figure is exported again, and compared with the version last sent:
+    only the changed datasets and element properties are sent to the pages
+    showing it, which redraw the affected elements.
+
+    Parameters
+    ----------
+    fig : matplotlib figure
+        The figure to update, which must have been shown with :func:`show`
+    **kwargs :
+        additional keyword arguments are passed through to
+        :func:`fig_to_dict`.  By default, those passed to :func:`show` are
+        used.
+
+    Returns
+    -------
+    patch : dict or None
+        the patch sent to the browser, or None if the figure is unchanged.
+
+    See Also
+    --------
+    - :func:`show` : launch a local server and show a figure in a browser
+    - :func:`append_data` : append rows to a dataset of a shown figure
+    """
+    shown = _shown_figure(fig)
+    kwargs = dict(shown['kwargs'], **kwargs)
+    fig, figure_json, extra_css, extra_js = _render_figure(fig, **kwargs)
+    server = get_figure_server()
+    _serve_tiles(server, shown['figid'], figure_json)
+    with shown['lock']:
+        _encode_appended(shown)
+        patch = _figure_patch(shown['figure_json'], figure_json)
+        if patch is not None:
+            shown['figure_json'] = figure_json
+            shown['appended'] = {}
+    if patch is not None:
+        server.update_figure(shown['figid'], _shown_json(shown),
+                             _strict_json(patch))
+    return patch
+
+
+def append_data(fig, datalabel, rows, max_rows=None):
+    """Append rows to a dataset of a figure shown with show()
+
+    Only the new rows are sent to the pages showing the figure, which
+    extend the dataset in place and redraw the elements using it.  This is
+    much cheaper than :func:`update` for data which grows over time.
+
+    Parameters
+    ----------
+    fig : matplotlib figure
+        The figure, which must have been shown with :func:`show`
+    datalabel : string
+        The label of the dataset in the figure JSON, e.g. "data01"
+    rows : array_like
+        The rows to append, of shape (n_rows, n_columns).  A single row may
+        be given as a 1D array.
+    max_rows : int (optional)
+        If specified, only the last max_rows rows of the dataset are kept,
+        both in the browser and on the server, so that the memory used stays
+        bounded however long the data grows.
+
+    Notes
+    -----
+    The matplotlib figure itself is not modified: a later call to
+    :func:`update` sends the datasets of the matplotlib figure as they are
+    then.  Decimated levels of detail (see lod_levels) are dropped by the
+    browser when rows are appended to a line.
+
+    The server keeps the rows of the dataset as arrays, and only encodes
+    the dataset into the figure JSON when a page requests it: appending
+    costs the size of the new rows, not of the whole dataset.
+
+    See Also
+    --------
+    - :func:`show` : launch a local server and show a figure in a browser
+    - :func:`update` : send the changes of a shown figure to the browser
+    """
+    shown = _shown_figure(fig)
+    if datalabel not in shown['figure_json']['data']:
+        raise ValueError("the figure has no dataset "
+                         "{0}".format(datalabel))
+    if max_rows is not None:
+        max_rows = int(max_rows)
+        if max_rows < 1:
+            raise ValueError("max_rows must be a positive integer")
+
+    with shown['lock']:
+        appended = shown['appended'].get(datalabel)
+        if appended is None:
+            columns = decode_data(shown['figure_json']['data'][datalabel])
+            appended = _AppendedData(columns)
+        rows = np.asarray(rows, dtype=float)
+        rows = rows.reshape(-1, rows.shape[-1] if rows.ndim else 1)
+        if rows.shape[1] != appended.n_columns:
+            raise ValueError("rows must have {0} "
+                             "columns".format(appended.n_columns))
+
+        renderer = MPLD3Renderer(precision=shown['kwargs'].get('precision'))
+        rows = renderer.round(rows)
+        appended.append(rows, max_rows)
+        shown['appended'][datalabel] = appended
+        shown['stale'].add(datalabel)
+
+    message = {"data": datalabel, "rows": rows.tolist(),
+               "max_rows": max_rows}
+    server = get_figure_server()
+    server.update_figure(shown['figid'], _shown_json(shown),
+                         _strict_json(message), event="append")
 
 
 def enable_notebook(**kwargs):
@@ -349,13 +1229,21 @@ def save_html(fig, fileobj, **kwargs):
 
     Parameters
     ----------
-    fig : matplotlib Figure instance
-        The figure to write to file.
+    fig : matplotlib Figure instance, or list of Figure instances
+        The figure to write to file.  If a list of figures is given, they
+        are written with :func:`figs_to_html`.
     fileobj : filename or file object
         The filename or file-like object in which to write the HTML
         representation of the figure.
     **kwargs :
         additional keyword arguments will be passed to :func:`fig_to_html`
+        or :func:`figs_to_html`
+
+    Notes
+    -----
+    For a single figure, the datasets are encoded and written to the file a
+    chunk at a time, so that the html for large figures is never held in
+    memory as a whole.
 
     See Also
     --------
@@ -363,11 +1251,18 @@ def save_html(fig, fileobj, **kwargs):
     - :func:`fig_to_html` : output html representation of the figure
     - :func:`fig_to_dict` : output dictionary representation of the figure
     """
+    if 'defer_data' in kwargs:
+        raise ValueError("save_html always writes the datasets: use "
+                         "fig_to_html(fig, defer_data=True) to defer them")
     if isinstance(fileobj, str):
-        fileobj = open(fileobj, 'w')
+        with open(fileobj, 'w') as f:
+            return save_html(fig, f, **kwargs)
     if not hasattr(fileobj, 'write'):
         raise ValueError("fileobj should be a filename or a writable file")
-    fileobj.write(fig_to_html(fig, **kwargs))
+    if isinstance(fig, (list, tuple)):
+        fileobj.write(figs_to_html(fig, **kwargs))
+    else:
+        _write_fig_html(fig, fileobj, **kwargs)
 
 
 def save_json(fig, fileobj, **kwargs):
@@ -384,7 +1279,12 @@ def save_json(fig, fileobj, **kwargs):
         The filename or file-like object in which to write the HTML
         representation of the figure.
     **kwargs :
-        additional keyword arguments will be passed to :func:`fig_to_html`
+        additional keyword arguments will be passed to :func:`fig_to_dict`
+
+    Notes
+    -----
+    The output is the same as ``json.dump(fig_to_dict(fig), fileobj)``, but
+    the datasets are encoded and written to the file a chunk at a time.
 
     See Also
     --------
@@ -392,11 +1292,22 @@ def save_json(fig, fileobj, **kwargs):
     - :func:`fig_to_html` : output html representation of the figure
     - :func:`fig_to_dict` : output dictionary representation of the figure
     """
+    if 'defer_data' in kwargs:
+        raise ValueError("save_json always writes the datasets: use "
+                         "fig_to_dict(fig, defer_data=True) to defer them")
     if isinstance(fileobj, str):
-        fileobj = open(fileobj, 'w')
+        with open(fileobj, 'w') as f:
+            return save_json(fig, f, **kwargs)
     if not hasattr(fileobj, 'write'):
         raise ValueError("fileobj should be a filename or a writable file")
-    json.dump(fig_to_dict(fig, **kwargs), fileobj)
+    if kwargs.pop('return_hash', False):
+        raise ValueError("save_json does not return a hash: use "
+                         "fig_to_dict(fig, return_hash=True)")
+    for key in ["d3_url", "mpld3_url", "template_type"]:
+        kwargs.pop(key, None)
+    renderer = _run_renderer(fig, defer_data=True, **kwargs)
+    fig, figure_json, extra_css, extra_js = renderer.finished_figures[0]
+    _write_figure_json(fileobj, renderer, figure_json)
 
 
 # Deprecated versions of these functions
@@ -6,41 +6,272 @@ import webbrowser
 import socket
 import itertools
 import random
+import hashlib
+import gzip
+import io
 
 try:
     # Python 2.x
     import BaseHTTPServer as server
+    import SocketServer as socketserver
+    import Queue as queue
 except ImportError:
     # Python 3.x
     from http import server
+    import socketserver
+    import queue
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, server.HTTPServer):
+    """HTTP server handling each connection in a separate thread"""
+    daemon_threads = True
+
+
+class Payload(object):
+    """Content served by the preview server
+
+    The content is compressed once, when the payload is created, with gzip
+    and (if the brotli package is available) brotli, so that each request
+    only needs to pick an encoding.
+
+    Parameters
+    ----------
+    content : string or bytes
+        the content to serve.  Strings are encoded as utf-8.
+    content_type : string
+        the MIME type of the content
+    max_age : int (optional)
+        if specified, clients may cache the content for this many seconds
+        without checking back with the server.  Otherwise they must
+        revalidate it on each request (which is cheap, thanks to the ETag).
+    """
+    def __init__(self, content, content_type, max_age=None):
+        if not isinstance(content, bytes):
+            content = content.encode('utf-8')
+        self.content_type = content_type
+        self.etag = '"{0}"'.format(hashlib.sha1(content).hexdigest())
+        if max_age is None:
+            self.cache_control = "no-cache"
+        else:
+            self.cache_control = "public, max-age={0}".format(int(max_age))
+
+        self.encodings = {"identity": content}
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as f:
+            f.write(content)
+        self.encodings["gzip"] = buf.getvalue()
+        if brotli is not None:
+            self.encodings["br"] = brotli.compress(content)
+
+    def select(self, accept_encoding):
+        """Return the (encoding, body) to send for an Accept-Encoding header
+
+        The smallest of the encodings accepted by the client is used.
+        """
+        accepted = set(enc.split(';')[0].strip()
+                       for enc in (accept_encoding or "").split(','))
+        candidates = [(len(body), enc, body)
+                      for (enc, body) in self.encodings.items()
+                      if enc == "identity" or enc in accepted]
+        size, enc, body = min(candidates)
+        return enc, body
+
+
+class LazyPayload(object):
+    """A Payload whose content is only built when it is first requested
+
+    Parameters
+    ----------
+    make_content : callable
+        a function of no arguments returning the content to serve
+    content_type, max_age :
+        as for :class:`Payload`
+    """
+    def __init__(self, make_content, content_type, max_age=None):
+        self.make_content = make_content
+        self.content_type = content_type
+        self.max_age = max_age
+        self.payload = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return the Payload, building it on the first call"""
+        with self.lock:
+            if self.payload is None:
+                self.payload = Payload(self.make_content(),
+                                       self.content_type, self.max_age)
+            return self.payload
 
 
-def generate_handler(html, files=None):
+class EventStream(object):
+    """A stream of server-sent events
+
+    Each client requesting the stream gets the events published after it
+    connected, until it disconnects or the stream is closed.
+
+    Parameters
+    ----------
+    keepalive : float (default = 15)
+        the number of seconds after which a comment is sent to idle clients,
+        so that the connection is not dropped.
+    """
+    def __init__(self, keepalive=15):
+        self.keepalive = keepalive
+        self.clients = []
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """Return a queue receiving the events, as encoded messages"""
+        client = queue.Queue()
+        with self.lock:
+            self.clients.append(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def publish(self, data, event=None):
+        """Send data (a string) to all clients, with an optional event name"""
+        message = "" if event is None else "event: {0}\n".format(event)
+        message += "".join("data: {0}\n".format(line)
+                           for line in data.split("\n"))
+        message = (message + "\n").encode('utf-8')
+        with self.lock:
+            for client in self.clients:
+                client.put(message)
+
+    def close(self):
+        """End the stream for all clients"""
+        with self.lock:
+            for client in self.clients:
+                client.put(None)
+            self.clients = []
+
+
+def generate_handler(html, files=None, max_age=3600):
+    """Generate a request handler serving the html page and files
+
+    Parameters
+    ----------
+    html : string
+        the html to serve within the page at '/'
+    files : dictionary (optional)
+        dictionary mapping paths to [content_type, content] of extra content
+        to serve (e.g. the d3 and mpld3 libraries).
+    max_age : int (default = 3600)
+        the number of seconds for which browsers may cache the files.
+    """
     if files is None:
         files = {}
 
+    routes = {'/': Payload(_page(html), "text/html")}
+    for path, (content_type, content) in files.items():
+        routes[path] = Payload(content, content_type, max_age=max_age)
+
+    return _make_handler(routes)
+
+
+def _page(html):
+    """Wrap an html snippet in a full page"""
+    return ("<html><head>"
+            "<title>mpld3 plot</title>"
+            "</head><body>\n" + html + "</body></html>")
+
+
+def _make_handler(routes):
+    """Make a request handler class serving a dict of path: Payload
+
+    The dict is available as the ``routes`` attribute of the class, and
+    may be updated while the server is running.
+    """
+
     class MyHandler(server.BaseHTTPRequestHandler):
+        # HTTP/1.1 keeps connections alive between requests; this needs a
+        # Content-Length header on every response.
+        protocol_version = "HTTP/1.1"
+
         def do_GET(self):
             """Respond to a GET request."""
-            print files.keys()
-            if self.path == '/':
-                self.send_response(200)
-                self.send_header("Content-type", "text/html")
+            self.respond(send_body=True)
+
+        def do_HEAD(self):
+            """Respond to a HEAD request."""
+            self.respond(send_body=False)
+
+        def respond(self, send_body):
+            payload = self.routes.get(self.path.split('?')[0])
+            if isinstance(payload, EventStream):
+                self.stream(payload)
+                return
+            if isinstance(payload, LazyPayload):
+                payload = payload.get()
+            if payload is None:
+                body = b"404: not found"
+                self.send_response(404)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
                 self.end_headers()
-                self.wfile.write("<html><head>"
-                                 "<title>mpld3 plot</title>"
-                                 "</head><body>\n")
-                self.wfile.write(html)
-                self.wfile.write("</body></html>")
-            elif self.path in files:
-                content_type, content = files[self.path]
-                self.send_response(200)
-                self.send_header("Content-type", content_type)
+                if send_body:
+                    self.wfile.write(body)
+                return
+
+            if self.headers.get("If-None-Match") == payload.etag:
+                self.send_response(304)
+                self.send_header("ETag", payload.etag)
+                self.send_header("Cache-Control", payload.cache_control)
                 self.end_headers()
-                self.wfile.write(content)
-            else:
-                self.send_error(404)
+                return
+
+            encoding, body = payload.select(
+                self.headers.get("Accept-Encoding"))
+            self.send_response(200)
+            self.send_header("Content-Type", payload.content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding != "identity":
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("ETag", payload.etag)
+            self.send_header("Cache-Control", payload.cache_control)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def stream(self, events):
+            # the length of the response is unknown: it ends when the
+            # connection is closed.
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.flush()
+
+            client = events.subscribe()
+            try:
+                while True:
+                    try:
+                        message = client.get(timeout=events.keepalive)
+                    except queue.Empty:
+                        message = b": keepalive\n\n"
+                    if message is None:
+                        break
+                    self.wfile.write(message)
+                    self.wfile.flush()
+            except socket.error:
+                # the client disconnected
+                pass
+            finally:
+                events.unsubscribe(client)
 
+    MyHandler.routes = routes
     return MyHandler
 
 
@@ -76,7 +307,7 @@ def serve_and_open(html, ip='127.0.0.1', port=8888, n_retries=50, files=None):
     """
     port = find_open_port(ip, port, n_retries)
     Handler = generate_handler(html, files)
-    srvr = server.HTTPServer((ip, port), Handler)
+    srvr = ThreadingHTTPServer((ip, port), Handler)
 
     # Use a thread to open a web browser pointing to the server
     b = lambda: webbrowser.open('http://{0}:{1}'.format(ip, port))
@@ -90,3 +321,155 @@ def serve_and_open(html, ip='127.0.0.1', port=8888, n_retries=50, files=None):
         print("\nstopping Server...")
 
     srvr.server_close()
+
+
+class FigureServer(object):
+    """A server running in the background, to which figures can be added
+
+    The server is started in a daemon thread when the object is created, and
+    runs until :meth:`shutdown` is called or the process exits.  Figures
+    are each served at their own URL, as an html page which fetches the
+    figure JSON from the server once the libraries are loaded, and may
+    listen to a stream of updates to the figure.  The page at '/' lists the
+    figures served so far.
+
+    Parameters
+    ----------
+    ip : string (default = '127.0.0.1')
+        ip address at which the figures will be served.
+    port : int (default = 8888)
+        the port at which to serve the figures
+    n_retries : int (default = 50)
+        the number of nearby ports to search if the specified port is in use.
+    files : dictionary (optional)
+        dictionary mapping paths to [content_type, content] of extra content
+        to serve (e.g. the d3 and mpld3 libraries).
+    """
+    def __init__(self, ip='127.0.0.1', port=8888, n_retries=50, files=None):
+        self.ip = ip
+        self.port = find_open_port(ip, port, n_retries)
+        self.figures = []
+        self.Handler = generate_handler(self._index_html(), files)
+        self.httpd = ThreadingHTTPServer((ip, self.port), self.Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}'.format(self.ip, self.port)
+
+    def _index_html(self):
+        items = ''.join('<li><a href="{0}">Figure {1}</a></li>\n'
+                        .format(path, i + 1)
+                        for (i, path) in enumerate(self.figures))
+        return "<ul>\n" + items + "</ul>\n"
+
+    def add(self, path, content, content_type="text/html", max_age=None):
+        """Serve content at the given path, and return its URL
+
+        content may be a function returning the content, which is then
+        called when the content is first requested.
+        """
+        if callable(content):
+            payload = LazyPayload(content, content_type, max_age)
+        else:
+            payload = Payload(content, content_type, max_age)
+        self.Handler.routes[path] = payload
+        return self.url + path
+
+    def add_figure(self, figid, html, figure_json):
+        """Serve a figure, and return the URL of its page
+
+        Parameters
+        ----------
+        figid : string
+            the id of the figure, used to build its paths
+        html : string
+            the html of the figure page, which should fetch the figure JSON
+            from ``json_path(figid)``, and may listen to the updates sent
+            by :meth:`update_figure` at ``events_path(figid)``
+        figure_json : string
+            the JSON representation of the figure
+        """
+        path = '/fig{0}'.format(figid)
+        self.add(self.json_path(figid), figure_json, "application/json")
+        if self.events_path(figid) not in self.Handler.routes:
+            self.Handler.routes[self.events_path(figid)] = EventStream()
+        url = self.add(path, _page(html))
+        if path not in self.figures:
+            self.figures.append(path)
+            self.add('/', _page(self._index_html()))
+        return url
+
+    def update_figure(self, figid, figure_json, patch, event=None):
+        """Send an update of a figure to the pages showing it
+
+        Parameters
+        ----------
+        figid : string
+            the id of a figure added with :meth:`add_figure`
+        figure_json : string or callable
+            the JSON representation of the updated figure, served to pages
+            loaded from now on, or a function returning it.  The function
+            is called when the JSON is first requested, so that a figure
+            updated many times is only serialized when a page loads it.
+        patch : string
+            the JSON message to send to the pages currently showing the
+            figure
+        event : string (optional)
+            the name of the event to send the message as
+        """
+        self.add(self.json_path(figid), figure_json, "application/json")
+        self.Handler.routes[self.events_path(figid)].publish(patch, event)
+
+    @staticmethod
+    def json_path(figid):
+        """Return the path at which the JSON of a figure is served"""
+        return '/fig{0}.json'.format(figid)
+
+    @staticmethod
+    def tiles_path(figid, key):
+        """Return the path under which a set of image tiles is served"""
+        return '/fig{0}/tiles/{1}'.format(figid, key)
+
+    @staticmethod
+    def events_path(figid):
+        """Return the path of the stream of updates to a figure"""
+        return '/fig{0}/events'.format(figid)
+
+    def wait(self):
+        """Block until interrupted with Ctrl-C
+
+        The server keeps running in the background afterwards.
+        """
+        try:
+            while self.thread.is_alive():
+                self.thread.join(1)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+
+    def shutdown(self):
+        """Stop the server"""
+        for payload in list(self.Handler.routes.values()):
+            if isinstance(payload, EventStream):
+                payload.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_FIGURE_SERVER = None
+_FIGURE_SERVER_LOCK = threading.Lock()
+
+
+def get_figure_server(ip='127.0.0.1', port=8888, n_retries=50, files=None):
+    """Return the FigureServer of this process, starting it if needed
+
+    The arguments are used only when the server is started; later calls
+    return the running server unchanged.
+    """
+    global _FIGURE_SERVER
+    with _FIGURE_SERVER_LOCK:
+        if _FIGURE_SERVER is None:
+            _FIGURE_SERVER = FigureServer(ip, port, n_retries, files)
+        return _FIGURE_SERVER
@@ -0,0 +1,209 @@
+"""
+Timings and size statistics of figure exports: see export_stats()
+"""
+import json
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+from .utils import ELEMENT_LISTS
+
+
+# Stack of the ExportStats of the active export_stats() blocks
+_STATS = []
+
+
+class ExportStats(object):
+    """Timings and size statistics collected by :func:`export_stats`
+
+    Attributes
+    ----------
+    timings : dict
+        The total time in seconds spent in each stage of the exports:
+        - "crawl"       : crawling the figure with mplexporter, which
+                          includes "add_data" and "encode_data".
+        - "add_data"    : adding datasets to the figure, including the
+                          search for duplicate columns.
+        - "encode_data" : converting datasets to lists or base64 strings.
+        - "json"        : serializing the figure JSON.  When writing to a
+                          file (save_html, save_json), datasets are encoded
+                          as they are written, and counted here.
+        - "template"    : rendering the html templates with jinja2.
+    calls : dict
+        The number of times each stage was run.
+    figures : list
+        One dict per exported figure, with keys
+        - "id"            : the id of the figure.
+        - "bytes"         : the length of the figure JSON.
+        - "data_bytes"    : the length of the JSON of the datasets.
+        - "datasets"      : {label: {"rows": n, "bytes": n}} for each
+                            dataset.
+        - "dedup_hits"    : the number of datasets added which reused an
+                            existing dataset.
+        - "dedup_columns" : the number of columns shared with an existing
+                            dataset rather than stored again.
+        - "axes"          : one dict per axes, with keys "id", "vertices",
+                            "bytes" and "elements": a list of dicts with the
+                            "type" (e.g. "lines"), "id", number of
+                            "vertices" (dataset rows and path vertices) and
+                            "bytes" (the length of the element JSON, not
+                            including its datasets) of each element.
+    """
+    def __init__(self):
+        self.timings = {}
+        self.calls = {}
+        self.figures = []
+
+    def add_time(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def add_figure(self, renderer, figure_json):
+        """Record the sizes of a figure exported by an MPLD3Renderer
+
+        The sizes of the datasets are those of their JSON once encoded, in
+        the data format of the renderer.
+        """
+        rows = {}
+        datasets = {}
+        for i, columns in enumerate(renderer.datasets):
+            label = renderer.datalabel(i + 1)
+            rows[label] = len(columns[0]) if columns else 0
+            nbytes = sum(len(text) for text in
+                         renderer.iter_data_json(columns))
+            datasets[label] = {"rows": rows[label], "bytes": nbytes}
+
+        # the length of json.dumps(figure_json), computed without encoding
+        # the datasets again
+        data_bytes = len("{}") + sum(len(json.dumps(label)) + len(": ")
+                                     + dataset["bytes"]
+                                     for (label, dataset) in datasets.items())
+        data_bytes += len(", ") * max(0, len(datasets) - 1)
+        props_bytes = len(json.dumps(dict(figure_json, data={})))
+
+        geometry = figure_json.get("geometry", {})
+        axes = []
+        for ax in figure_json["axes"]:
+            elements = []
+            for key in ELEMENT_LISTS:
+                for element in ax.get(key, []):
+                    elements.append({
+                        "type": key,
+                        "id": element.get("id"),
+                        "vertices": element_vertices(element, rows, geometry),
+                        "bytes": len(json.dumps(element))})
+            axes.append({"id": ax.get("id"),
+                         "vertices": sum(el["vertices"] for el in elements),
+                         "bytes": len(json.dumps(ax)),
+                         "elements": elements})
+
+        self.figures.append({"id": figure_json.get("id"),
+                             "bytes": props_bytes - len("{}") + data_bytes,
+                             "data_bytes": data_bytes,
+                             "datasets": datasets,
+                             "dedup_hits": renderer.dedup_hits,
+                             "dedup_columns": renderer.dedup_columns,
+                             "axes": axes})
+
+    def as_dict(self):
+        """Return the statistics as a dict of plain, JSON-serializable types"""
+        return {"timings": dict(self.timings),
+                "calls": dict(self.calls),
+                "figures": list(self.figures)}
+
+    def summary(self):
+        """Return a short text report of the timings and sizes"""
+        lines = ["{0:<12s} {1:>10.4f} s  ({2} calls)"
+                 .format(stage, self.timings[stage], self.calls[stage])
+                 for stage in sorted(self.timings)]
+        for fig in self.figures:
+            lines.append("figure {0}: {1} bytes ({2} bytes of data), "
+                         "{3} duplicate datasets"
+                         .format(fig["id"], fig["bytes"], fig["data_bytes"],
+                                 fig["dedup_hits"]))
+            for ax in fig["axes"]:
+                lines.append("  axes {0}: {1} vertices, {2} bytes"
+                             .format(ax["id"], ax["vertices"], ax["bytes"]))
+                for el in ax["elements"]:
+                    lines.append("    {0} {1}: {2} vertices, {3} bytes"
+                                 .format(el["type"], el["id"],
+                                         el["vertices"], el["bytes"]))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return "<ExportStats: {0} figures>".format(len(self.figures))
+
+
+def element_vertices(element, rows, geometry):
+    """Count the dataset rows and path vertices drawn by an element"""
+    labels = [element.get("data"), element.get("offsets")]
+    labels += [level["data"] for level in element.get("lod", [])]
+    count = sum(rows.get(label, 0) for label in labels
+                if isinstance(label, str))
+    # the paths of collections, inline or in the figure geometry table
+    for path in element.get("paths", []):
+        if isinstance(path, str):
+            path = geometry[path]
+        count += len(path[0])
+    return count
+
+
+def current_stats():
+    """Return the ExportStats of the innermost export_stats() block, or None"""
+    return _STATS[-1] if _STATS else None
+
+
+@contextmanager
+def export_stats():
+    """Context manager collecting timings and sizes of figure exports
+
+    The figures exported within the block by any of the mpld3 export
+    functions (fig_to_dict, fig_to_html, save_html, ...) are recorded in the
+    :class:`ExportStats` object it yields.  Collecting the sizes costs
+    an additional serialization of the figure datasets, but nothing is
+    recorded outside of export_stats() blocks.  Figures exported in worker
+    processes by export_many are not recorded.
+
+    Examples
+    --------
+    >>> with export_stats() as stats:
+    ...     html = fig_to_html(fig)
+    >>> print(stats.summary())
+    >>> record = stats.as_dict()
+    """
+    stats = ExportStats()
+    _STATS.append(stats)
+    try:
+        yield stats
+    finally:
+        _STATS.remove(stats)
+
+
+class timed(object):
+    """Time a stage of the export, as a context manager or a decorator
+
+    The time is added to the innermost export_stats() block, if any.  The
+    start times are kept per thread, as decorated functions may run at the
+    same time in several threads (e.g. in the server thread of show()).
+    """
+    def __init__(self, stage):
+        self.stage = stage
+        self.local = threading.local()
+
+    def __enter__(self):
+        if not hasattr(self.local, "start"):
+            self.local.start = []
+        self.local.start.append(time.time() if _STATS else None)
+
+    def __exit__(self, *exc_info):
+        start = self.local.start.pop()
+        if start is not None and _STATS:
+            _STATS[-1].add_time(self.stage, time.time() - start)
+
+    def __call__(self, func):
+        @wraps(func)
+        def new_func(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return new_func
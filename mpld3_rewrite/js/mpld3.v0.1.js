@@ -14,8 +14,16 @@
     var mpld3 = {
 	version: "0.1",
 	figures: [],
+	element_map: {},
 	plugin_map: {},
-	register_plugin: function(name, obj){mpld3.plugin_map[name] = obj;}
+	shared_data: {},
+	// number of decimals of the screen coordinates in the svg paths
+	// and transforms of elements (null for full precision)
+	path_precision: 2,
+	register_plugin: function(name, obj){mpld3.plugin_map[name] = obj;},
+	register_data: function(data){
+	    for(var key in data){mpld3.shared_data[key] = data[key];}
+	}
     };
     
     /* Figure object: */
@@ -30,6 +38,7 @@
 	
 	var required = ["width", "height"];
 	var defaults = {data:{},
+			geometry:{},
 			axes:[],
 			plugins:[],
 			toolbar:["reset", "move"],
@@ -37,9 +46,17 @@
 		       };
 	this.prop = mpld3.process_props(this, prop, defaults, required);
 	
+	// map of ids to the figure, its axes and their elements, filled as
+	// they are constructed: see get_element()
+	this.element_map = {};
+	this.register_element(this);
+	
 	this.width = this.prop.width;
 	this.height = this.prop.height;
 	this.data = this.prop.data;
+	this.geometry = this.prop.geometry;
+	// svg path strings of the geometries, built on first use
+	this.path_cache = {};
 
 	this.toolbar = new mpld3.Toolbar(this, this.prop.toolbar);
 	
@@ -55,6 +72,46 @@
 	}
     };
     
+    // Make obj available to mpld3.get_element() by its id.  Ids are looked
+    // up in this figure first; in the global map, the first figure to
+    // register an id takes precedence.
+    mpld3.Figure.prototype.register_element = function(obj){
+	var id = obj.prop.id;
+	if(id === null || typeof(id) === "undefined"){
+	    return;
+	}
+	if(!this.element_map.hasOwnProperty(id)){
+	    this.element_map[id] = obj;
+	}
+	if(!mpld3.element_map.hasOwnProperty(id)){
+	    mpld3.element_map[id] = obj;
+	}
+    };
+    
+    // Remove the figure from the page, and its objects from the registry
+    mpld3.Figure.prototype.remove = function(){
+	var index = mpld3.figures.indexOf(this);
+	if(index >= 0){
+	    mpld3.figures.splice(index, 1);
+	}
+	
+	for(var id in this.element_map){
+	    if(mpld3.element_map[id] !== this.element_map[id]){
+		continue;
+	    }
+	    delete mpld3.element_map[id];
+	    // another figure may have registered the same id
+	    for(var i=0; i<mpld3.figures.length; i++){
+		if(mpld3.figures[i].element_map.hasOwnProperty(id)){
+		    mpld3.element_map[id] = mpld3.figures[i].element_map[id];
+		    break;
+		}
+	    }
+	}
+	this.element_map = {};
+	this.root.remove();
+    };
+    
     mpld3.Figure.prototype.add_plugin = function(plug, props){
 	if(plug in mpld3.plugin_map) plug = mpld3.plugin_map[plug];
 	this.plugins.push(new plug(this, props));
@@ -126,16 +183,149 @@
 	}
     };
     
+    // Return a dataset of the figure, by label, as an mpld3.ColumnData.
+    // Datasets are converted from their JSON encoding once, on first use;
+    // data given inline rather than by label is converted on each call.
     mpld3.Figure.prototype.get_data = function(data){
 	if(data === null || typeof(data) === "undefined"){
 	    return null;
-	}else if(typeof(data) === "string"){
-	    return this.data[data];
-	}else{
-	    return data;
+	}else if(typeof(data) !== "string"){
+	    return mpld3.decode_data(data);
+	}
+	var dataset = this.data[data];
+	// datasets shared between figures are stored in mpld3.shared_data
+	if(dataset !== null && typeof(dataset) === "object"
+	   && "shared" in dataset){
+	    var key = dataset.shared;
+	    dataset = mpld3.shared_data[key];
+	    if(typeof(dataset) === "undefined"){
+		throw "shared dataset " + key + " is not registered";
+	    }
+	    dataset = mpld3.shared_data[key] = mpld3.decode_data(dataset);
 	}
+	return this.data[data] = mpld3.decode_data(dataset);
     }
     
+    // Return the [vertices, pathcodes] of a path geometry, given either its
+    // label in the figure "geometry" table or the pair itself.
+    mpld3.Figure.prototype.get_geometry = function(geometry){
+	if(typeof(geometry) !== "string"){
+	    return geometry;
+	}
+	if(!this.geometry.hasOwnProperty(geometry)){
+	    throw "geometry " + geometry + " is not defined";
+	}
+	return this.geometry[geometry];
+    };
+    
+    // Return the svg path string of a geometry (see get_geometry) in the
+    // given coordinates (default: display).  Geometries are shared between
+    // elements, and their path strings in display coordinates do not depend
+    // on the zoom: these are built once, and cached by label.  Coordinates
+    // are given with the number of decimals precision (default:
+    // mpld3.path_precision).
+    mpld3.Figure.prototype.get_path = function(geometry, coords, precision){
+	if(typeof(precision) === "undefined"){
+	    precision = mpld3.path_precision;
+	}
+	var cached = (typeof(geometry) === "string"
+		      && (typeof(coords) === "undefined"
+			  || coords.trans === "display"));
+	var key = geometry + ":" + precision;
+	if(cached && this.path_cache.hasOwnProperty(key)){
+	    return this.path_cache[key];
+	}
+	
+	var path = mpld3.path().precision(precision);
+	if(typeof(coords) !== "undefined"){
+	    path.x(function(d){return coords.x(d[0]);})
+		.y(function(d){return coords.y(d[1]);});
+	}
+	var vertices = this.get_geometry(geometry);
+	var data = path.call(vertices[0], vertices[1]);
+	if(cached){
+	    this.path_cache[key] = data;
+	}
+	return data;
+    };
+    
+    // Apply an update sent by update() in python (see mpld3.listen).  The
+    // patch holds the changed datasets, element properties and axes limits,
+    // and only the elements using them are redrawn.  A patch with a
+    // "replace" entry redraws the whole figure instead.  Returns the figure
+    // showing the update.
+    mpld3.Figure.prototype.apply_patch = function(patch){
+	if("replace" in patch){
+	    this.remove();
+	    return mpld3.draw_figure(this.figid, patch.replace);
+	}
+	
+	var data = patch.data || {};
+	var geometry = patch.geometry || {};
+	var props = patch.elements || {};
+	var limits = patch.axes || {};
+	for(var label in data){
+	    this.data[label] = data[label];
+	}
+	for(var label in geometry){
+	    this.geometry[label] = geometry[label];
+	}
+	// cached paths are keyed by "label:precision"
+	for(var key in this.path_cache){
+	    if(geometry.hasOwnProperty(key.slice(0, key.lastIndexOf(":")))){
+		delete this.path_cache[key];
+	    }
+	}
+	
+	for(var i=0; i<this.axes.length; i++){
+	    var ax = this.axes[i];
+	    var rescaled = limits.hasOwnProperty(ax.prop.id);
+	    if(rescaled){
+		ax.set_limits(limits[ax.prop.id]);
+	    }
+	    for(var j=0; j<ax.elements.length; j++){
+		var el = ax.elements[j];
+		if(props.hasOwnProperty(el.prop.id)){
+		    ax.replace_element(el, props[el.prop.id]);
+		}else if(mpld3.uses_data(el, data)
+			 || mpld3.uses_geometry(el, geometry)){
+		    ax.replace_element(el, el.prop);
+		}
+	    }
+	    if(rescaled){
+		ax.redraw();
+	    }
+	}
+	return this;
+    };
+    
+    // Append rows to the dataset with the given label, sent by append_data()
+    // in python.  If max_rows is given, the oldest rows are dropped to keep
+    // at most max_rows.  The dataset is extended in place, and the elements
+    // using it are redrawn.
+    mpld3.Figure.prototype.append_data = function(label, rows, max_rows){
+	var dataset = this.get_data(label);
+	dataset.append(rows, max_rows);
+	
+	var datasets = {};
+	datasets[label] = dataset;
+	for(var i=0; i<this.axes.length; i++){
+	    var ax = this.axes[i];
+	    for(var j=0; j<ax.elements.length; j++){
+		var el = ax.elements[j];
+		if(!mpld3.uses_data(el, datasets)){
+		    continue;
+		}
+		if(typeof(el.refresh) === "function"){
+		    el.refresh();
+		}else{
+		    ax.replace_element(el, el.prop);
+		}
+		ax.quadtrees = {};
+	    }
+	}
+    };
+    
     
     /* Toolbar Object: */
     mpld3.Toolbar = function(fig, prop){
@@ -256,6 +446,7 @@
 	    this.ax = ax;
 	    this.fig = ax.fig;
 	}
+	this.trans = trans;
 	this.x = this["x_" + trans];
 	this.y = this["y_" + trans];
 	if(typeof(this.x) === "undefined" || typeof(this.y) === "undefined"){
@@ -320,6 +511,7 @@
 	this.sharey = [];
 	
 	this.elements = [];
+	this.axis_elements = [];
 	
 	var bbox = this.prop.bbox;
 	this.position = [bbox[0] * this.fig.width,
@@ -386,6 +578,7 @@
 	for(var i=0; i<axes.length; i++){
 	    var axis = new mpld3.Axis(this, axes[i])
 	    this.elements.push(axis);
+	    this.axis_elements.push(axis);
 	    if(this.prop.gridOn || axis.prop.grid.gridOn){
 		this.elements.push(axis.getGrid());
 	    }
@@ -434,6 +627,12 @@
 	
 	// Sort all elements by zorder
 	this.elements.sort(function(a,b){return a.prop.zorder-b.prop.zorder});
+	
+	// Register the axes and its elements for lookup by id
+	this.fig.register_element(this);
+	for(var i=0; i<this.elements.length; i++){
+	    this.fig.register_element(this.elements[i]);
+	}
     }
     
     mpld3.Axes.prototype.draw = function(){
@@ -485,6 +684,188 @@
 	}
     };
     
+    // Add an html canvas covering the axes, for elements drawn with the
+    // canvas backend.  The canvas lies within the clipped axes group, so it
+    // keeps its place in the zorder; mouse events pass through it to the
+    // axes background, so that zooming still works.
+    mpld3.Axes.prototype.add_canvas = function(){
+	var ratio = window.devicePixelRatio || 1;
+	var canvas = this.axes.append("foreignObject")
+	    .attr("width", this.width)
+	    .attr("height", this.height)
+	    .style("pointer-events", "none")
+	  .append("xhtml:canvas")
+	    .attr("width", this.width * ratio)
+	    .attr("height", this.height * ratio)
+	    .style("width", this.width + "px")
+	    .style("height", this.height + "px");
+	var context = canvas.node().getContext("2d");
+	context.ratio = ratio;
+	return context;
+    };
+    
+    // Hit testing: the screen positions of point-like elements (markers
+    // and collections) are indexed in a quadtree, which is built when it is
+    // first needed and discarded whenever the axes are zoomed.
+    mpld3.Axes.prototype.quadtree = function(obj){
+	this.quadtrees = this.quadtrees || {};
+	var tree = this.quadtrees[obj.prop.id];
+	if(typeof(tree) === "undefined"){
+	    var points = obj.points().filter(function(p){
+		return isFinite(p[0]) && isFinite(p[1]);
+	    });
+	    tree = (points.length > 0) ? d3.geom.quadtree()(points) : null;
+	    this.quadtrees[obj.prop.id] = tree;
+	}
+	return tree;
+    };
+    
+    // Find the point of obj nearest to the screen position (x, y) within the
+    // axes.  Returns {d, i, dist} for the [x, y, k, i] entry of obj.points(),
+    // with d = obj.datum(k), or null if there is no point within radius.
+    mpld3.Axes.prototype.nearest_point = function(obj, x, y, radius){
+	var tree = this.quadtree(obj);
+	var best = null, bestdist = radius * radius;
+	if(tree === null){
+	    return null;
+	}
+	tree.visit(function(node, x1, y1, x2, y2){
+	    var p = node.point;
+	    if(p){
+		var dx = p[0] - x, dy = p[1] - y;
+		if(dx * dx + dy * dy <= bestdist){
+		    best = p;
+		    bestdist = dx * dx + dy * dy;
+		}
+	    }
+	    // skip the children if the node lies further than the best point
+	    var bx = Math.max(x1 - x, 0, x - x2);
+	    var by = Math.max(y1 - y, 0, y - y2);
+	    return bx * bx + by * by > bestdist;
+	});
+	return (best === null) ? null : {d: obj.datum(best[2]), i: best[3],
+					 dist: Math.sqrt(bestdist)};
+    };
+    
+    // Call over(d, i) when the mouse comes to a point of obj, move(d, i) as
+    // it moves, and out(d, i) when it leaves, where d = obj.datum(k) for the
+    // data row k of the point, and i is the index of the point.  obj must
+    // have a hit_test() method.  A single listener on the axes serves all
+    // registered elements, whether drawn as svg or on a canvas (which has
+    // no elements to listen to): the point under the mouse is the nearest
+    // one among all of them.  This also keeps the number of listeners
+    // independent of the number of points.
+    mpld3.Axes.prototype.on_hover = function(obj, over, move, out){
+	if(typeof(this.hover_targets) === "undefined"){
+	    this.hover_targets = [];
+	    this.hover_active = null;
+	    this.axes
+		.on("mousemove.hover", this.hover_move.bind(this))
+		.on("mouseout.hover", function(){
+		    var to = d3.event.relatedTarget;
+		    if(!to || !this.axes.node().contains(to)){
+			this.hover_leave();
+		    }
+		}.bind(this));
+	}
+	this.hover_targets.push({obj: obj, over: over,
+				 move: move, out: out});
+    };
+    
+    mpld3.Axes.prototype.hover_move = function(){
+	var pos = d3.mouse(this.axes.node());
+	var hit = null, target = null;
+	for(var i=0; i<this.hover_targets.length; i++){
+	    var h = this.hover_targets[i].obj.hit_test(pos[0], pos[1]);
+	    if(h !== null && (hit === null || h.dist < hit.dist)){
+		hit = h;
+		target = this.hover_targets[i];
+	    }
+	}
+	
+	var active = this.hover_active;
+	if(active !== null && (hit === null || active.target !== target
+			       || active.i !== hit.i)){
+	    this.hover_leave();
+	}
+	if(hit !== null){
+	    if(this.hover_active === null){
+		target.over(hit.d, hit.i);
+		this.hover_active = {target: target, d: hit.d, i: hit.i};
+	    }
+	    target.move(hit.d, hit.i);
+	}
+    };
+    
+    mpld3.Axes.prototype.hover_leave = function(){
+	var active = this.hover_active;
+	if(active !== null){
+	    this.hover_active = null;
+	    active.target.out(active.d, active.i);
+	}
+    };
+    
+    // Set new limits (and domains) of the axes, as sent by apply_patch(),
+    // and reset the zoom to show them.  limits may also hold new tick
+    // properties of each axis, as an "axes" list.  The elements are updated
+    // by redraw().
+    mpld3.Axes.prototype.set_limits = function(limits){
+	for(var key in limits){
+	    this.prop[key] = limits[key];
+	}
+	if(limits.hasOwnProperty("axes")){
+	    for(var i=0; i<this.axis_elements.length; i++){
+		this.axis_elements[i].set_ticks(limits.axes[i]);
+	    }
+	}
+	this.xdom.domain(this.prop.xdomain);
+	this.ydom.domain(this.prop.ydomain);
+	if(typeof(this.zoom) !== "undefined"){
+	    this.finalize_reset();
+	    this.zoom_x.x(this.xdom);
+	    this.zoom_y.y(this.ydom);
+	}
+	this.quadtrees = {};
+    };
+    
+    // Replace the element old by a new element of the same type with the
+    // given properties, drawn at the same place in the zorder.  Plugins
+    // which hold the svg nodes of the old element are not updated, except
+    // for the hover handlers registered with on_hover().
+    mpld3.Axes.prototype.replace_element = function(old, prop){
+	var el = new old.constructor(this, prop);
+	var node = mpld3.element_node(old);
+	el.draw();
+	var new_node = mpld3.element_node(el);
+	if(node !== null){
+	    if(new_node !== null){
+		node.parentNode.insertBefore(new_node, node);
+	    }
+	    node.parentNode.removeChild(node);
+	}
+	
+	this.elements[this.elements.indexOf(old)] = el;
+	delete this.zoom_elements;
+	this.quadtrees = {};
+	
+	var id = el.prop.id;
+	if(this.fig.element_map[id] === old){
+	    this.fig.element_map[id] = el;
+	}
+	if(mpld3.element_map[id] === old){
+	    mpld3.element_map[id] = el;
+	}
+	if(typeof(this.hover_targets) !== "undefined"){
+	    for(var i=0; i<this.hover_targets.length; i++){
+		if(this.hover_targets[i].obj === old){
+		    this.hover_targets[i].obj = el;
+		}
+	    }
+	    this.hover_active = null;
+	}
+	return el;
+    };
+    
     mpld3.Axes.prototype.enable_zoom = function(){
 	if(this.prop.zoomable){
 	    this.zoom.on("zoom", this.zoomed.bind(this));
@@ -533,7 +914,7 @@
 		this.sharey[i].zoom_y.scale(this.zoom_y.scale());
             }
 	    
-            // render updates
+            // schedule updates of the shared axes
             for(var i=0; i<this.sharex.length; i++){
 		this.sharex[i].zoomed(false);
             }
@@ -542,8 +923,22 @@
             }
 	}
 	
-	for(var i=0; i<this.elements.length; i++){
-            this.elements[i].zoomed();
+	// screen positions have changed: discard the hit-testing indices
+	this.quadtrees = {};
+	
+	// elements are redrawn once per animation frame, however many zoom
+	// events (of this axes or of shared axes) occur before it
+	mpld3.scheduler.request(this);
+    };
+    
+    // Redraw the elements which depend on the zoom: called by the frame
+    // scheduler after the axes were zoomed.
+    mpld3.Axes.prototype.redraw = function(){
+	if(typeof(this.zoom_elements) === "undefined"){
+	    this.zoom_elements = this.elements.filter(mpld3.is_zoomable);
+	}
+	for(var i=0; i<this.zoom_elements.length; i++){
+            this.zoom_elements[i].zoomed();
 	}
     };
     
@@ -638,7 +1033,32 @@
 		gridprop[key] = this.prop.grid[key];
 	    }
 	}
-	return new mpld3.Grid(this.axes, gridprop);
+	this.gridobj = new mpld3.Grid(this.axes, gridprop);
+	return this.gridobj;
+    };
+    
+    // Update the ticks of the axis, and of its grid, from the nticks,
+    // tickvalues and tickformat of prop.  They are drawn by zoomed().
+    mpld3.Axis.prototype.set_ticks = function(prop){
+	var keys = ["nticks", "tickvalues", "tickformat"];
+	for(var i=0; i<keys.length; i++){
+	    if(prop.hasOwnProperty(keys[i])){
+		this.prop[keys[i]] = prop[keys[i]];
+	    }
+	}
+	if(typeof(this.axis) !== "undefined"){
+	    this.axis.ticks(this.prop.nticks)
+		.tickValues(this.prop.tickvalues)
+		.tickFormat(this.prop.tickformat);
+	}
+	if(typeof(this.gridobj) !== "undefined"){
+	    this.gridobj.prop.nticks = this.prop.nticks;
+	    this.gridobj.prop.tickvalues = this.prop.tickvalues;
+	    if(typeof(this.gridobj.grid) !== "undefined"){
+		this.gridobj.grid.ticks(this.prop.nticks)
+		    .tickValues(this.prop.tickvalues);
+	    }
+	}
     };
     
     mpld3.Axis.prototype.draw = function(){
@@ -752,44 +1172,146 @@
 			dasharray: "10,0",
 			alpha: 1.0,
 			zorder: 2,
+			decimation: null,
+			lod: [],
+			xsorted: false,
 			id: mpld3.generate_id()};
 	
 	this.prop = mpld3.process_props(this, prop, defaults, required);
-	this.data = ax.fig.get_data(this.prop.data);
 	this.coords = new mpld3.Coordinates(this.prop.coordinates, this.ax);
+	
+	// lod is a list of decimated versions of the data, from coarse to
+	// fine: the data is loaded for the level currently displayed.
+	this.lod = this.prop.lod;
+	this.level = undefined;
+	this.select_level();
+    };
+    
+    mpld3.Line.prototype.select_level = function(){
+	// Use the coarsest level which has at least one bucket per pixel
+	// at the current x zoom, or the full data if there is none.
+	var scale = (typeof(this.ax.zoom_x) === "undefined") ? 1
+	    : this.ax.zoom_x.scale();
+	var level = null;
+	for(var i=0; i<this.lod.length; i++){
+	    if(this.lod[i].buckets >= scale * this.ax.width){
+		level = this.lod[i];
+		break;
+	    }
+	}
+	if(level === this.level){
+	    return;
+	}
+	this.level = level;
+	var spec = (level === null) ? this.prop : level;
+	this.data = this.ax.fig.get_data(spec.data);
+	this.xindex = spec.xindex;
+	this.yindex = spec.yindex;
+	this.xdata = this.data.column(this.xindex);
+	this.ydata = this.data.column(this.yindex);
+	this.xsorted = spec.xsorted || false;
+    };
+    
+    // The [start, stop) range of the rows of the data which are within the
+    // visible x range, plus one row on each side so that the line runs on
+    // to the edge of the axes.  This needs the data to be sorted by x (as
+    // flagged on export): the visible range is then found by binary search.
+    mpld3.Line.prototype.visible_range = function(){
+	var N = this.data.length, xdata = this.xdata, coords = this.coords;
+	if(!this.xsorted || !coords.zoomable || N < 3){
+	    return [0, N];
+	}
+	
+	// screen x along the direction of increasing data x, which is
+	// reversed if the x limits are
+	var first = coords.x(xdata(0));
+	var last = coords.x(xdata(N - 1));
+	if(isNaN(first) || isNaN(last)){
+	    return [0, N];
+	}
+	var sign = (first <= last) ? 1 : -1;
+	var lower = (sign > 0) ? 0 : -this.ax.width;
+	var upper = (sign > 0) ? this.ax.width : 0;
+	function pos(i){return sign * coords.x(xdata(i));}
+	
+	var start = mpld3.bisect(N, function(i){return pos(i) < lower;});
+	var stop = mpld3.bisect(N, function(i){return pos(i) <= upper;});
+	return [Math.max(0, start - 1), Math.min(N, stop + 1)];
+    };
+    
+    // Whether row i of the data has finite coordinates
+    mpld3.Line.prototype.filter = function(i){
+	return (!isNaN(this.xdata(i))
+		&& !isNaN(this.ydata(i)));
     };
     
-    mpld3.Line.prototype.filter = function(d){
-	return (!isNaN(d[this.prop.xindex])
-		&& !isNaN(d[this.prop.yindex]));
+    // The row of the data nearest to the screen position (x, y) within the
+    // axes, among the visible finite points, or null.  The line is a single
+    // svg path, with no datum bound per point: hover handlers (e.g. the
+    // tooltip plugin) use this to find the point under the mouse.
+    mpld3.Line.prototype.nearest_datum = function(x, y){
+	var range = this.visible_range();
+	var best = -1, bestdist = Infinity;
+	for(var i=range[0]; i<range[1]; i++){
+	    if(!this.filter(i)){
+		continue;
+	    }
+	    var dx = this.coords.x(this.xdata(i)) - x;
+	    var dy = this.coords.y(this.ydata(i)) - y;
+	    if(dx * dx + dy * dy < bestdist){
+		best = i;
+		bestdist = dx * dx + dy * dy;
+	    }
+	}
+	return (best < 0) ? null : this.data.row(best);
+    };
+    
+    // The svg path data of the visible part of the line
+    mpld3.Line.prototype.path_data = function(){
+	var range = this.visible_range();
+	return this.datafunc(d3.range(range[0], range[1]));
     };
     
     mpld3.Line.prototype.draw = function(){
-	this.datafunc = d3.svg.line()
-            .interpolate("linear")
-            .defined(this.filter.bind(this))
-	    .x(function(d){return this.coords.x(d[this.prop.xindex]);})
-	    .y(function(d){return this.coords.y(d[this.prop.yindex]);});
+	this.datafunc = mpld3.path()
+	    .defined(this.filter)
+	    .precision(mpld3.path_precision)
+	    .x(function(i){return this.coords.x(this.xdata(i));})
+	    .y(function(i){return this.coords.y(this.ydata(i));});
 	
+	this.select_level();
 	this.line = this.ax.axes.append("svg:path")
-	    .data(this.data)
-            .attr('class', 'mpld3-line')
+	    .attr('class', 'mpld3-line')
 	    .style("stroke", this.prop.color)
 	    .style("stroke-width", this.prop.linewidth)
 	    .style("stroke-dasharray", this.prop.dasharray)
 	    .style("stroke-opacity", this.prop.alpha)
 	    .style("fill", "none");
 
-	this.line.attr("d", this.datafunc(this.data));
+	this.line.attr("d", this.path_data());
     }
     
     mpld3.Line.prototype.elements = function(d){
 	return this.line;
     };
     
+    // Redraw the line after rows were appended to its data.  Decimated
+    // levels of detail no longer match the data, so are dropped; the data
+    // is only culled to the visible range while it stays sorted by x.
+    mpld3.Line.prototype.refresh = function(){
+	this.lod = [];
+	this.level = undefined;
+	this.select_level();
+	if(this.xsorted && !mpld3.is_sorted(this.xdata, this.data.length)){
+	    this.xsorted = this.prop.xsorted = false;
+	}
+	this.line.attr("d", this.path_data());
+    };
+    
     mpld3.Line.prototype.zoomed = function(){
 	if(this.coords.zoomable){
-	    this.line.attr("d", this.datafunc(this.data));
+	    this.select_level();
+	    this.line.attr("d", this.path_data());
 	}
     }
     
@@ -816,6 +1338,8 @@
 	
 	this.prop = mpld3.process_props(this, prop, defaults, required);
 	this.data = ax.fig.get_data(this.prop.data);
+	this.xdata = this.data.column(this.prop.xindex);
+	this.ydata = this.data.column(this.prop.yindex);
 	this.pathcodes = this.prop.pathcodes;
 	
 	this.pathcoords = new mpld3.Coordinates(this.prop.coordinates,
@@ -825,12 +1349,15 @@
     };
     
     mpld3.Path.prototype.draw = function(){
+	// the vertices are given to the path generator as row indices
 	this.datafunc = mpld3.path()
-	    .x(function(d){return this.pathcoords.x(d[this.prop.xindex]);})
-	    .y(function(d){return this.pathcoords.y(d[this.prop.yindex]);});
+	    .precision(mpld3.path_precision)
+	    .x(function(i){return this.pathcoords.x(this.xdata(i));})
+	    .y(function(i){return this.pathcoords.y(this.ydata(i));});
 
 	this.path = this.ax.axes.append("svg:path")
-            .attr("d", this.datafunc(this.data, this.pathcodes))
+            .attr("d", this.datafunc(d3.range(this.data.length),
+				     this.pathcodes))
             .attr('class', "mpld3-path")
 	    .style("stroke", this.prop.edgecolor)
 	    .style("stroke-width", this.prop.edgewidth)
@@ -853,7 +1380,8 @@
     
     mpld3.Path.prototype.zoomed = function(){
 	if(this.prop.coordinates === "data"){
-	    this.path.attr("d", this.datafunc(this.data, this.pathcodes));
+	    this.path.attr("d", this.datafunc(d3.range(this.data.length),
+					      this.pathcodes));
 	}
 	if(this.prop.offset !== null && this.prop.offsetcoordinates === "data"){
 	    var offset = [this.ax.x(this.prop.offset[0]),
@@ -883,11 +1411,13 @@
 			id: mpld3.generate_id()};
 	this.prop = mpld3.process_props(this, prop, defaults, required);
 	this.data = ax.fig.get_data(this.prop.data);
+	this.xdata = this.data.column(this.prop.xindex);
+	this.ydata = this.data.column(this.prop.yindex);
 	
 	if(this.prop.markerpath !== null){
-	    if(this.prop.markerpath[0].length > 0){
-		this.marker = mpld3.path().call(this.prop.markerpath[0],
-						this.prop.markerpath[1]);
+	    var markerpath = ax.fig.get_geometry(this.prop.markerpath);
+	    if(markerpath[0].length > 0){
+		this.marker = ax.fig.get_path(this.prop.markerpath);
 	    }else{
 		this.marker = null;
 	    }
@@ -900,42 +1430,152 @@
 	    }
 	}
 	this.coords = new mpld3.Coordinates(this.prop.coordinates, this.ax);
+	this.format = mpld3.fixed_format(mpld3.path_precision);
     };
     
-    mpld3.Markers.prototype.translate = function(d){
+    // The svg transform of the marker of row i of the data
+    mpld3.Markers.prototype.translate = function(i){
 	return "translate("
-	    + this.coords.x(d[this.prop.xindex]) + ","
-	    + this.coords.y(d[this.prop.yindex]) + ")";
+	    + this.format(this.coords.x(this.xdata(i))) + ","
+	    + this.format(this.coords.y(this.ydata(i))) + ")";
+    };
+    
+    // Whether row i of the data has finite coordinates
+    mpld3.Markers.prototype.filter = function(i){
+	return (!isNaN(this.xdata(i))
+		&& !isNaN(this.ydata(i)));
+    };
+    
+    // The indices of the rows of the data which have a marker
+    mpld3.Markers.prototype.indices = function(){
+	var indices = [];
+	for(var i=0; i<this.data.length; i++){
+	    if(this.filter(i)){
+		indices.push(i);
+	    }
+	}
+	return indices;
     };
     
-    mpld3.Markers.prototype.filter = function(d){
-	return (!isNaN(d[this.prop.xindex])
-		&& !isNaN(d[this.prop.yindex]));
+    // The row k of the data, given to hover handlers
+    mpld3.Markers.prototype.datum = function(k){
+	return this.data.row(k);
     };
     
     mpld3.Markers.prototype.draw = function(){
+	if(this.prop.canvas){
+	    this.context = this.ax.add_canvas();
+	    this.draw_canvas();
+	    return;
+	}
 	this.group = this.ax.axes.append("svg:g")
-	this.pointsobj = this.group.selectAll("paths")
-            .data(this.data.filter(this.filter.bind(this)))
-            .enter().append("svg:path")
+	this.refresh();
+    };
+    
+    // Draw a marker for each row of the data, reusing the existing markers:
+    // called by draw(), and after rows were appended to the data.
+    mpld3.Markers.prototype.refresh = function(){
+	if(this.prop.canvas){
+	    this.draw_canvas();
+	    return;
+	}
+	this.pointsobj = this.group.selectAll("path")
+            .data(this.indices());
+	this.pointsobj.exit().remove();
+	this.pointsobj.enter().append("svg:path")
             .attr('class', 'mpld3-marker')
             .attr("d", this.marker)
-            .attr("transform", this.translate.bind(this))
             .style("stroke-width", this.prop.edgewidth)
             .style("stroke", this.prop.edgecolor)
             .style("fill", this.prop.facecolor)
             .style("fill-opacity", this.prop.alpha)
             .style("stroke-opacity", this.prop.alpha)
             .attr("vector-effect", "non-scaling-stroke");
+	this.pointsobj.attr("transform", this.translate.bind(this));
+    };
+    
+    mpld3.Markers.prototype.draw_canvas = function(){
+	var ctx = this.context;
+	var prop = this.prop;
+	ctx.setTransform(1, 0, 0, 1, 0, 0);
+	ctx.clearRect(0, 0, ctx.canvas.width, ctx.canvas.height);
+	if(this.marker === null){
+	    return;
+	}
+	
+	var marker = new Path2D((typeof(this.marker) === "function")
+				? this.marker() : this.marker);
+	ctx.globalAlpha = prop.alpha;
+	ctx.fillStyle = prop.facecolor;
+	ctx.strokeStyle = prop.edgecolor;
+	ctx.lineWidth = prop.edgewidth;
+	
+	for(var k=0; k<this.data.length; k++){
+	    if(!this.filter(k)){
+		continue;
+	    }
+	    ctx.setTransform(ctx.ratio, 0, 0, ctx.ratio,
+			     ctx.ratio * this.coords.x(this.xdata(k)),
+			     ctx.ratio * this.coords.y(this.ydata(k)));
+	    if(prop.facecolor !== "none"){
+		ctx.fill(marker);
+	    }
+	    if(prop.edgecolor !== "none" && prop.edgewidth > 0){
+		ctx.stroke(marker);
+	    }
+	}
+    };
+    
+    // Screen positions of the markers within the axes, as a list of
+    // [x, y, k, i] where k is the index of the data row, and i the index of
+    // the marker.
+    mpld3.Markers.prototype.points = function(){
+	var indices = this.indices();
+	var points = new Array(indices.length);
+	for(var i=0; i<indices.length; i++){
+	    var k = indices[i];
+	    points[i] = [this.coords.x(this.xdata(k)),
+			 this.coords.y(this.ydata(k)), k, i];
+	}
+	return points;
+    };
+    
+    // The radius of the markers on screen: the extent of the marker path,
+    // and at least 3 pixels so that small markers can still be hovered
+    mpld3.Markers.prototype.radius = function(){
+	var radius = this.prop.markersize / 2;
+	if(this.prop.markerpath !== null){
+	    var vertices = this.ax.fig.get_geometry(this.prop.markerpath)[0];
+	    radius = 0;
+	    for(var i=0; i<vertices.length; i++){
+		radius = Math.max(radius, Math.abs(vertices[i][0]),
+				  Math.abs(vertices[i][1]));
+	    }
+	}
+	return Math.max(radius, 3);
+    };
+    
+    // Return the point nearest to the screen position (x, y) within the
+    // axes, as a {d, i, dist} object, or null if no marker is under the
+    // position.
+    mpld3.Markers.prototype.hit_test = function(x, y){
+	return this.ax.nearest_point(this, x, y, this.radius());
     };
     
     mpld3.Markers.prototype.elements = function(d){
+	if(this.prop.canvas){
+	    return d3.selectAll([]);
+	}
 	return this.group.selectAll("path");
     };
     
     mpld3.Markers.prototype.zoomed = function(){
 	if(this.coords.zoomable){
-	    this.pointsobj.attr("transform", this.translate.bind(this));
+	    if(this.prop.canvas){
+		this.draw_canvas();
+	    }else{
+		this.pointsobj.attr("transform", this.translate.bind(this));
+	    }
 	}
     };
     
@@ -969,28 +1609,60 @@
 	    this.prop.edgecolors = ["none"];
 	}
 	
-	var offsets = this.ax.fig.get_data(this.prop.offsets);
-	if(offsets === null || offsets.length === 0){
-	    offsets = [null];
+	this.offsets = this.ax.fig.get_data(this.prop.offsets);
+	if(this.offsets !== null && this.offsets.length > 0){
+	    this.xoffsets = this.offsets.column(this.prop.xindex);
+	    this.yoffsets = this.offsets.column(this.prop.yindex);
+	}else{
+	    this.offsets = null;
 	}
 	
-	// For use in the draw() command, expand offsets to size N
-	var N = Math.max(this.prop.paths.length, offsets.length);
+	// the number of paths drawn: the paths and offsets are cycled over
+	this.N = Math.max(this.prop.paths.length,
+			  (this.offsets === null) ? 1 : this.offsets.length);
 	
-	this.offsets = [];
-	for(var i=0; i<N; i++){
-	    var o = offsets[i % offsets.length];
-	    this.offsets.push([o[this.prop.xindex], o[this.prop.yindex]]);
-	}
-
 	this.pathcoords = new mpld3.Coordinates(this.prop.pathcoordinates,
 						this.ax);
 	this.offsetcoords = new mpld3.Coordinates(this.prop.offsetcoordinates,
 						  this.ax);
+	
+	// The paths are scaled on screen by the path transforms: keep
+	// mpld3.path_precision decimals of the scaled coordinates.
+	this.format = mpld3.fixed_format(mpld3.path_precision);
+	this.path_precision = mpld3.path_precision;
+	if(this.path_precision !== null){
+	    var scale = 1;
+	    var t = this.prop.pathtransforms;
+	    for(var i=0; i<t.length; i++){
+		scale = Math.max(scale, Math.abs(t[i][0]), Math.abs(t[i][1]),
+				 Math.abs(t[i][2]), Math.abs(t[i][3]));
+	    }
+	    this.path_precision += Math.ceil(Math.log(scale) / Math.LN10);
+	}
     };
     
+    // The screen position of the offset of path i, or null if there is none
+    mpld3.PathCollection.prototype.offset = function(i){
+	if(this.offsets === null){
+	    return null;
+	}
+	var k = i % this.offsets.length;
+	return [this.offsetcoords.x(this.xoffsets(k)),
+		this.offsetcoords.y(this.yoffsets(k))];
+    };
+    
+    // The offset of path k in data (or offset) coordinates, given to hover
+    // handlers
+    mpld3.PathCollection.prototype.datum = function(k){
+	if(this.offsets === null){
+	    return null;
+	}
+	k = k % this.offsets.length;
+	return [this.xoffsets(k), this.yoffsets(k)];
+    };
+    
+    // The svg transform of path i: its offset and individual path transform
     mpld3.PathCollection.prototype.transform_func = function(d, i){
-	// here we apply the offset and the individual path transform
 	var transform;
 	var t = this.prop.pathtransforms;
 	if(t.length > 0){
@@ -1000,12 +1672,12 @@
 	    transform = "";
 	}
 	
-	var offset;
-	if(d === null || typeof(d) === "undefined"){
+	var offset = this.offset(i);
+	if(offset === null){
 	    offset = "translate(0, 0)";
 	}else{
-	    offset = ("translate(" + [this.offsetcoords.x(d[0]),
-				      this.offsetcoords.y(d[1])] +")");
+	    offset = ("translate(" + this.format(offset[0]) + ","
+		      + this.format(offset[1]) + ")");
 	}
 	
 	if(this.prop.offsetorder === "after"){
@@ -1015,13 +1687,29 @@
 	}
     };
     
+    // The transform of transform_func() as an [a, b, c, d, e, f] matrix
+    mpld3.PathCollection.prototype.transform_matrix = function(d, i){
+	var t = this.prop.pathtransforms;
+	t = (t.length > 0) ? t[i % t.length] : [1, 0, 0, 1, 0, 0];
+	
+	var offset = [1, 0, 0, 1, 0, 0];
+	var position = this.offset(i);
+	if(position !== null){
+	    offset[4] = position[0];
+	    offset[5] = position[1];
+	}
+	
+	if(this.prop.offsetorder === "after"){
+	    return mpld3.multiply_affine(t, offset);
+	}else{
+	    return mpld3.multiply_affine(offset, t);
+	}
+    };
+    
     mpld3.PathCollection.prototype.path_func = function(d, i){
-	var path = this.paths[i % this.paths.length]
-	var ret = mpld3.path()
-            .x(function(d){return this.pathcoords.x(d[0]);}.bind(this))
-            .y(function(d){return this.pathcoords.y(d[1]);}.bind(this))
-            .call(path[0], path[1]);
-	return ret;
+	var path = this.paths[i % this.paths.length];
+	return this.ax.fig.get_path(path, this.pathcoords,
+				    this.path_precision);
     };
     
     mpld3.PathCollection.prototype.style_func = function(d, i){
@@ -1039,9 +1727,14 @@
     };
     
     mpld3.PathCollection.prototype.draw = function(){
+	if(this.prop.canvas){
+	    this.context = this.ax.add_canvas();
+	    this.draw_canvas();
+	    return;
+	}
 	this.group = this.ax.axes.append("svg:g");
 	this.pathsobj = this.group.selectAll("paths")
-            .data(this.offsets)
+            .data(d3.range(this.N))
             .enter().append("svg:path")
             .attr("vector-effect", "non-scaling-stroke")
             .attr("class", "mpld3-path")
@@ -1050,11 +1743,128 @@
             .attr("transform", this.transform_func.bind(this));
     };
     
+    mpld3.PathCollection.prototype.draw_canvas = function(){
+	var ctx = this.context;
+	var prop = this.prop;
+	var get = this.get;
+	ctx.setTransform(1, 0, 0, 1, 0, 0);
+	ctx.clearRect(0, 0, ctx.canvas.width, ctx.canvas.height);
+	
+	// paths are transformed before stroking, so that the stroke width
+	// does not scale (like vector-effect: non-scaling-stroke)
+	ctx.setTransform(ctx.ratio, 0, 0, ctx.ratio, 0, 0);
+	
+	// the path of each offset only depends on its index: parse each
+	// path once, rather than once per offset
+	var shapes = [];
+	for(var i=0; i<this.paths.length; i++){
+	    shapes.push(new Path2D(this.path_func(null, i)));
+	}
+	for(var i=0; i<this.N; i++){
+	    var m = this.transform_matrix(i, i);
+	    var path = new Path2D();
+	    path.addPath(shapes[i % shapes.length],
+			 {a: m[0], b: m[1], c: m[2], d: m[3],
+			  e: m[4], f: m[5]});
+	    
+	    var facecolor = get(prop.facecolors, i, "none");
+	    var edgecolor = get(prop.edgecolors, i, "none");
+	    var edgewidth = get(prop.edgewidths, i, 1.0);
+	    ctx.globalAlpha = get(prop.alphas, i, 1.0);
+	    if(facecolor !== "none"){
+		ctx.fillStyle = facecolor;
+		ctx.fill(path);
+	    }
+	    if(edgecolor !== "none" && edgewidth > 0){
+		ctx.strokeStyle = edgecolor;
+		ctx.lineWidth = edgewidth;
+		ctx.stroke(path);
+	    }
+	}
+    };
+    
+    // Screen positions of the offsets within the axes, as a list of
+    // [x, y, k, i] where k and i are both the index of the path.
+    mpld3.PathCollection.prototype.points = function(){
+	var points = [];
+	if(this.offsets === null){
+	    return points;
+	}
+	for(var i=0; i<this.N; i++){
+	    var k = i % this.offsets.length;
+	    var x = this.xoffsets(k), y = this.yoffsets(k);
+	    if(!isNaN(x) && !isNaN(y)){
+		points.push([this.offsetcoords.x(x),
+			     this.offsetcoords.y(y), i, i]);
+	    }
+	}
+	return points;
+    };
+    
+    // The radius on screen of path i around its offset: the extent of its
+    // vertices, scaled by its path transform, and at least 3 pixels
+    mpld3.PathCollection.prototype.radius = function(i){
+	if(typeof(this.extents) === "undefined"){
+	    var coords = this.pathcoords;
+	    this.extents = this.paths.map(function(path){
+		var vertices = this.ax.fig.get_geometry(path)[0];
+		var x0 = coords.x(0), y0 = coords.y(0), extent = 0;
+		for(var j=0; j<vertices.length; j++){
+		    extent = Math.max(extent,
+				      Math.abs(coords.x(vertices[j][0]) - x0),
+				      Math.abs(coords.y(vertices[j][1]) - y0));
+		}
+		return extent;
+	    }, this);
+	}
+	var scale = 1;
+	var t = this.prop.pathtransforms;
+	if(t.length > 0){
+	    t = t[i % t.length];
+	    scale = Math.max(Math.abs(t[0]) + Math.abs(t[2]),
+			     Math.abs(t[1]) + Math.abs(t[3]));
+	}
+	return Math.max(this.extents[i % this.extents.length] * scale, 3);
+    };
+    
+    // Return the path nearest to the screen position (x, y) within the
+    // axes, as a {d, i, dist} object, or null if no path offset is close by:
+    // the nearest offset within the largest radius, if the mouse is within
+    // the radius of its own path.
+    mpld3.PathCollection.prototype.hit_test = function(x, y){
+	if(typeof(this.max_radius) === "undefined"){
+	    this.max_radius = 0;
+	    for(var i=0; i<this.N; i++){
+		this.max_radius = Math.max(this.max_radius, this.radius(i));
+	    }
+	}
+	var hit = this.ax.nearest_point(this, x, y, this.max_radius);
+	if(hit !== null && hit.dist > this.radius(hit.i)){
+	    return null;
+	}
+	return hit;
+    };
+    
     mpld3.PathCollection.prototype.elements = function(d){
+	if(this.prop.canvas){
+	    return d3.selectAll([]);
+	}
 	return this.group.selectAll("path");
     };
     
     mpld3.PathCollection.prototype.zoomed = function(){
+	if(this.prop.pathcoordinates === "data"){
+	    // the radii of the paths on screen change with the zoom
+	    delete this.extents;
+	    delete this.max_radius;
+	}
+	if(this.prop.canvas){
+	    if(this.prop.pathcoordinates === "data"
+	       || this.prop.offsetcoordinates === "data"){
+		this.draw_canvas();
+	    }
+	    return;
+	}
 	if(this.prop.pathcoordinates === "data"){
 	    this.pathsobj.attr("d", this.path_func.bind(this));
 	}
@@ -1134,37 +1944,139 @@
     };
     
     /* Image Object */
+    // If the image has tiles, it is drawn as a pyramid of levels of detail:
+    // tiles.levels lists the width, height and (except for the coarsest
+    // level, which is the image data) the tiles of each level, from coarse
+    // to fine: either the rows of base64 tiles embedded in the figure, or
+    // the "url" template, with "{row}" and "{col}" placeholders, at which
+    // the server serves them.  Only the tiles within the axes are drawn
+    // (and fetched), at the coarsest level with one image pixel per screen
+    // pixel.
     mpld3.Image = function(ax, prop){
 	this.ax = ax;
 	var required = ["data", "extent"];
 	var defaults = {alpha: 1.0,
-	 		coordinates: "data",
-	 		zorder: 1,
+			coordinates: "data",
+			format: "png",
+			tiles: null,
+			zorder: 1,
 			id: mpld3.generate_id()};
 	this.prop = mpld3.process_props(this, prop, defaults, required);
 	this.coords = new mpld3.Coordinates(this.prop.coordinates, this.ax);
     };
     
+    mpld3.Image.prototype.href = function(data){
+	return "data:image/" + this.prop.format + ";base64," + data;
+    };
+    
     mpld3.Image.prototype.draw = function(){
+	if(this.prop.tiles !== null){
+	    this.group = this.ax.axes.append("svg:g")
+		.attr('class', 'mpld3-image')
+		.style({'opacity': this.prop.alpha});
+	    this.tile_nodes = {};
+	    this.zoomed();
+	    return;
+	}
 	this.image = this.ax.axes.append("svg:image")
 	    .attr('class', 'mpld3-image')
-            .attr('xlink:href', "data:image/png;base64," + this.prop.data)
+	    .attr('xlink:href', this.href(this.prop.data))
 	    .style({'opacity': this.prop.alpha})
-            .attr("preserveAspectRatio", "none");
+	    .attr("preserveAspectRatio", "none");
 	this.zoomed();
     };
     
     mpld3.Image.prototype.elements = function(d){
+	if(this.prop.tiles !== null){
+	    return this.group.selectAll("image");
+	}
 	return d3.select(this.image);
     };
     
     mpld3.Image.prototype.zoomed = function(){
 	var extent = this.prop.extent;
+	var x0 = this.coords.x(extent[0]), x1 = this.coords.x(extent[1]);
+	var y0 = this.coords.y(extent[3]), y1 = this.coords.y(extent[2]);
+	if(this.prop.tiles !== null){
+	    this.draw_tiles(x0, x1, y0, y1);
+	    return;
+	}
 	this.image
-	    .attr("x", this.coords.x(extent[0]))
-            .attr("y", this.coords.y(extent[3]))
-            .attr("width", this.coords.x(extent[1])-this.coords.x(extent[0]))
-            .attr("height", this.coords.y(extent[2])-this.coords.y(extent[3]));
+	    .attr("x", x0)
+	    .attr("y", y0)
+	    .attr("width", x1 - x0)
+	    .attr("height", y1 - y0);
+    };
+    
+    // Draw the tiles in view, given the screen positions of the left, right,
+    // top and bottom edges of the image, and remove the others.
+    mpld3.Image.prototype.draw_tiles = function(x0, x1, y0, y1){
+	var size = this.prop.tiles.size;
+	var levels = this.prop.tiles.levels;
+	var ratio = window.devicePixelRatio || 1;
+	
+	var index = levels.length - 1;
+	for(var i=0; i<levels.length; i++){
+	    if(levels[i].width >= Math.abs(x1 - x0) * ratio
+	       && levels[i].height >= Math.abs(y1 - y0) * ratio){
+		index = i;
+		break;
+	    }
+	}
+	var level = levels[index];
+	
+	// the [start, stop) range of tiles along an image edge going from
+	// screen position s0 to s1, which lie within [0, length]
+	function tile_range(s0, s1, length, n_pixels){
+	    var f0 = -s0 / (s1 - s0), f1 = (length - s0) / (s1 - s0);
+	    var lo = Math.max(0, Math.min(f0, f1));
+	    var hi = Math.min(1, Math.max(f0, f1));
+	    if(!(lo <= hi)){
+		return [0, 0];
+	    }
+	    return [Math.floor(lo * n_pixels / size),
+		    Math.min(Math.ceil(n_pixels / size),
+			     Math.floor(hi * n_pixels / size) + 1)];
+	}
+	var cols = tile_range(x0, x1, this.ax.width, level.width);
+	var rows = tile_range(y0, y1, this.ax.height, level.height);
+	
+	var visible = {};
+	for(var r=rows[0]; r<rows[1]; r++){
+	    for(var c=cols[0]; c<cols[1]; c++){
+		var key = index + "/" + r + "/" + c;
+		visible[key] = true;
+		if(!this.tile_nodes.hasOwnProperty(key)){
+		    var href;
+		    if(level.url){
+			href = level.url.replace("{row}", r)
+			    .replace("{col}", c);
+		    }else{
+			href = this.href(level.tiles ? level.tiles[r][c]
+					 : this.prop.data);
+		    }
+		    this.tile_nodes[key] = this.group.append("svg:image")
+			.attr('xlink:href', href)
+			.attr("preserveAspectRatio", "none");
+		}
+		
+		var w = level.width, h = level.height;
+		var fx0 = c * size / w, fx1 = Math.min((c + 1) * size, w) / w;
+		var fy0 = r * size / h, fy1 = Math.min((r + 1) * size, h) / h;
+		this.tile_nodes[key]
+		    .attr("x", x0 + fx0 * (x1 - x0))
+		    .attr("y", y0 + fy0 * (y1 - y0))
+		    .attr("width", (fx1 - fx0) * (x1 - x0))
+		    .attr("height", (fy1 - fy0) * (y1 - y0));
+	    }
+	}
+	
+	for(var key in this.tile_nodes){
+	    if(!visible.hasOwnProperty(key)){
+		this.tile_nodes[key].remove();
+		delete this.tile_nodes[key];
+	    }
+	}
     };
     
     
@@ -1204,14 +2116,37 @@
 	    this.y = obj.ax.position[1] + 5 + this.prop.voffset;
 	}
 	
+	// lines decimated on export say so in the tooltip
+	var suffix = "";
+	if(obj.prop.decimation){
+	    suffix = " [decimated from " + obj.prop.decimation.points
+		     + " points]";
+	}
+	
+	// without labels, the tooltip shows the point: lines have no datum
+	// per point, and give the one nearest to the mouse instead
+	function label(d, i){
+	    if(labels !== null){
+		return labels[i % labels.length];
+	    }
+	    if(typeof(d) === "undefined" && obj.nearest_datum){
+		var pos = d3.mouse(obj.ax.axes.node());
+		d = obj.nearest_datum(pos[0], pos[1]);
+	    }
+	    return (d === null || typeof(d) === "undefined") ? ""
+		: "(" + d[0] + ", " + d[1] + ")";
+	}
+	
 	function mouseover(d, i){
 	    this.tooltip
 		.style("visibility", "visible")
-		.text((labels === null) ? "(" + d[0] + ", " + d[1] + ")"
-		      : labels[i % labels.length]);
+		.text(label(d, i) + suffix);
 	}
 	
 	function mousemove(d, i){
+	    if(labels === null && typeof(d) === "undefined"){
+		this.tooltip.text(label(d, i) + suffix);
+	    }
 	    if(loc === "mouse"){
 		var pos = d3.mouse(this.fig.canvas.node())
 		this.x = pos[0] + this.prop.hoffset;
@@ -1227,14 +2162,76 @@
 	    this.tooltip.style("visibility", "hidden");
 	}
 	
-	obj.elements()
-	    .on("mouseover", mouseover.bind(this))
-            .on("mousemove", mousemove.bind(this))
-            .on("mouseout", mouseout.bind(this));
+	if(obj.hit_test){
+	    // points are found by the hit testing of the axes, rather than
+	    // by listening to each of their svg elements (canvas layers
+	    // have none)
+	    obj.ax.on_hover(obj, mouseover.bind(this), mousemove.bind(this),
+			    mouseout.bind(this));
+	}else{
+	    obj.elements()
+		.on("mouseover", mouseover.bind(this))
+		.on("mousemove", mousemove.bind(this))
+		.on("mouseout", mouseout.bind(this));
+	}
     }
     
     mpld3.register_plugin("tooltip", mpld3.TooltipPlugin);
     
+    /**********************************************************************/
+    /* Frame Scheduler */
+    
+    // Collects the axes which need to be redrawn, and redraws each of them
+    // once in the next animation frame.  stats holds the number of frames
+    // drawn, the duration of the last frame and the mean duration (in ms),
+    // and the number of frames drawn during the last second.
+    mpld3.FrameScheduler = function(){
+	this.dirty = [];
+	this.pending = false;
+	this.frame_times = [];
+	this.stats = {frames: 0, last_ms: 0, mean_ms: 0, fps: 0};
+    };
+    
+    mpld3.FrameScheduler.prototype.request = function(ax){
+	if(this.dirty.indexOf(ax) < 0){
+	    this.dirty.push(ax);
+	}
+	if(!this.pending){
+	    this.pending = true;
+	    mpld3.request_frame(this.flush.bind(this));
+	}
+    };
+    
+    // Redraw the dirty axes now.  This is called at the next animation
+    // frame, but may also be called directly (e.g. from tests).
+    mpld3.FrameScheduler.prototype.flush = function(){
+	var dirty = this.dirty;
+	this.dirty = [];
+	this.pending = false;
+	if(dirty.length === 0){
+	    return;
+	}
+	
+	var start = mpld3.now();
+	for(var i=0; i<dirty.length; i++){
+	    dirty[i].redraw();
+	}
+	var end = mpld3.now();
+	
+	var stats = this.stats;
+	stats.frames += 1;
+	stats.last_ms = end - start;
+	stats.mean_ms += (stats.last_ms - stats.mean_ms) / stats.frames;
+	this.frame_times.push(end);
+	while(this.frame_times[0] < end - 1000){
+	    this.frame_times.shift();
+	}
+	stats.fps = this.frame_times.length;
+    };
+    
+    mpld3.scheduler = new mpld3.FrameScheduler();
+    
+    
     /**********************************************************************/
     /* Data Parsing Functions */
     mpld3.draw_figure = function(figid, spec){
@@ -1250,6 +2247,25 @@
     };
     
     
+    // Apply the updates sent by the server at url to fig as they come (see
+    // Figure.apply_patch and append_data).  Returns the EventSource, or null
+    // if the browser does not support server-sent events.
+    mpld3.listen = function(fig, url){
+	if(typeof(EventSource) === "undefined"){
+	    return null;
+	}
+	var source = new EventSource(url);
+	source.onmessage = function(event){
+	    fig = fig.apply_patch(JSON.parse(event.data));
+	};
+	source.addEventListener("append", function(event){
+	    var message = JSON.parse(event.data);
+	    fig.append_data(message.data, message.rows, message.max_rows);
+	});
+	return source;
+    };
+    
+    
     /**********************************************************************/
     /* Convenience Functions                                              */
 
@@ -1265,6 +2281,107 @@
 	return output;
     }
     
+    // Product of two affine matrices given as [a, b, c, d, e, f], in the
+    // order of an svg transform list: the result applies B, then A.
+    mpld3.multiply_affine = function(A, B){
+	return [A[0] * B[0] + A[2] * B[1],
+		A[1] * B[0] + A[3] * B[1],
+		A[0] * B[2] + A[2] * B[3],
+		A[1] * B[2] + A[3] * B[3],
+		A[0] * B[4] + A[2] * B[5] + A[4],
+		A[1] * B[4] + A[3] * B[5] + A[5]];
+    }
+    
+    mpld3.now = (window.performance && window.performance.now) ?
+	function(){return window.performance.now();} :
+	function(){return new Date().getTime();};
+    
+    mpld3.request_frame = function(callback){
+	if(window.requestAnimationFrame){
+	    return window.requestAnimationFrame(callback);
+	}
+	return setTimeout(callback, 16);
+    }
+    
+    // An element needs to be redrawn on zoom unless all of its coordinates
+    // are fixed (e.g. in axes or figure coordinates)
+    mpld3.is_zoomable = function(el){
+	var coords = [el.coords, el.pathcoords, el.offsetcoords];
+	var found = false;
+	for(var i=0; i<coords.length; i++){
+	    if(coords[i] instanceof mpld3.Coordinates){
+		if(coords[i].zoomable){
+		    return true;
+		}
+		found = true;
+	    }
+	}
+	return !found;
+    }
+    
+    // The root svg node of a drawn element, or null if it has none
+    mpld3.element_node = function(el){
+	if(typeof(el.context) !== "undefined"){
+	    return el.context.canvas.parentNode;
+	}
+	var sel = el.line || el.path || el.group || el.obj || el.image;
+	return (typeof(sel) === "undefined") ? null : sel.node();
+    }
+    
+    // Whether the element uses one of the datasets of an object keyed by
+    // dataset label
+    mpld3.uses_data = function(el, datasets){
+	var labels = [el.prop.data, el.prop.offsets];
+	var lod = el.prop.lod || [];
+	for(var i=0; i<lod.length; i++){
+	    labels.push(lod[i].data);
+	}
+	for(var i=0; i<labels.length; i++){
+	    if(typeof(labels[i]) === "string"
+	       && datasets.hasOwnProperty(labels[i])){
+		return true;
+	    }
+	}
+	return false;
+    }
+    
+    // Whether the element uses any of the given path geometries, by label
+    mpld3.uses_geometry = function(el, geometry){
+	var labels = [el.prop.markerpath].concat(el.prop.paths || []);
+	for(var i=0; i<labels.length; i++){
+	    if(typeof(labels[i]) === "string"
+	       && geometry.hasOwnProperty(labels[i])){
+		return true;
+	    }
+	}
+	return false;
+    }
+    
+    // Whether the values value(i), i in [0, n), are finite and sorted
+    mpld3.is_sorted = function(value, n){
+	for(var i=0; i<n; i++){
+	    if(!isFinite(value(i)) || (i > 0 && value(i) < value(i - 1))){
+		return false;
+	    }
+	}
+	return true;
+    }
+    
+    // The number of leading indices in [0, N) for which pred is true: pred
+    // must be true up to some index, and false after it.
+    mpld3.bisect = function(N, pred){
+	var lo = 0, hi = N;
+	while(lo < hi){
+	    var mid = (lo + hi) >>> 1;
+	    if(pred(mid)){
+		lo = mid + 1;
+	    }else{
+		hi = mid;
+	    }
+	}
+	return lo;
+    }
+    
     mpld3.generate_id = function(N, chars){
 	if(typeof(N) === "undefined"){N=10;}
 	if(typeof(chars) === "undefined"){
@@ -1277,36 +2394,183 @@
 	return id;
     }
     
-    // TODO: should elements be stored in a map/hash table instead?
-    // It would make this more efficient.
+    // Look up a figure, axes or element by id, in the given figure or list
+    // of figures, or in all figures if fig is not specified.
     mpld3.get_element = function(id, fig){
-	var figs_to_search, ax, el;
+	var figs_to_search;
 	if(typeof(fig) === "undefined"){
-	    figs_to_search = mpld3.figures;
+	    return mpld3.element_map.hasOwnProperty(id) ?
+		mpld3.element_map[id] : null;
 	}else if(typeof(fig.length) === "undefined"){
 	    figs_to_search = [fig];
 	}else{
 	    figs_to_search = fig;
 	}
 	for(var i=0; i<figs_to_search.length; i++){
-	    fig = figs_to_search[i];
-	    if(fig.prop.id === id){
-		return fig;
-	    }
-	    for(var j=0; j<fig.axes.length; j++){
-		ax = fig.axes[j];
-		if(ax.prop.id === id){
-		    return ax;
+	    if(figs_to_search[i].element_map.hasOwnProperty(id)){
+		return figs_to_search[i].element_map[id];
+	    }
+	}
+	return null;
+    }
+    
+    /* ColumnData object: */
+    // A dataset held as a list of columns: plain arrays, or typed arrays
+    // for base64 encoded datasets.  Elements read values through the
+    // accessors returned by column(), so that no array of rows is built.
+    // Row i is at index start + i of the columns: rows dropped by append()
+    // are skipped rather than removed one append at a time.  Null values,
+    // which stand for NaN in strict JSON (as served by show()), are stored
+    // as NaN, so that elements see them as gaps.
+    mpld3.ColumnData = function(columns){
+	this.columns = columns;
+	this.start = 0;
+	this.length = columns.length ? columns[0].length : 0;
+    };
+    
+    mpld3.ColumnData.from_rows = function(rows){
+	var ncols = rows.length ? rows[0].length : 0;
+	var columns = [];
+	for(var j=0; j<ncols; j++){
+	    var col = new Array(rows.length);
+	    for(var i=0; i<rows.length; i++){
+		col[i] = mpld3.null_to_nan(rows[i][j]);
+	    }
+	    columns.push(col);
+	}
+	return new mpld3.ColumnData(columns);
+    };
+    
+    // Return an accessor function(i) of the values of column j.  The
+    // accessor stays valid when rows are appended to the dataset.
+    mpld3.ColumnData.prototype.column = function(j){
+	var data = this;
+	return function(i){return data.columns[j][data.start + i];};
+    };
+    
+    // Return row i as a new array of values
+    mpld3.ColumnData.prototype.row = function(i){
+	var row = new Array(this.columns.length);
+	for(var j=0; j<this.columns.length; j++){
+	    row[j] = this.columns[j][this.start + i];
+	}
+	return row;
+    };
+    
+    // Move the rows to the start of the columns, dropping the rows skipped
+    // and leaving room for n more rows in typed arrays (which have a fixed
+    // length): their size is doubled, so that appending is amortized O(1)
+    // per row.
+    mpld3.ColumnData.prototype.compact = function(n){
+	var start = this.start, stop = this.start + this.length;
+	var size = Math.max(2 * (this.length + n), 16);
+	this.columns = this.columns.map(function(col){
+	    if(Array.isArray(col)){
+		return col.slice(start, stop);
+	    }
+	    var copy = new col.constructor(size);
+	    copy.set(col.subarray(start, stop));
+	    return copy;
+	});
+	this.start = 0;
+    };
+    
+    // Append a list of rows, and drop the oldest rows so as to keep at
+    // most max_rows (if given).  Dropped rows are only removed from the
+    // columns once they outnumber the rows kept, so that a dataset with a
+    // fixed max_rows takes amortized O(1) time per appended row, and at
+    // most a few times max_rows of memory.
+    mpld3.ColumnData.prototype.append = function(rows, max_rows){
+	var n = rows.length;
+	if(this.columns.length === 0){
+	    this.columns = mpld3.ColumnData.from_rows(rows).columns;
+	    this.start = 0;
+	    this.length = n;
+	}else{
+	    if(!Array.isArray(this.columns[0])
+	       && this.start + this.length + n > this.columns[0].length){
+		this.compact(n);
+	    }
+	    var stop = this.start + this.length;
+	    for(var j=0; j<this.columns.length; j++){
+		var col = this.columns[j];
+		for(var i=0; i<n; i++){
+		    col[stop + i] = mpld3.null_to_nan(rows[i][j]);
 		}
-		for(var k=0; k<ax.elements.length; k++){
-		    el = ax.elements[k];
-		    if(el.prop.id === id){
-			return el;
+	    }
+	    this.length += n;
+	}
+	
+	if(max_rows !== null && typeof(max_rows) !== "undefined"
+	   && this.length > max_rows){
+	    this.start += this.length - max_rows;
+	    this.length = max_rows;
+	    if(this.start > this.length && Array.isArray(this.columns[0])){
+		this.compact(0);
+	    }
+	}
+    };
+    
+    // Convert a dataset from the figure JSON (or a list of rows) to an
+    // mpld3.ColumnData
+    mpld3.decode_data = function(dataset){
+	if(dataset instanceof mpld3.ColumnData){
+	    return dataset;
+	}else if(Array.isArray(dataset)){
+	    return mpld3.ColumnData.from_rows(dataset);
+	}
+	var columns = dataset.columns;
+	if(dataset.encoding === "base64"){
+	    columns = columns.map(function(col){
+		return mpld3.decode_base64_array(col, dataset.dtype);
+	    });
+	}else if(dataset.encoding === "columns"){
+	    // the columns are used as they are, with nulls replaced in place
+	    columns.forEach(function(col){
+		for(var i=0; i<col.length; i++){
+		    if(col[i] === null){
+			col[i] = NaN;
 		    }
 		}
-	    }
+	    });
+	}else{
+	    throw "unrecognized data encoding: " + dataset.encoding;
 	}
-	return null;
+	return new mpld3.ColumnData(columns);
+    }
+    
+    // Strict JSON has no NaN: datasets served as JSON hold null instead
+    mpld3.null_to_nan = function(value){
+	return value === null ? NaN : value;
+    };
+
+    mpld3.little_endian = (new Uint8Array(new Uint16Array([1]).buffer)[0]
+			   === 1);
+
+    // Convert a base64 string of little-endian floats to a typed array
+    mpld3.decode_base64_array = function(str, dtype){
+	var ArrayType = {float64: Float64Array, float32: Float32Array}[dtype];
+	if(typeof(ArrayType) === "undefined"){
+	    throw "unrecognized data dtype: " + dtype;
+	}
+	var bin = atob(str);
+	var buffer = new ArrayBuffer(bin.length);
+	var bytes = new Uint8Array(buffer);
+	for(var i=0; i<bin.length; i++){
+	    bytes[i] = bin.charCodeAt(i);
+	}
+	if(mpld3.little_endian){
+	    return new ArrayType(buffer);
+	}
+	// big-endian platform: read the values one at a time
+	var view = new DataView(buffer);
+	var size = ArrayType.BYTES_PER_ELEMENT;
+	var arr = new ArrayType(bin.length / size);
+	for(var i=0; i<arr.length; i++){
+	    arr[i] = (size === 8) ? view.getFloat64(i * size, true)
+				  : view.getFloat32(i * size, true);
+	}
+	return arr;
     }
     
     mpld3.process_props = function(obj, properties, defaults, required){
@@ -1354,33 +2618,76 @@
 	};
     }
     
+    // Return a function formatting numbers with at most the given number
+    // of decimals (or with full precision if it is null).  Formatting
+    // integers is much faster than formatting floats, so the number is
+    // split into integer and fractional digits.
+    function mpld3_fixed_format(precision){
+	if(precision === null || typeof(precision) === "undefined"){
+	    return function(v){return "" + v;};
+	}
+	var scale = Math.pow(10, precision);
+	var zeros = new Array(precision + 1).join("0");
+	return function(v){
+	    var n = Math.round(v * scale);
+	    if(!isFinite(n)){
+		return "" + v;
+	    }
+	    var sign = "";
+	    if(n < 0){
+		sign = "-";
+		n = -n;
+	    }
+	    var q = Math.floor(n / scale);
+	    var r = n - q * scale;
+	    if(r === 0){
+		return sign + q;
+	    }
+	    // drop trailing zeros, and pad with leading zeros
+	    var digits = precision;
+	    while(r % 10 === 0){
+		r /= 10;
+		digits--;
+	    }
+	    r = "" + r;
+	    return sign + q + "." + zeros.slice(0, digits - r.length) + r;
+	};
+    }
+    
     function mpld3_path(_){
 	var x = function(d){return d[0];}
 	var y = function(d){return d[1];}
+	var precision = null;
+	var defined = null;
 	
 	// number of vertices for each SVG code
 	var n_vertices = {M:1, m:1, L:1, l:1, Q:2, q:2, T:2, t:2,
 			  S:3, s:3, C:3, c:3, Z:0, z:0};
 	
 	function path(vertices, pathcodes){
-	    // If pathcodes is not defined, we assume straight line segments
 	    var fx = mpld3_functor(x), fy = mpld3_functor(y);
+	    if(precision !== null){
+		var fmt = mpld3_fixed_format(precision);
+		var fx0 = fx, fy0 = fy;
+		fx = function(d){return fmt(fx0.call(this, d));}
+		fy = function(d){return fmt(fy0.call(this, d));}
+	    }
+	    
+	    // If pathcodes is not defined, we assume straight line segments
 	    if((pathcodes === null) || (typeof(pathcodes) === "undefined")){
-		pathcodes = ["M"];
-		for(var i=0; i<vertices.length - 1; i++){
-		    pathcodes.push("L");
-		}
+		return polyline.call(this, vertices, fx, fy);
 	    }
 	    
 	    var data = "";
 	    var j = 0;  // counter for vertices
 	    for (var i=0;i<pathcodes.length;i++){
-		data += pathcodes[i]
-		for(var jj=j; jj<j+n_vertices[pathcodes[i]]; jj++){
-		    data += fx.call(this, vertices[jj]) + " ";
-		    data += fy.call(this, vertices[jj]) + " ";
+		var n = n_vertices[pathcodes[i]];
+		data += pathcodes[i];
+		for(var jj=j; jj<j+n; jj++){
+		    data += fx.call(this, vertices[jj]) + " "
+			+ fy.call(this, vertices[jj]) + " ";
 		}
-		j += n_vertices[pathcodes[i]];
+		j += n;
 	    }
 	    if(j != vertices.length){
 		console.warn("Warning: not all vertices used in Path");
@@ -1388,6 +2695,35 @@
 	    return data;
 	}
 	
+	// Fast path for straight line segments through all the vertices: no
+	// list of codes is needed, and the loop does no lookups.  Vertices
+	// which are not defined are skipped, and start a new segment.
+	function polyline(vertices, fx, fy){
+	    if(vertices.length === 0){
+		return "";
+	    }
+	    if(defined !== null){
+		var data = "", code = "M";
+		for(var i=0; i<vertices.length; i++){
+		    if(!defined.call(this, vertices[i], i)){
+			code = "M";
+			continue;
+		    }
+		    data += code + fx.call(this, vertices[i]) + " "
+			+ fy.call(this, vertices[i]) + " ";
+		    code = "L";
+		}
+		return data;
+	    }
+	    var data = "M" + fx.call(this, vertices[0]) + " "
+		+ fy.call(this, vertices[0]) + " ";
+	    for(var i=1; i<vertices.length; i++){
+		data += "L" + fx.call(this, vertices[i]) + " "
+		    + fy.call(this, vertices[i]) + " ";
+	    }
+	    return data;
+	}
+	
 	path.x = function(_) {
 	    if (!arguments.length) return x;
 	    x = _;
@@ -1400,6 +2736,21 @@
 	    return path;
 	};
 	
+	// Number of decimals of the coordinates, or null for full precision
+	path.precision = function(_) {
+	    if (!arguments.length) return precision;
+	    precision = _;
+	    return path;
+	};
+	
+	// Function(d, i) telling whether a vertex is drawn, or null to draw
+	// all of them.  Only used for straight line segments.
+	path.defined = function(_) {
+	    if (!arguments.length) return defined;
+	    defined = _;
+	    return path;
+	};
+	
 	path.call = path;
 	
 	return path;
@@ -1409,6 +2760,8 @@
 	return mpld3_path();
     }
     
+    mpld3.fixed_format = mpld3_fixed_format;
+    
     // put mpld3 in the global namespace
     this.mpld3 = mpld3;
     console.log("Loaded mpld3 version " + mpld3.version);
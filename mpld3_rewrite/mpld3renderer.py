@@ -1,19 +1,137 @@
 import random
 import json
 import jinja2
+import base64
+import hashlib
 import itertools
+import io
 
 import numpy as np
 
-from .mplexporter.utils import color_to_hex
 from .mplexporter.exporter import Exporter
 from .mplexporter.renderers import Renderer
 
 from .utils import get_id
+from ._stats import timed
 
 
 class MPLD3Renderer(Renderer):
-    def __init__(self):
+    """Renderer which converts a matplotlib figure to the mpld3 JSON format
+
+    Parameters
+    ----------
+    dedup : boolean (default = True)
+        If True, columns shared between datasets (e.g. a common x-array for
+        many lines) are stored only once in the figure data, and marker and
+        collection paths used more than once are stored once in the figure
+        "geometry" table, which elements reference by label.  Set
+        this to False to skip the duplicate search when the data is known
+        to be unique.
+    data_format : string (default = "rows")
+        The encoding of the datasets in the figure JSON.  Options are
+        - "rows"    : a list of [x, y, ...] rows.
+        - "columns" : a dict {"encoding": "columns", "columns": [...]}
+                      holding one list of values per column.
+        - "base64"  : a dict {"encoding": "base64", "dtype": ...,
+                      "shape": [N, M], "columns": [...]} holding one base64
+                      string of little-endian binary floats per column.
+    data_dtype : string (default = "float64")
+        The binary float type used when data_format is "base64": either
+        "float64" or "float32".
+    precision : integer or None (default = None)
+        If specified, the number of significant digits kept for exported
+        coordinates: datasets, path and marker vertices, offsets and path
+        transforms.  If None, full precision is used.
+    max_points_per_line : integer or None (default = None)
+        If specified, lines with more vertices than this are decimated
+        before export: the points with the minimum and maximum y-value are
+        kept within each of a number of buckets, one per horizontal pixel of
+        the axes (but no more than max_points_per_line / 2 buckets).  NaN
+        gaps in the line are preserved.
+    lod_levels : integer (default = 0)
+        If nonzero, lines longer than max_points_per_line are exported at
+        full resolution, along with a "lod" list of up to lod_levels
+        decimated versions.  Each level has LOD_FACTOR times more buckets
+        than the previous one.  mpld3.js draws the coarsest level which
+        still has one bucket per pixel at the current zoom.
+    defer_data : boolean (default = False)
+        If True, the datasets are not encoded when the figure is closed:
+        the "data" dict of the figure JSON holds the lists of 1D columns
+        instead, which can be written piece by piece with
+        :meth:`iter_data_json`.  This avoids building the encoded data in
+        memory when writing large figures to file.
+    deterministic_ids : boolean (default = False)
+        If True, the ids of the figure and its elements do not depend on the
+        Python objects, but only on the figure content: they have the form
+        "<hash>_<n>", with n counting the elements in the order they appear
+        in the JSON, and <hash> a digest of the figure content.  Exporting an
+        unchanged figure then gives identical output.
+    canvas_threshold : integer or None (default = None)
+        If specified, markers and path collections with more than this
+        number of points are drawn by mpld3.js on an html canvas rather than
+        as one svg element per point, which is much faster to draw and to
+        zoom.  Use 0 to draw all markers and collections on a canvas.
+    image_format : string or None (default = None)
+        If specified, images are re-encoded in this format: "png", or the
+        lossy "jpeg" or "webp" (jpeg has no transparency: transparent pixels
+        become white).  This requires the Pillow package.
+    image_quality : integer or None (default = None)
+        The quality (1-100) of jpeg and webp images.  If None, Pillow's
+        default is used.
+    image_compression : integer or None (default = None)
+        The compression level (0-9) of png images.  If None, Pillow's
+        default is used.
+    image_tile_size : integer or None (default = None)
+        If specified, images are exported at the full resolution of their
+        data, as a pyramid of levels of detail split into square tiles of
+        this many pixels.  Each level has half the resolution of the next;
+        the first, coarsest one fits in a single tile and is the image
+        "data".  mpld3.js draws only the tiles in view, at the level which
+        matches the zoom, but all the tiles are embedded in the figure JSON
+        (about 4/3 the size of the full-resolution image) unless they are
+        served separately, as by show().  This requires the Pillow package.
+    """
+    DATA_FORMATS = ["rows", "columns", "base64"]
+    IMAGE_FORMATS = ["png", "jpeg", "webp"]
+    DATA_DTYPES = {"float64": "<f8", "float32": "<f4"}
+    LOD_FACTOR = 4
+    # number of values encoded at a time by iter_data_json.  A multiple of
+    # three, so that base64 chunks can be concatenated without padding.
+    CHUNK_SIZE = 3 * 2 ** 14
+
+    def __init__(self, dedup=True, data_format="rows", data_dtype="float64",
+                 precision=None, max_points_per_line=None, lod_levels=0,
+                 defer_data=False, deterministic_ids=False,
+                 canvas_threshold=None, image_format=None, image_quality=None,
+                 image_compression=None, image_tile_size=None):
+        if data_format not in self.DATA_FORMATS:
+            raise ValueError("data_format must be one of "
+                             "{0}".format(self.DATA_FORMATS))
+        if data_dtype not in self.DATA_DTYPES:
+            raise ValueError("data_dtype must be one of "
+                             "{0}".format(list(self.DATA_DTYPES)))
+        if precision is not None and int(precision) < 1:
+            raise ValueError("precision must be a positive integer")
+        if max_points_per_line is not None and int(max_points_per_line) < 2:
+            raise ValueError("max_points_per_line must be at least 2")
+        if image_format is not None and image_format not in self.IMAGE_FORMATS:
+            raise ValueError("image_format must be one of "
+                             "{0}".format(self.IMAGE_FORMATS))
+        if image_tile_size is not None and int(image_tile_size) < 1:
+            raise ValueError("image_tile_size must be a positive integer")
+        self.dedup = dedup
+        self.precision = precision
+        self.max_points_per_line = max_points_per_line
+        self.lod_levels = lod_levels
+        self.defer_data = defer_data
+        self.deterministic_ids = deterministic_ids
+        self.canvas_threshold = canvas_threshold
+        self.image_format = image_format
+        self.image_quality = image_quality
+        self.image_compression = image_compression
+        self.image_tile_size = image_tile_size
+        self.data_format = data_format
+        self.data_dtype = data_dtype
         self.figure_json = None
         self.axes_json = None
         self.finished_figures = []
@@ -22,10 +140,170 @@ class MPLD3Renderer(Renderer):
     def datalabel(i):
         return "data{0:02d}".format(i)
 
+    @staticmethod
+    def geometrylabel(i):
+        return "geom{0:02d}".format(i)
+
+    @staticmethod
+    def column_key(col):
+        """Return a hashable digest of the contents of a 1D column"""
+        return (col.shape[0], hashlib.sha1(np.ascontiguousarray(col)).digest())
+
+    @staticmethod
+    def columns_equal(col1, col2):
+        """Exact comparison of two columns, treating NaNs as equal"""
+        return (col1.shape == col2.shape and
+                np.all((col1 == col2) | (np.isnan(col1) & np.isnan(col2))))
+
+    def round(self, arr):
+        """Round an array to the precision of the renderer
+
+        Returns an ndarray; if the precision is None, arr is not modified.
+        """
+        if self.precision is None:
+            return np.asarray(arr)
+        return round_significant(arr, int(self.precision))
+
+    @timed("encode_data")
+    def encode_data(self, columns):
+        """Encode a list of 1D columns for the figure JSON
+
+        The result depends on the ``data_format`` of the renderer.
+        """
+        columns = [self.round(col) for col in columns]
+        if self.data_format == "rows":
+            return np.column_stack(columns).tolist()
+        elif self.data_format == "columns":
+            return {"encoding": "columns",
+                    "columns": [col.tolist() for col in columns]}
+        else:
+            dtype = self.DATA_DTYPES[self.data_dtype]
+            return {"encoding": "base64",
+                    "dtype": self.data_dtype,
+                    "shape": [len(columns[0]), len(columns)],
+                    "columns": [base64.b64encode(np.asarray(col, dtype=dtype)
+                                                 .tobytes()).decode('ascii')
+                                for col in columns]}
+
+    def iter_data_json(self, columns, chunk_size=None):
+        """Iterate over the JSON text of an encoded dataset
+
+        The concatenated pieces are identical to
+        ``json.dumps(self.encode_data(columns))``, but only ``chunk_size``
+        values are converted at a time, so the full encoded dataset never
+        needs to be held in memory.
+        """
+        # base64 chunks must hold a multiple of three values
+        chunk_size = 3 * max(1, (chunk_size or self.CHUNK_SIZE) // 3)
+        n = len(columns[0])
+        chunks = [(i, min(i + chunk_size, n)) for i in range(0, n, chunk_size)]
+
+        def values(col):
+            for k, (start, stop) in enumerate(chunks):
+                text = json.dumps(self.round(col[start:stop]).tolist())[1:-1]
+                yield text if k == 0 else ", " + text
+
+        if self.data_format == "rows":
+            # rows are chunked by rows rather than by values
+            chunk_size = max(1, chunk_size // len(columns))
+            yield "["
+            for start in range(0, n, chunk_size):
+                rows = np.column_stack([self.round(col[start:start + chunk_size])
+                                        for col in columns]).tolist()
+                text = json.dumps(rows)[1:-1]
+                yield text if start == 0 else ", " + text
+            yield "]"
+        elif self.data_format == "columns":
+            yield '{"encoding": "columns", "columns": ['
+            for j, col in enumerate(columns):
+                yield "[" if j == 0 else ", ["
+                for text in values(col):
+                    yield text
+                yield "]"
+            yield "]}"
+        else:
+            dtype = self.DATA_DTYPES[self.data_dtype]
+            yield ('{{"encoding": "base64", "dtype": {0}, "shape": {1}, '
+                   '"columns": ['.format(json.dumps(self.data_dtype),
+                                         json.dumps([n, len(columns)])))
+            for j, col in enumerate(columns):
+                yield '"' if j == 0 else ', "'
+                for (start, stop) in chunks:
+                    chunk = self.round(col[start:stop])
+                    yield base64.b64encode(np.asarray(chunk, dtype=dtype)
+                                           .tobytes()).decode('ascii')
+                yield '"'
+            yield "]}"
+
+    def use_canvas(self, n_points):
+        """Return True if a layer of n_points should be drawn on a canvas"""
+        return (self.canvas_threshold is not None
+                and n_points > self.canvas_threshold)
+
+    def content_hash(self, figure_json):
+        """Return a hex digest of the figure JSON and datasets
+
+        The digest covers the raw data columns and the options which affect
+        their encoding, so the datasets do not need to be encoded first.
+        """
+        sha = hashlib.sha1()
+        props = dict((key, val) for (key, val) in figure_json.items()
+                     if key != "data")
+        options = [self.data_format, self.data_dtype, self.precision]
+        sha.update(json.dumps([props, options], sort_keys=True).encode('utf-8'))
+        for columns in self.datasets:
+            for col in columns:
+                sha.update(np.ascontiguousarray(col).tobytes())
+        return sha.hexdigest()
+
+    def replace_ids(self, figure_json):
+        """Replace the object-based ids of a figure by content-based ids
+
+        Ids are numbered in the order they appear in the figure JSON, and
+        prefixed by a content hash computed with the numbered ids, so that
+        ids are unique across figures on a page.  References to these ids
+        (e.g. in "sharex" or plugin "id" entries) are updated.  Returns a
+        new dict: the dicts of plugins are not modified.
+        """
+        order = []
+        map_ids(dict(figure_json, plugins=[]), order.append)
+        numbers = {}
+        for objid in order:
+            numbers.setdefault(objid, len(numbers))
+
+        def renumber(prefix):
+            def func(objid):
+                if objid in numbers:
+                    return prefix + str(numbers[objid])
+                return objid
+            return func
+
+        prefix = self.content_hash(map_ids(figure_json, renumber("")))
+        return map_ids(figure_json, renumber(prefix[:16] + "_"))
+
+    def find_column(self, col, key=None):
+        """Find all (dataset, column) indices which match the given column
+
+        Returns a list of (i, j) tuples, sorted by dataset index, such that
+        ``self.datasets[i][j]`` is equal to ``col``.
+        """
+        if key is None:
+            key = self.column_key(col)
+        return [(i, j) for (i, j, ref) in self.column_index.get(key, [])
+                if self.columns_equal(col, ref)]
+
+    @timed("add_data")
     def add_data(self, data, key="data"):
         """Add a dataset to the current figure
 
         If the dataset matches any already added data, we use that instead.
+        Matching columns are found via a hash index of the columns of all
+        datasets in the figure, so the cost of a lookup does not depend on
+        the number of datasets already added.
+
+        Each dataset is stored as a list of 1D columns, so that adding a
+        column to an existing dataset does not copy the others.  The columns
+        are combined into a single array in :meth:`close_figure`.
 
         Parameters
         ----------
@@ -42,49 +320,132 @@ class MPLD3Renderer(Renderer):
         """
         # Check if any column of the data exists elsewhere
         # If so, we'll use that dataset rather than duplicating it.
-        data = np.asarray(data)
+        data = np.asarray(data, dtype=float)
         if data.ndim != 2 and data.shape[1] != 2:
             raise ValueError("Data is expected to be of size [N, 2]")
 
-        for (i, d) in enumerate(self.datasets):
-            if data.shape[0] != d.shape[0]:
-                continue
+        if self.dedup:
+            keys = [self.column_key(col) for col in data.T]
+            matches = [self.find_column(col, k)
+                       for (col, k) in zip(data.T, keys)]
+        else:
+            keys = [None for col in data.T]
+            matches = [[] for col in data.T]
 
-            matches = np.array([np.all(col == d.T, axis=1) for col in data.T])
-            if not np.any(matches):
-                continue
+        # Use the first dataset (in order of creation) with a matching column
+        candidates = [m[0][0] for m in matches if m]
+        if candidates:
+            i = min(candidates)
 
-            # If we get here, we've found a dataset with a matching column
             # we'll update this data with additional columns if necessary
-            new_data = list(self.datasets[i].T)
+            columns = self.datasets[i]
             indices = []
-            for j in range(data.shape[1]):
-                whr = np.where(matches[j])[0]
-                if len(whr):
+            for j, col in enumerate(data.T):
+                whr = [jj for (ii, jj) in matches[j] if ii == i]
+                if whr:
                     indices.append(whr[0])
                 else:
                     # append a new column to the data
-                    new_data.append(data[:, j])
-                    indices.append(len(new_data) - 1)
+                    col = np.array(col)
+                    columns.append(col)
+                    indices.append(len(columns) - 1)
+                    self.column_index.setdefault(keys[j], []).append(
+                        (i, indices[-1], col))
 
-            self.datasets[i] = np.asarray(new_data).T
             datalabel = self.datalabel(i + 1)
             xindex, yindex = map(int, indices)
-            break
+            self.dedup_hits += 1
+            self.dedup_columns += sum(1 for m in matches if m)
         else:
-            # else here can be thought of as "if no break"
             # if we get here, then there were no matching datasets
-            self.datasets.append(data)
+            columns = [np.array(col) for col in data.T]
+            self.datasets.append(columns)
             datalabel = self.datalabel(len(self.datasets))
             xindex = 0
             yindex = 1
+            if self.dedup:
+                i = len(self.datasets) - 1
+                for j, col in enumerate(columns):
+                    self.column_index.setdefault(keys[j], []).append(
+                        (i, j, col))
 
         self.datalabels.append(datalabel)
         return {key: datalabel, "xindex": xindex, "yindex": yindex}
 
+    def add_geometry(self, vertices, codes, uses=1):
+        """Add the geometry of a path to the current figure
+
+        Geometries are looked up by a hash of their (rounded) vertices and
+        codes, so that identical paths, e.g. the markers of several lines or
+        the paths of a collection, are stored only once.  The labels
+        returned are temporary: see :meth:`share_geometries`.
+
+        Parameters
+        ----------
+        vertices : array_like
+            a shape [N,2] array of vertices, already rounded
+        codes : list
+            the SVG path codes of the vertices
+        uses : integer (optional)
+            the number of times the element draws the path, from svg path
+            strings which mpld3.js builds once per geometry
+
+        Returns
+        -------
+        geometry : string or list
+            the label of the geometry, or the [vertices, codes] pair itself
+            if dedup is False.
+        """
+        vertices = np.asarray(vertices, dtype=float)
+        if not self.dedup:
+            return [vertices.tolist(), codes]
+        sha = hashlib.sha1(np.ascontiguousarray(vertices).tobytes())
+        sha.update(json.dumps(codes).encode('utf-8'))
+        key = (vertices.shape[0], sha.digest())
+        if key not in self.geometry_index:
+            self.geometries.append([vertices.tolist(), codes])
+            self.geometry_uses.append(0)
+            self.geometry_index[key] = len(self.geometries) - 1
+        i = self.geometry_index[key]
+        self.geometry_uses[i] += uses
+        return self.geometrylabel(i + 1)
+
+    def share_geometries(self):
+        """Build the figure "geometry" table
+
+        Geometries drawn more than once are numbered in the table, and
+        referenced by their label; the others are written inline in the
+        elements which use them, where a label would only add to the size.
+        Returns the table.
+        """
+        table = {}
+        refs = {}
+        for i, geometry in enumerate(self.geometries):
+            if self.geometry_uses[i] > 1:
+                label = self.geometrylabel(len(table) + 1)
+                table[label] = geometry
+                refs[self.geometrylabel(i + 1)] = label
+            else:
+                refs[self.geometrylabel(i + 1)] = geometry
+        for ax in self.figure_json['axes']:
+            for markers in ax['markers']:
+                if 'markerpath' in markers:
+                    markers['markerpath'] = refs[markers['markerpath']]
+            for collection in ax['collections']:
+                collection['paths'] = [refs[p] for p in collection['paths']]
+        return table
+
     def open_figure(self, fig, props):
         self.datasets = []
         self.datalabels = []
+        self.column_index = {}
+        # datasets added which reused an existing dataset, and the number
+        # of columns they shared with it
+        self.dedup_hits = 0
+        self.dedup_columns = 0
+        self.geometries = []
+        self.geometry_uses = []
+        self.geometry_index = {}
         self.figure_json = dict(width=props['figwidth'] * props['dpi'],
                                 height=props['figheight'] * props['dpi'],
                                 axes=[],
@@ -94,9 +455,16 @@ class MPLD3Renderer(Renderer):
     def close_figure(self, fig):
         additional_css = []
         additional_js = []
-        for i, dataset in enumerate(self.datasets):
+        for i, columns in enumerate(self.datasets):
             datalabel = self.datalabel(i + 1)
-            self.figure_json['data'][datalabel] = np.asarray(dataset).tolist()
+            if self.defer_data:
+                self.figure_json['data'][datalabel] = columns
+            else:
+                self.figure_json['data'][datalabel] = self.encode_data(columns)
+        if self.geometries:
+            geometry = self.share_geometries()
+            if geometry:
+                self.figure_json['geometry'] = geometry
         if hasattr(fig, "plugins"):
             self.figure_json["plugins"] = []
             for plugin in fig.plugins:
@@ -104,6 +472,8 @@ class MPLD3Renderer(Renderer):
                     self.figure_json["plugins"].append(plugin.get_dict())
                     additional_css.append(plugin.css())
                     additional_js.append(plugin.javascript())
+        if self.deterministic_ids:
+            self.figure_json = self.replace_ids(self.figure_json)
         self.finished_figures.append((fig, self.figure_json,
                                       "".join(additional_css),
                                       "".join(additional_js)))
@@ -143,7 +513,36 @@ class MPLD3Renderer(Renderer):
     # If draw_line() is not implemented, it will be delegated to draw_path
     # Should we get rid of this? There's not really any advantage here
     def draw_line(self, data, coordinates, style, mplobj=None):
+        n_points = len(data)
+        lod = []
+        if (self.max_points_per_line is not None
+                and n_points > self.max_points_per_line):
+            # one bucket per pixel of the axes width
+            width = self.axes_json['bbox'][2] * self.figure_json['width']
+            n_buckets = max(1, min(int(self.max_points_per_line) // 2,
+                                   int(np.ceil(width))))
+            if self.lod_levels:
+                # keep the full data, along with coarser versions of it
+                for i in range(self.lod_levels):
+                    buckets = n_buckets * self.LOD_FACTOR ** i
+                    if 2 * buckets >= n_points:
+                        break
+                    level_data = minmax_decimate(data, buckets)
+                    level = self.add_data(level_data)
+                    level['buckets'] = buckets
+                    if coordinates == "data" and is_xsorted(level_data):
+                        level['xsorted'] = True
+                    lod.append(level)
+            else:
+                data = minmax_decimate(data, n_buckets)
         line = self.add_data(data)
+        if len(data) < n_points:
+            line['decimation'] = {'method': 'minmax', 'points': n_points}
+        if lod:
+            line['lod'] = lod
+        if coordinates == "data" and is_xsorted(data):
+            # mpld3.js draws only the part of the line which is in view
+            line['xsorted'] = True
         line['coordinates'] = coordinates
         line['id'] = get_id(mplobj)
         for key in ['color', 'linewidth', 'dasharray', 'alpha', 'zorder']:
@@ -157,7 +556,7 @@ class MPLD3Renderer(Renderer):
         path['pathcodes'] = pathcodes
         path['id'] = get_id(mplobj)
         if offset is not None:
-            path['offset'] = list(offset)
+            path['offset'] = self.round(offset).tolist()
             path['offsetcoordinates'] = offset_coordinates
 
         for key in ['dasharray', 'alpha', 'facecolor',
@@ -175,7 +574,10 @@ class MPLD3Renderer(Renderer):
             markers[key] = style[key]
         if style.get('markerpath'):
             vertices, codes = style['markerpath']
-            markers['markerpath'] = (vertices.tolist(), codes)
+            markers['markerpath'] = self.add_geometry(self.round(vertices),
+                                                      codes)
+        if self.use_canvas(len(data)):
+            markers['canvas'] = True
         self.axes_json['markers'].append(markers)
 
     # If draw_path_collection is not implemented,
@@ -183,26 +585,48 @@ class MPLD3Renderer(Renderer):
     def draw_path_collection(self, paths, path_coordinates, path_transforms,
                              offsets, offset_coordinates, offset_order,
                              styles, mplobj=None):
+        # Style lists are cycled over by mpld3.js, so lists of equal values
+        # are collapsed to a single entry.
+        edgewidths = np.asarray(styles['linewidth'], dtype=float).ravel()
         styles = dict(alphas=[styles['alpha']],
-                      edgecolors=[color_to_hex(ec)
-                                  for ec in styles['edgecolor']],
-                      facecolors=[color_to_hex(fc)
-                                  for fc in styles['facecolor']],
-                      edgewidths=styles['linewidth'],
+                      edgecolors=colors_to_hex(styles['edgecolor']),
+                      facecolors=colors_to_hex(styles['facecolor']),
+                      edgewidths=collapse_uniform(edgewidths).tolist(),
                       offsetcoordinates=offset_coordinates,
                       pathcoordinates=path_coordinates,
                       zorder=styles['zorder'])
 
-        def affine_convert(t):
-            m = t.get_matrix()
-            return m[0, :2].tolist() + m[1, :2].tolist() + m[2, :2].tolist()
+        # mpld3.js expects the [a, c, b, d, 0, 0] entries of each 3x3 matrix
+        if len(path_transforms) == 0:
+            pathtransforms = []
+        else:
+            matrices = np.array([getattr(t, 'get_matrix', lambda: t)()
+                                 for t in path_transforms], dtype=float)
+            pathtransforms = self.round(collapse_uniform(
+                matrices.reshape(-1, 3, 3)[:, :, :2].reshape(-1, 6))).tolist()
+
+        # round the vertices of all paths at once
+        vertices = [np.asarray(v, dtype=float).reshape(-1, 2)
+                    for (v, p) in paths]
+        all_vertices = (self.round(np.concatenate(vertices))
+                        if vertices else np.zeros((0, 2)))
+        ends = np.cumsum([len(v) for v in vertices]).tolist()
+        starts = [0] + ends[:-1]
+
+        # mpld3.js cycles through the paths for each of the offsets
+        n_paths = max(1, len(paths))
+        uses = (max(len(offsets), n_paths) + n_paths - 1) // n_paths
 
         pathsdict = self.add_data(offsets, "offsets")
-        pathsdict['paths'] = [(v.tolist(), p) for (v, p) in paths]
-        pathsdict['pathtransforms'] = [affine_convert(t)
-                                       for t in path_transforms]
+        pathsdict['paths'] = [self.add_geometry(all_vertices[start:end], p,
+                                                uses)
+                              for (start, end, (v, p))
+                              in zip(starts, ends, paths)]
+        pathsdict['pathtransforms'] = pathtransforms
         pathsdict.update(styles)
         pathsdict['id'] = get_id(mplobj)
+        if self.use_canvas(max(len(offsets), len(paths))):
+            pathsdict['canvas'] = True
         self.axes_json['collections'].append(pathsdict)
 
     def draw_text(self, text, position, coordinates, style,
@@ -220,13 +644,262 @@ class MPLD3Renderer(Renderer):
                     id=get_id(mplobj))
         self.axes_json['texts'].append(text)
 
+    def encode_image(self, pil_image):
+        """Encode a PIL image as base64, in the image format of the renderer"""
+        fmt = self.image_format or "png"
+        kwargs = {}
+        if fmt == "png" and self.image_compression is not None:
+            kwargs['compress_level'] = int(self.image_compression)
+        if fmt != "png" and self.image_quality is not None:
+            kwargs['quality'] = int(self.image_quality)
+        if fmt == "jpeg" and pil_image.mode != "RGB":
+            Image = import_pil()
+            background = Image.new("RGB", pil_image.size, (255, 255, 255))
+            background.paste(pil_image, mask=pil_image.split()[-1])
+            pil_image = background
+        binary_buffer = io.BytesIO()
+        pil_image.save(binary_buffer, format=fmt.upper(), **kwargs)
+        return base64.b64encode(binary_buffer.getvalue()).decode('ascii')
+
+    def process_image(self, imdata, mplobj=None):
+        """Re-encode an image and split it into tiles, as configured
+
+        Returns the "format" and "data" (and, if the image is tiled, the
+        "tiles") entries of the image JSON.
+        """
+        Image = import_pil()
+        if (self.image_tile_size is not None and
+                getattr(mplobj, 'get_array', lambda: None)() is not None):
+            pil_image = Image.fromarray(image_rgba(mplobj), "RGBA")
+        else:
+            pil_image = Image.open(io.BytesIO(base64.b64decode(imdata)))
+            pil_image = pil_image.convert("RGBA")
+        result = {"format": self.image_format or "png"}
+        if self.image_tile_size is None:
+            result["data"] = self.encode_image(pil_image)
+            return result
+
+        # levels of detail, from the full image down to a single tile
+        size = int(self.image_tile_size)
+        pyramid = [pil_image]
+        while max(pyramid[-1].size) > size:
+            width, height = pyramid[-1].size
+            pyramid.append(pyramid[-1].resize(((width + 1) // 2,
+                                               (height + 1) // 2),
+                                              Image.BICUBIC))
+        pyramid.reverse()
+
+        levels = []
+        for level in pyramid:
+            width, height = level.size
+            levels.append({"width": width, "height": height})
+            if level is pyramid[0]:
+                # the coarsest level is the image data
+                result["data"] = self.encode_image(level)
+                continue
+            levels[-1]["tiles"] = [[self.encode_image(level.crop(
+                (x, y, min(x + size, width), min(y + size, height))))
+                for x in range(0, width, size)]
+                for y in range(0, height, size)]
+        result["tiles"] = {"size": size, "levels": levels}
+        return result
+
     def draw_image(self, imdata, extent, coordinates, style, mplobj=None):
         image = dict(data=imdata, extent=extent, coordinates=coordinates)
+        if (self.image_format is not None or self.image_quality is not None or
+                self.image_compression is not None or
+                self.image_tile_size is not None):
+            image.update(self.process_image(imdata, mplobj))
         image.update(style)
         image['id'] = get_id(mplobj)
         self.axes_json['images'].append(image)
 
 
+def map_ids(obj, func, id_keys=("id", "sharex", "sharey")):
+    """Apply func to the ids within a JSON-like object
+
+    The ids are the strings, or lists of strings, stored under a key in
+    id_keys or starting with "id".  Returns a copy of obj with the ids
+    replaced by their image under func; the top-level "data" entry is not
+    copied or searched.
+    """
+    def is_id_key(key):
+        return key in id_keys or key.startswith("id")
+
+    def walk(obj, top=False):
+        if isinstance(obj, dict):
+            result = {}
+            for key, val in obj.items():
+                if top and key == "data":
+                    result[key] = val
+                elif is_id_key(key) and isinstance(val, str):
+                    result[key] = func(val)
+                elif is_id_key(key) and isinstance(val, list):
+                    result[key] = [func(v) if isinstance(v, str) else walk(v)
+                                   for v in val]
+                else:
+                    result[key] = walk(val)
+            return result
+        elif isinstance(obj, (list, tuple)):
+            return [walk(val) for val in obj]
+        else:
+            return obj
+
+    return walk(obj, top=True)
+
+
+def decode_data(dataset):
+    """Return the columns of a dataset encoded by MPLD3Renderer.encode_data
+
+    The columns are returned as a list of 1D float arrays, whatever the
+    format of the dataset.
+    """
+    if isinstance(dataset, dict):
+        if dataset.get("encoding") == "base64":
+            dtype = MPLD3Renderer.DATA_DTYPES[dataset["dtype"]]
+            return [np.frombuffer(base64.b64decode(col), dtype=dtype)
+                    .astype(float) for col in dataset["columns"]]
+        return [np.asarray(col, dtype=float) for col in dataset["columns"]]
+    rows = np.asarray(dataset, dtype=float)
+    return list(rows.reshape(len(rows), -1).T)
+
+
+def colors_to_hex(colors):
+    """Convert an [N, 4] array of RGBA colors to a list of hex codes
+
+    This gives the same codes as mplexporter's color_to_hex for each color
+    ('none' for transparent colors), but converts the unique colors only, in
+    a few array operations.  If all the codes are equal, a single one is
+    returned.
+    """
+    colors = np.asarray(colors, dtype=float).reshape(-1, 4)
+    if len(colors) == 0:
+        return []
+    rgb = (255 * colors[:, :3]).astype(int)
+    codes = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    codes[colors[:, 3] == 0] = -1
+    unique, inverse = np.unique(codes, return_inverse=True)
+    hex_codes = np.array(['none' if code < 0 else '#{0:06X}'.format(code)
+                          for code in unique.tolist()])
+    if len(unique) == 1:
+        return hex_codes.tolist()
+    return hex_codes[inverse.ravel()].tolist()
+
+
+def collapse_uniform(arr):
+    """Return the first row of arr if all its rows are equal, else arr"""
+    if len(arr) > 1 and np.all(arr == arr[:1]):
+        return arr[:1]
+    return arr
+
+
+def import_pil():
+    """Import PIL.Image, which is needed to re-encode or tile images"""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("The image_format, image_quality, "
+                          "image_compression and image_tile_size options "
+                          "require the Pillow package")
+    return Image
+
+
+def image_rgba(image):
+    """Return the RGBA pixels of a matplotlib image at full resolution
+
+    The result is an [M, N, 4] uint8 array, with the top row of the image
+    (the row at extent[3]) first.
+    """
+    rgba = image.to_rgba(image.get_array(), bytes=True)
+    if image.origin == 'lower':
+        rgba = rgba[::-1]
+    return np.ascontiguousarray(rgba)
+
+
+def is_xsorted(data):
+    """Return True if the x values of the [N, 2] data are finite and sorted
+
+    Such lines can be culled to the visible x range by binary search.
+    """
+    x = np.asarray(data, dtype=float)[:, 0]
+    return bool(len(x) > 1 and np.all(np.isfinite(x))
+                and np.all(x[1:] >= x[:-1]))
+
+
+def round_significant(x, digits):
+    """Round the values in x to the given number of significant digits
+
+    Non-finite values and zeros are left unchanged.  Values are divided or
+    multiplied by exact powers of ten, so the rounded values have short
+    decimal representations.
+    """
+    x = np.array(x, dtype=float)
+    mask = np.isfinite(x) & (x != 0)
+    xm = x[mask]
+    decimals = digits - 1 - np.floor(np.log10(np.abs(xm))).astype(int)
+    decimals = np.minimum(decimals, 300)
+    scale = 10.0 ** np.abs(decimals)
+    with np.errstate(over='ignore', invalid='ignore'):
+        x[mask] = np.where(decimals >= 0,
+                           np.round(xm * scale) / scale,
+                           np.round(xm / scale) * scale)
+    return x
+
+
+def minmax_decimate(data, n_buckets):
+    """Decimate a line, keeping the extreme points in each bucket
+
+    The points of the [N, 2] array ``data`` are split into ``n_buckets``
+    consecutive index ranges; from each, the points with the minimum and
+    maximum y-value are kept, in their original order.  Rows containing
+    non-finite values split the line into runs, which are decimated
+    separately and rejoined with a single [x, NaN] row, so that gaps in the
+    line are preserved.  The first and last point of each run are always
+    kept.
+    """
+    data = np.asarray(data, dtype=float)
+    idx = np.nonzero(np.all(np.isfinite(data), axis=1))[0]
+    if len(idx) == 0:
+        return data[idx]
+    bucket_size = max(1, int(np.ceil(data.shape[0] / float(n_buckets))))
+
+    # label runs of consecutive finite points
+    run_start = np.ones(len(idx), dtype=bool)
+    run_start[1:] = np.diff(idx) > 1
+    run_end = np.ones(len(idx), dtype=bool)
+    run_end[:-1] = run_start[1:]
+    run_id = np.cumsum(run_start)
+
+    # groups are the intersections of runs and buckets
+    bucket = idx // bucket_size
+    group_start = run_start.copy()
+    group_start[1:] |= (bucket[1:] != bucket[:-1])
+    starts = np.nonzero(group_start)[0]
+    sizes = np.diff(np.append(starts, len(idx)))
+
+    # index of the first minimum and maximum within each group
+    y = data[idx, 1]
+    pos = np.arange(len(idx))
+    ymin = np.repeat(np.minimum.reduceat(y, starts), sizes)
+    ymax = np.repeat(np.maximum.reduceat(y, starts), sizes)
+    imin = np.minimum.reduceat(np.where(y == ymin, pos, len(idx)), starts)
+    imax = np.minimum.reduceat(np.where(y == ymax, pos, len(idx)), starts)
+
+    keep = run_start | run_end
+    keep[imin] = True
+    keep[imax] = True
+    kept = np.nonzero(keep)[0]
+    result = data[idx[kept]]
+
+    # separate the runs with NaN rows
+    gaps = np.nonzero(np.diff(run_id[kept]))[0] + 1
+    if len(gaps):
+        gap_rows = np.column_stack([result[gaps - 1, 0],
+                                    np.nan + np.zeros(len(gaps))])
+        result = np.insert(result, gaps, gap_rows, axis=0)
+    return result
+
+
 TEXT_VA_DICT = {'bottom': 'auto',
                 'baseline': 'auto',
                 'center': 'central',
@@ -182,17 +182,26 @@ class PointHTMLTooltip(PluginBase):
                     .style("z-index", "10")
                     .style("visibility", "hidden");
 
-       obj.elements()
-           .on("mouseover", function(d, i){
+       var mouseover = function(d, i){
                               tooltip.html(labels[i])
-                                     .style("visibility", "visible");})
-           .on("mousemove", function(d, i){
+                                     .style("visibility", "visible");};
+       var mousemove = function(d, i){
                     tooltip
                       .style("top", d3.event.pageY + this.prop.voffset + "px")
                       .style("left",d3.event.pageX + this.prop.hoffset + "px");
-                 }.bind(this))
-           .on("mouseout",  function(d, i){
-                           tooltip.style("visibility", "hidden");});
+                 }.bind(this);
+       var mouseout = function(d, i){
+                           tooltip.style("visibility", "hidden");};
+
+       if(obj.hit_test){
+           // markers and collections: use the hit testing of the axes
+           obj.ax.on_hover(obj, mouseover, mousemove, mouseout);
+       }else{
+           obj.elements()
+               .on("mouseover", mouseover)
+               .on("mousemove", mousemove)
+               .on("mouseout", mouseout);
+       }
     };
 
     mpld3.register_plugin("htmltooltip", HtmlTooltipPlugin);
@@ -0,0 +1,85 @@
+"""
+Tests of append_data(), which streams rows into a shown figure
+"""
+import json
+
+import pytest
+import numpy as np
+from numpy.testing import assert_equal
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import append_data, update
+from .._display import _AppendedData
+from ..mpld3renderer import decode_data
+from .test_update import (make_figure, show_figure, EventClient, get_json,
+                          strict_loads)
+
+
+def test_appended_data():
+    np.random.seed(0)
+    columns = [np.arange(5.0), np.arange(5.0) ** 2]
+    appended = _AppendedData(columns)
+    expected = np.column_stack(columns)
+    for n in [1, 3, 0, 7, 2, 10, 4]:
+        rows = np.random.rand(n, 2)
+        appended.append(rows, max_rows=12)
+        expected = np.concatenate([expected, rows])[-12:]
+        assert appended.n_rows == len(expected)
+        assert_equal(np.column_stack(appended.columns()), expected)
+
+    appended.append(np.random.rand(3, 2))
+    assert appended.n_rows == 15
+
+
+def test_append_data():
+    fig = make_figure()
+    figid = show_figure(fig, data_format="columns")
+    events = EventClient(figid)
+    try:
+        figure_json = get_json(figid)
+        label = figure_json['axes'][0]['lines'][0]['data']
+        rows = decode_data(figure_json['data'][label])
+
+        append_data(fig, label, [[10, 1, 2], [11, 2, 3]], max_rows=21)
+        event, data = events.read()
+        assert event == "append"
+        assert json.loads(data) == {"data": label, "max_rows": 21,
+                                    "rows": [[10, 1, 2], [11, 2, 3]]}
+
+        # a single row
+        append_data(fig, label, [12, 3, 4])
+        event, data = events.read()
+        assert json.loads(data)['rows'] == [[12, 3, 4]]
+
+        # NaN values are sent as null
+        append_data(fig, label, [13, np.nan, 5])
+        event, data = events.read()
+        assert strict_loads(data)['rows'] == [[13, None, 5]]
+
+        # pages loaded from now on get the appended rows
+        dataset = get_json(figid)['data'][label]
+        assert dataset['encoding'] == "columns"
+        expected = np.column_stack(rows)[-19:]
+        expected = np.concatenate([expected, [[10, 1, 2], [11, 2, 3],
+                                              [12, 3, 4], [13, np.nan, 5]]])
+        assert_equal(np.column_stack(decode_data(dataset)), expected)
+
+        # update() sends the datasets of the matplotlib figure again
+        patch = update(fig)
+        assert patch['data'][label] == figure_json['data'][label]
+    finally:
+        events.close()
+        plt.close(fig)
+
+
+def test_append_data_errors():
+    fig = make_figure()
+    show_figure(fig)
+    for args, kwargs in [(("data99", [[1, 2]]), {}),
+                         (("data01", [[1, 2, 3, 4]]), {}),
+                         (("data01", [[1, 2, 3]]), {"max_rows": 0})]:
+        with pytest.raises(ValueError):
+            append_data(fig, *args, **kwargs)
+    plt.close(fig)
@@ -0,0 +1,39 @@
+"""
+Tests of the vectorized color conversion of path collections
+"""
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict
+from ..mpld3renderer import colors_to_hex
+from ..mplexporter.utils import color_to_hex
+
+
+def test_colors_to_hex():
+    np.random.seed(0)
+    colors = np.random.rand(100, 4)
+    colors[::7, 3] = 0
+    colors[5] = [1, 1, 1, 1]
+    colors[6] = [0, 0, 0, 0.5]
+    assert colors_to_hex(colors) == [color_to_hex(tuple(c)) for c in colors]
+
+
+def test_colors_to_hex_uniform():
+    assert colors_to_hex([[1, 0, 0, 1]] * 10) == ['#FF0000']
+    assert colors_to_hex([[1, 0, 0, 0], [0, 1, 0, 0]]) == ['none']
+    assert colors_to_hex(np.zeros((0, 4))) == []
+
+
+def test_collection_colors():
+    np.random.seed(0)
+    c = np.random.rand(50, 4)
+    fig, ax = plt.subplots()
+    ax.scatter(np.arange(50), np.arange(50), c=c, edgecolors='k')
+    collection = fig_to_dict(fig)['axes'][0]['collections'][0]
+    plt.close(fig)
+    facecolors = ax.collections[0].get_facecolors()
+    assert collection['facecolors'] == [color_to_hex(tuple(fc))
+                                        for fc in facecolors]
+    assert collection['edgecolors'] == ['#000000']
@@ -0,0 +1,80 @@
+"""
+Tests of the data_format and data_dtype options
+"""
+import json
+
+import pytest
+import numpy as np
+from numpy.testing import assert_equal, assert_allclose
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict
+from ..mpld3renderer import MPLD3Renderer, decode_data
+
+
+X = np.linspace(0, 10, 50)
+Y = np.sin(X)
+
+
+def make_figure():
+    fig, ax = plt.subplots()
+    y = Y.copy()
+    y[10] = np.nan
+    ax.plot(X, y, '-')
+    ax.plot(X, np.cos(X), 'o')
+    return fig
+
+
+def test_encode_decode():
+    columns = [X, Y, np.arange(50.0)]
+    for data_format in MPLD3Renderer.DATA_FORMATS:
+        renderer = MPLD3Renderer(data_format=data_format)
+        decoded = decode_data(renderer.encode_data(columns))
+        assert len(decoded) == 3
+        for col, ref in zip(decoded, columns):
+            assert_equal(col, ref)
+
+
+def test_encode_float32():
+    renderer = MPLD3Renderer(data_format="base64", data_dtype="float32")
+    dataset = renderer.encode_data([X, Y])
+    assert dataset["dtype"] == "float32"
+    assert dataset["shape"] == [50, 2]
+    x, y = decode_data(dataset)
+    assert_equal(x, X.astype(np.float32))
+    assert_allclose(y, Y, rtol=1E-6, atol=1E-7)
+
+
+def test_figure_data_formats():
+    fig = make_figure()
+    rows = fig_to_dict(fig)
+    assert isinstance(rows["data"]["data01"], list)
+    for data_format in ["columns", "base64"]:
+        figure_json = fig_to_dict(fig, data_format=data_format)
+        assert sorted(figure_json["data"]) == sorted(rows["data"])
+        for label, dataset in figure_json["data"].items():
+            assert dataset["encoding"] == data_format
+            for col, ref in zip(decode_data(dataset),
+                                decode_data(rows["data"][label])):
+                # NaN values survive all encodings
+                assert_equal(col, ref)
+
+        # only the encoding of the datasets differs
+        assert dict(figure_json, data=None) == dict(rows, data=None)
+    plt.close(fig)
+
+
+def test_iter_data_json():
+    columns = [X, Y]
+    for data_format in MPLD3Renderer.DATA_FORMATS:
+        renderer = MPLD3Renderer(data_format=data_format)
+        text = "".join(renderer.iter_data_json(columns, chunk_size=7))
+        assert text == json.dumps(renderer.encode_data(columns))
+
+
+def test_bad_data_format():
+    for kwargs in [dict(data_format="csv"), dict(data_dtype="int8")]:
+        with pytest.raises(ValueError):
+            MPLD3Renderer(**kwargs)
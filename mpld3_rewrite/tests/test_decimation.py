@@ -0,0 +1,75 @@
+"""
+Tests of the decimation of long lines
+"""
+import numpy as np
+from numpy.testing import assert_equal
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict
+from ..mpld3renderer import minmax_decimate, decode_data
+
+
+def test_minmax_decimate():
+    np.random.seed(0)
+    data = np.column_stack([np.arange(1000.0), np.random.randn(1000)])
+    result = minmax_decimate(data, 10)
+    assert len(result) <= 4 * 10
+
+    # the extremes of each bucket are kept, in order
+    assert_equal(result[:, 0], np.sort(result[:, 0]))
+    for bucket in data.reshape(10, 100, 2):
+        for i in [bucket[:, 1].argmin(), bucket[:, 1].argmax()]:
+            assert bucket[i, 0] in result[:, 0]
+    assert_equal(result[0], data[0])
+    assert_equal(result[-1], data[-1])
+
+
+def test_minmax_decimate_short():
+    data = np.column_stack([np.arange(5.0), np.arange(5.0) ** 2])
+    assert_equal(minmax_decimate(data, 10), data)
+
+
+def test_minmax_decimate_gaps():
+    x = np.arange(1000.0)
+    y = np.sin(x / 10.)
+    y[300:310] = np.nan
+    y[700] = np.inf
+    result = minmax_decimate(np.column_stack([x, y]), 10)
+
+    # one NaN row at each gap, between the points around it
+    gaps = np.nonzero(~np.isfinite(result[:, 1]))[0]
+    assert len(gaps) == 2
+    assert_equal(result[gaps - 1, 0], [299, 699])
+    assert_equal(result[gaps + 1, 0], [310, 701])
+    assert np.all(np.isnan(result[gaps, 1]))
+
+
+def test_minmax_decimate_all_nan():
+    data = np.column_stack([np.arange(10.0), np.nan * np.ones(10)])
+    assert minmax_decimate(data, 2).shape == (0, 2)
+
+
+def test_max_points_per_line():
+    x = np.linspace(0, 10, 10000)
+    y = np.sin(x)
+    y[5000] = np.nan
+    fig, ax = plt.subplots()
+    ax.plot(x, y)
+    ax.plot(x[:100], y[:100])
+    figure_json = fig_to_dict(fig, max_points_per_line=1000)
+    plt.close(fig)
+
+    long_line, short_line = figure_json['axes'][0]['lines']
+    assert long_line['decimation'] == {'method': 'minmax', 'points': 10000}
+    assert 'decimation' not in short_line
+
+    columns = decode_data(figure_json['data'][long_line['data']])
+    xdata = columns[long_line['xindex']]
+    ydata = columns[long_line['yindex']]
+    assert len(ydata) <= 1000 + 1
+    assert np.sum(np.isnan(ydata)) == 1
+    assert ydata[np.isfinite(ydata)].min() == np.nanmin(y)
+    assert ydata[np.isfinite(ydata)].max() == np.nanmax(y)
+    assert xdata[0] == x[0] and xdata[-1] == x[-1]
@@ -0,0 +1,68 @@
+"""
+Tests of export_many
+"""
+import pytest
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import export_many, fig_to_dict
+
+
+def make_figure():
+    fig, ax = plt.subplots()
+    ax.plot(np.linspace(0, 1, 20), np.linspace(0, 1, 20) ** 2, '-o')
+    ax.scatter([0.2, 0.4], [0.6, 0.8])
+    return fig
+
+
+def test_export_many_factories():
+    n_open = len(plt.get_fignums())
+    results = export_many([make_figure] * 3, workers=2)
+    assert len(plt.get_fignums()) == n_open
+
+    assert len(results) == 3
+    for i, result in enumerate(results):
+        assert result['id'].startswith("fig{0}_".format(i))
+        assert len(result['axes'][0]['lines']) == 1
+
+    # the same ids whichever process exported each figure
+    assert export_many([make_figure] * 3, workers=1) == results
+
+
+def test_export_many_figures():
+    figs = [make_figure(), make_figure()]
+    results = export_many(figs, workers=2)
+    assert [result['id'] for result in results] == ['fig0_0', 'fig1_0']
+    assert export_many(figs, workers=1) == results
+    for fig in figs:
+        plt.close(fig)
+
+
+def test_export_many_ids_not_kept():
+    figs = [make_figure(), make_figure()]
+    first, = export_many(figs[:1], workers=1)
+
+    # the first figure gets new ids in a new position, distinct from those
+    # of the figure now exported first
+    results = export_many(figs[::-1], workers=1)
+    assert results[0]['id'] == first['id'] == 'fig0_0'
+    assert results[1]['id'] == 'fig1_0'
+    assert results[1] == export_many([figs[0]] * 2, workers=1)[1]
+
+    # and ids of its own once exported alone
+    assert not fig_to_dict(figs[0])['id'].startswith('fig')
+    for fig in figs:
+        plt.close(fig)
+
+
+def test_export_many_html():
+    results = export_many([make_figure] * 2, workers=1, output="html")
+    assert len(results) == 2
+    assert all("mpld3.draw_figure" in html for html in results)
+
+
+def test_export_many_bad_output():
+    with pytest.raises(ValueError):
+        export_many([make_figure], output="png")
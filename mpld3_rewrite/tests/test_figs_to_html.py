@@ -0,0 +1,93 @@
+"""
+Tests of figs_to_html
+"""
+import re
+import json
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import figs_to_html, fig_to_dict
+
+
+X = np.linspace(0, 10, 100)
+
+
+def make_figure(y):
+    fig, ax = plt.subplots()
+    ax.plot(X, y)
+    return fig
+
+
+def parse_page(html):
+    """Return the shared data and the figure JSON of a figs_to_html page"""
+    shared = json.loads(re.search(r'mpld3.register_data\((.*)\);',
+                                  html).group(1))
+    figures = [(figid, json.loads(figure_json)) for (figid, figure_json)
+               in re.findall(r'mpld3.draw_figure\("fig([^"]*)", (.*)\);',
+                             html)]
+    return shared, figures
+
+
+def test_figs_to_html():
+    figs = [make_figure(np.sin(X)), make_figure(np.cos(X))]
+    html = figs_to_html(figs)
+    shared, figures = parse_page(html)
+
+    # the libraries are loaded by a single script, and each figure has
+    # its div
+    assert html.count('<script') == 1
+    assert len(figures) == 2
+    for figid, figure_json in figures:
+        assert html.count('<div id="fig{0}"></div>'.format(figid)) == 1
+
+    # different figures share nothing
+    assert shared == {}
+    for fig, (figid, figure_json) in zip(figs, figures):
+        assert figure_json == json.loads(json.dumps(fig_to_dict(fig)))
+        plt.close(fig)
+
+
+def test_figs_to_html_shared_data():
+    figs = [make_figure(np.sin(X)), make_figure(np.sin(X)),
+            make_figure(np.cos(X))]
+    shared, figures = parse_page(figs_to_html(figs))
+    assert len(shared) == 1
+    key, dataset = list(shared.items())[0]
+
+    data = [figure_json['data'] for (figid, figure_json) in figures]
+    assert data[0] == data[1] == {"data01": {"shared": key}}
+    assert isinstance(data[2]["data01"], list)
+    assert dataset == json.loads(json.dumps(fig_to_dict(figs[0])['data']
+                                            ['data01']))
+
+    shared, figures = parse_page(figs_to_html(figs, share_data=False))
+    assert shared == {}
+    assert figures[0][1]['data'] == figures[1][1]['data']
+    for fig in figs:
+        plt.close(fig)
+
+
+def test_figs_to_html_json():
+    # the figure JSON built from the serialized datasets is that of
+    # json.dumps
+    figs = [make_figure(np.sin(X)), make_figure(np.sin(X)),
+            make_figure(np.cos(X))]
+    html = figs_to_html(figs, deterministic_ids=True)
+    unshared = figs_to_html(figs, deterministic_ids=True, share_data=False)
+    shared, figures = parse_page(html)
+    key = list(shared)[0]
+    for fig, (figid, figure_json) in zip(figs, figures):
+        expected = fig_to_dict(fig, deterministic_ids=True)
+        if figure_json['data'] == {"data01": {"shared": key}}:
+            expected['data'] = {"data01": {"shared": key}}
+        assert json.dumps(expected) in html
+    assert len(unshared) > len(html)
+
+    # with nothing to share, the pages are identical
+    assert figs_to_html(figs[1:], deterministic_ids=True) == figs_to_html(
+        figs[1:], deterministic_ids=True, share_data=False)
+    for fig in figs:
+        plt.close(fig)
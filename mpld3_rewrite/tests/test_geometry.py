@@ -0,0 +1,70 @@
+"""
+Tests of the figure geometry table, which stores shared marker and
+collection paths once
+"""
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict
+
+
+X = np.linspace(0, 10, 20)
+
+
+def test_shared_marker_paths():
+    fig, ax = plt.subplots()
+    ax.plot(X, np.sin(X), 'o')
+    ax.plot(X, np.cos(X), 'o')
+    ax.plot(X, X, 's')
+    figure_json = fig_to_dict(fig)
+    inline = fig_to_dict(fig, dedup=False)
+    plt.close(fig)
+
+    # the circles are stored once, the square inline
+    markers = figure_json['axes'][0]['markers']
+    geometry = figure_json['geometry']
+    assert list(geometry) == ["geom01"]
+    assert markers[0]['markerpath'] == markers[1]['markerpath'] == "geom01"
+    assert isinstance(markers[2]['markerpath'], list)
+
+    # without dedup, all paths are inline, and equal to the shared ones
+    assert 'geometry' not in inline
+    paths = [m['markerpath'] for m in inline['axes'][0]['markers']]
+    assert paths[0] == paths[1] == geometry["geom01"]
+    assert paths[2] == markers[2]['markerpath']
+
+
+def test_shared_collection_paths():
+    fig, ax = plt.subplots()
+    ax.scatter(X, np.sin(X), s=20)
+    ax.scatter(X, np.cos(X), s=np.arange(20) + 1)
+    figure_json = fig_to_dict(fig)
+    plt.close(fig)
+
+    # both collections draw the unit circle, scaled by their transforms
+    uniform, sized = figure_json['axes'][0]['collections']
+    assert list(figure_json['geometry']) == ["geom01"]
+    assert uniform['paths'] == sized['paths'] == ["geom01"]
+    assert len(uniform['pathtransforms']) == 1
+    assert len(sized['pathtransforms']) == 20
+
+
+def test_single_use_collection_path():
+    # a path drawn once is inline
+    fig, ax = plt.subplots()
+    ax.scatter([1.0], [2.0])
+    figure_json = fig_to_dict(fig)
+    plt.close(fig)
+    vertices, codes = figure_json['axes'][0]['collections'][0]['paths'][0]
+    assert codes[0] == 'M' and codes[-1] == 'Z'
+    assert 'geometry' not in figure_json
+
+
+def test_no_geometry():
+    fig, ax = plt.subplots()
+    ax.plot(X, np.sin(X))
+    figure_json = fig_to_dict(fig)
+    plt.close(fig)
+    assert 'geometry' not in figure_json
@@ -0,0 +1,99 @@
+"""
+Tests of deterministic ids and figure content hashes
+"""
+import os
+import re
+import sys
+import json
+import subprocess
+
+import pytest
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict, figs_to_html, save_json
+from ..utils import id_scope
+
+
+def make_figure():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(10), np.arange(10) ** 2, '-o')
+    ax.scatter([1, 2, 3], [3, 2, 1], c=[0.1, 0.5, 0.9])
+    ax.text(1.5, 2.5, "text")
+    return fig
+
+
+def export(**kwargs):
+    fig = make_figure()
+    try:
+        return fig_to_dict(fig, deterministic_ids=True, return_hash=True,
+                           **kwargs)
+    finally:
+        plt.close(fig)
+
+
+def test_deterministic_ids():
+    figure_json, fig_hash = export()
+    figure_json2, fig_hash2 = export()
+    assert figure_json == figure_json2
+    assert fig_hash == fig_hash2
+
+
+def test_deterministic_ids_across_processes():
+    figure_json, fig_hash = export()
+
+    # export the same figure in a new python process
+    package_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    code = ("import json; from mpld3_rewrite.tests.test_ids import export; "
+            "print(json.dumps(export()))")
+    env = dict(os.environ, PYTHONPATH=package_dir, MPLBACKEND='Agg')
+    output = subprocess.check_output([sys.executable, "-c", code], env=env)
+    figure_json2, fig_hash2 = json.loads(output.decode('utf-8'))
+    assert figure_json == figure_json2
+    assert fig_hash == fig_hash2
+
+
+def test_hash_changes_with_content():
+    figure_json, fig_hash = export()
+    figure_json2, fig_hash2 = export(precision=2)
+    assert fig_hash != fig_hash2
+
+
+def test_ids_in_scope():
+    fig = make_figure()
+    with id_scope("scope_"):
+        figure_json = fig_to_dict(fig)
+    plt.close(fig)
+    ids = [figure_json['id']] + [ax['id'] for ax in figure_json['axes']]
+    assert all(objid.startswith("scope_") for objid in ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_figs_to_html_identical_figures():
+    figs = [make_figure(), make_figure()]
+    html = figs_to_html(figs, deterministic_ids=True)
+    for fig in figs:
+        plt.close(fig)
+    divs = re.findall(r'<div id="(fig[^"]*)"></div>', html)
+    assert len(divs) == 2
+    assert len(set(divs)) == 2
+    for div in divs:
+        assert 'mpld3.draw_figure("{0}"'.format(div) in html
+
+    # the page is reproducible
+    figs = [make_figure(), make_figure()]
+    assert figs_to_html(figs, deterministic_ids=True) == html
+    for fig in figs:
+        plt.close(fig)
+
+
+def test_save_json_return_hash():
+    fig = make_figure()
+    try:
+        with pytest.raises(ValueError):
+            save_json(fig, open(os.devnull, 'w'), return_hash=True)
+    finally:
+        plt.close(fig)
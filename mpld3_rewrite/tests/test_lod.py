@@ -0,0 +1,64 @@
+"""
+Tests of the level-of-detail pyramid of long lines
+"""
+import numpy as np
+from numpy.testing import assert_equal
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict
+from ..mpld3renderer import MPLD3Renderer, minmax_decimate, decode_data
+
+
+def export_line(n, **kwargs):
+    x = np.linspace(0, 10, n)
+    y = np.sin(x) + np.cos(7 * x)
+    fig, ax = plt.subplots()
+    ax.plot(x, y)
+    figure_json = fig_to_dict(fig, **kwargs)
+    plt.close(fig)
+    return x, y, figure_json
+
+
+def get_line(figure_json, line):
+    columns = decode_data(figure_json['data'][line['data']])
+    return np.column_stack([columns[line['xindex']],
+                            columns[line['yindex']]])
+
+
+def test_lod_levels():
+    x, y, figure_json = export_line(100000, max_points_per_line=1000,
+                                    lod_levels=3)
+    line = figure_json['axes'][0]['lines'][0]
+
+    # the line itself is kept at full resolution
+    assert 'decimation' not in line
+    assert_equal(get_line(figure_json, line), np.column_stack([x, y]))
+
+    lod = line['lod']
+    assert len(lod) == 3
+    buckets = [level['buckets'] for level in lod]
+    assert buckets[0] <= 500
+    for coarse, fine in zip(buckets[:-1], buckets[1:]):
+        assert fine == MPLD3Renderer.LOD_FACTOR * coarse
+    for level in lod:
+        assert level['xsorted']
+        assert_equal(get_line(figure_json, level),
+                     minmax_decimate(np.column_stack([x, y]),
+                                     level['buckets']))
+
+
+def test_lod_levels_stop():
+    # no level with at least half as many buckets as points
+    x, y, figure_json = export_line(5000, max_points_per_line=1000,
+                                    lod_levels=5)
+    lod = figure_json['axes'][0]['lines'][0]['lod']
+    assert 0 < len(lod) < 5
+    assert all(2 * level['buckets'] < 5000 for level in lod)
+
+
+def test_lod_short_line():
+    x, y, figure_json = export_line(500, max_points_per_line=1000,
+                                    lod_levels=3)
+    assert 'lod' not in figure_json['axes'][0]['lines'][0]
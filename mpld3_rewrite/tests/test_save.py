@@ -0,0 +1,81 @@
+"""
+Tests of save_html and save_json, which stream the figure JSON to file
+"""
+import io
+import os
+import json
+import tempfile
+
+import numpy as np
+import pytest
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_html, fig_to_dict, figs_to_html, save_html, save_json
+from ..mpld3renderer import MPLD3Renderer
+
+
+def make_figure():
+    # long enough for the datasets to be written in several chunks
+    n = 2 * MPLD3Renderer.CHUNK_SIZE + 1
+    x = np.linspace(0, 10, n)
+    y = np.sin(x)
+    y[100] = np.nan
+    fig, ax = plt.subplots()
+    ax.plot(x, y)
+    ax.plot(x[:50], y[:50], 'o')
+    return fig
+
+
+def test_save_json():
+    fig = make_figure()
+    for data_format in MPLD3Renderer.DATA_FORMATS:
+        f = io.StringIO()
+        save_json(fig, f, data_format=data_format, precision=6)
+        assert f.getvalue() == json.dumps(
+            fig_to_dict(fig, data_format=data_format, precision=6))
+    plt.close(fig)
+
+
+def test_save_html():
+    fig = make_figure()
+    for data_format in MPLD3Renderer.DATA_FORMATS:
+        f = io.StringIO()
+        save_html(fig, f, data_format=data_format, deterministic_ids=True)
+        assert f.getvalue() == fig_to_html(fig, data_format=data_format,
+                                           deterministic_ids=True)
+    plt.close(fig)
+
+
+def test_save_html_figures():
+    figs = [make_figure(), make_figure()]
+    f = io.StringIO()
+    save_html(figs, f, deterministic_ids=True)
+    assert f.getvalue() == figs_to_html(figs, deterministic_ids=True)
+    for fig in figs:
+        plt.close(fig)
+
+
+def test_save_defer_data():
+    fig = make_figure()
+    for save in [save_html, save_json]:
+        with pytest.raises(ValueError):
+            save(fig, io.StringIO(), defer_data=True)
+    with pytest.raises(ValueError):
+        save_html([fig], io.StringIO(), defer_data=False)
+    plt.close(fig)
+
+
+def test_save_to_filename():
+    fig = make_figure()
+    fd, filename = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        save_json(fig, filename)
+        with open(filename) as f:
+            assert json.load(f)['axes'] == json.loads(
+                json.dumps(fig_to_dict(fig)))['axes']
+    finally:
+        os.remove(filename)
+        plt.close(fig)
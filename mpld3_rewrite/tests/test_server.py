@@ -0,0 +1,125 @@
+"""
+Tests of the preview server: compression, caching and keep-alive
+"""
+import io
+import gzip
+
+try:
+    # Python 2.x
+    import httplib as client
+except ImportError:
+    # Python 3.x
+    from http import client
+
+from .._server import FigureServer, Payload
+
+
+CONTENT = "<p>" + "mpld3 " * 1000 + "</p>"
+
+
+def start_server():
+    server = FigureServer(port=18888)
+    server.add('/page', CONTENT)
+    server.add('/lib.js', "var x;", "text/javascript", max_age=60)
+    return server
+
+
+def ungzip(body):
+    return gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+
+
+def get(conn, path, method="GET", **headers):
+    conn.request(method, path, headers=headers)
+    response = conn.getresponse()
+    return response, response.read()
+
+
+def test_payload_select():
+    payload = Payload(CONTENT, "text/html")
+    assert payload.select(None) == ("identity", CONTENT.encode('utf-8'))
+    encoding, body = payload.select("deflate, gzip;q=0.8")
+    assert encoding == "gzip"
+    assert ungzip(body) == CONTENT.encode('utf-8')
+
+
+def test_gzip_response():
+    server = start_server()
+    try:
+        conn = client.HTTPConnection(server.ip, server.port)
+        response, body = get(conn, '/page', **{"Accept-Encoding": "gzip"})
+        assert response.status == 200
+        assert response.getheader("Content-Encoding") == "gzip"
+        assert response.getheader("Vary") == "Accept-Encoding"
+        assert int(response.getheader("Content-Length")) == len(body)
+        assert ungzip(body) == CONTENT.encode('utf-8')
+
+        # the connection is kept alive for the next request
+        response, body = get(conn, '/page')
+        assert response.status == 200
+        assert response.getheader("Content-Encoding") is None
+        assert body == CONTENT.encode('utf-8')
+        conn.close()
+    finally:
+        server.shutdown()
+
+
+def test_etag_response():
+    server = start_server()
+    try:
+        conn = client.HTTPConnection(server.ip, server.port)
+        response, body = get(conn, '/page')
+        etag = response.getheader("ETag")
+        assert response.getheader("Cache-Control") == "no-cache"
+
+        response, body = get(conn, '/page', **{"If-None-Match": etag})
+        assert response.status == 304
+        assert body == b""
+
+        response, body = get(conn, '/lib.js')
+        assert response.getheader("Cache-Control") == "public, max-age=60"
+        response, body = get(conn, '/lib.js', **{"If-None-Match": etag})
+        assert response.status == 200
+
+        # changed content gets a new ETag
+        server.add('/page', CONTENT + "<p>more</p>")
+        response, body = get(conn, '/page', **{"If-None-Match": etag})
+        assert response.status == 200
+        assert response.getheader("ETag") != etag
+        conn.close()
+    finally:
+        server.shutdown()
+
+
+def test_head_and_not_found():
+    server = start_server()
+    try:
+        conn = client.HTTPConnection(server.ip, server.port)
+        response, body = get(conn, '/page', method="HEAD")
+        assert response.status == 200
+        assert body == b""
+        response, body = get(conn, '/missing')
+        assert response.status == 404
+        conn.close()
+    finally:
+        server.shutdown()
+
+
+def test_lazy_content():
+    calls = []
+
+    def make_content():
+        calls.append(1)
+        return CONTENT
+
+    server = start_server()
+    try:
+        server.add('/lazy', make_content)
+        assert calls == []
+        conn = client.HTTPConnection(server.ip, server.port)
+        for i in range(2):
+            response, body = get(conn, '/lazy')
+            assert body == CONTENT.encode('utf-8')
+        assert calls == [1]
+        conn.close()
+    finally:
+        server.shutdown()
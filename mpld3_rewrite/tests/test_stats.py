@@ -0,0 +1,106 @@
+"""
+Tests of export_stats()
+"""
+import io
+import json
+import time
+import threading
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import export_stats, fig_to_dict, fig_to_html, save_json
+from .._stats import timed
+
+
+X = np.linspace(0, 10, 100)
+
+
+def make_figure():
+    fig, ax = plt.subplots()
+    ax.plot(X, np.sin(X))
+    ax.plot(X, np.cos(X), 'o')
+    ax.scatter(X[:10], X[:10])
+    return fig
+
+
+def test_figure_sizes():
+    fig = make_figure()
+    for data_format in ["rows", "columns", "base64"]:
+        with export_stats() as stats:
+            figure_json = fig_to_dict(fig, data_format=data_format)
+        assert len(stats.figures) == 1
+        record = stats.figures[0]
+        assert record['id'] == figure_json['id']
+        assert record['bytes'] == len(json.dumps(figure_json))
+        assert record['data_bytes'] == len(json.dumps(figure_json['data']))
+        for label, dataset in figure_json['data'].items():
+            assert (record['datasets'][label]['bytes']
+                    == len(json.dumps(dataset)))
+
+    # the line and the markers share their x column
+    assert record['dedup_hits'] == 1
+    assert record['dedup_columns'] == 1
+
+    elements = record['axes'][0]['elements']
+    assert [el['type'] for el in elements] == ["lines", "markers",
+                                               "collections"]
+    assert [el['vertices'] for el in elements][:2] == [100, 100]
+    plt.close(fig)
+
+
+def test_timings():
+    fig = make_figure()
+    with export_stats() as stats:
+        fig_to_html(fig)
+        save_json(fig, io.StringIO())
+    for stage in ["crawl", "add_data", "encode_data", "json", "template"]:
+        assert stats.timings[stage] >= 0
+        assert stats.calls[stage] >= 1
+    assert stats.calls["crawl"] == 2
+    assert len(stats.figures) == 2
+
+    # the record and the summary are plain data
+    record = json.loads(json.dumps(stats.as_dict()))
+    assert record['calls'] == stats.calls
+    assert "figure {0}".format(record['figures'][0]['id']) in stats.summary()
+    plt.close(fig)
+
+
+def test_nested_blocks():
+    fig = make_figure()
+    with export_stats() as outer:
+        fig_to_dict(fig)
+        with export_stats() as inner:
+            fig_to_dict(fig)
+    fig_to_dict(fig)
+    plt.close(fig)
+    assert len(outer.figures) == 1
+    assert len(inner.figures) == 1
+    assert outer.calls["crawl"] == inner.calls["crawl"] == 1
+
+
+def test_timed_threads():
+    # a stage entered by another thread outside of any export_stats()
+    # block, and left while this thread times the stage within one
+    stage = timed("stage")
+    entered = threading.Event()
+    finish = threading.Event()
+
+    def run():
+        with stage:
+            entered.set()
+            finish.wait(10)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    entered.wait(10)
+    with export_stats() as stats:
+        with stage:
+            finish.set()
+            thread.join()
+            time.sleep(0.2)
+    assert stats.calls["stage"] == 1
+    assert stats.timings["stage"] >= 0.2
@@ -0,0 +1,190 @@
+"""
+Tests of update(), which pushes the changes of a shown figure to the browser
+"""
+import json
+import threading
+import time
+import webbrowser
+
+try:
+    # Python 2.x
+    import httplib as client
+except ImportError:
+    # Python 3.x
+    from http import client
+
+import pytest
+import numpy as np
+from numpy.testing import assert_equal
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict, show, update
+from .._display import _figure_patch
+from ..mpld3renderer import decode_data
+from .._server import get_figure_server
+
+
+X = np.linspace(0, 10, 20)
+
+
+def make_figure():
+    fig, ax = plt.subplots()
+    ax.plot(X, np.sin(X))
+    ax.plot(X, np.cos(X), 'o')
+    return fig
+
+
+def show_figure(fig, **kwargs):
+    """Show a figure without opening a browser, and return its id"""
+    open_browser = webbrowser.open
+    webbrowser.open = lambda url: None
+    try:
+        url = show(fig, port=18900, block=False, **kwargs)
+        # wait for the thread which opens the browser
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and not thread.daemon:
+                thread.join()
+    finally:
+        webbrowser.open = open_browser
+    return url.rsplit('/fig', 1)[1]
+
+
+class EventClient(object):
+    """Read the server-sent events of a shown figure"""
+    def __init__(self, figid):
+        server = get_figure_server()
+        self.conn = client.HTTPConnection(server.ip, server.port, timeout=10)
+        self.conn.request("GET", server.events_path(figid))
+        self.response = self.conn.getresponse()
+        assert self.response.getheader("Content-Type") == "text/event-stream"
+
+        # wait until the server has subscribed to the stream
+        events = server.Handler.routes[server.events_path(figid)]
+        for i in range(100):
+            if events.clients:
+                break
+            time.sleep(0.01)
+
+    def read(self):
+        """Return the (event, data) of the next message"""
+        event = None
+        data = []
+        while True:
+            line = self.response.fp.readline().decode('utf-8').rstrip("\n")
+            if not line:
+                return event, "\n".join(data)
+            key, _, value = line.partition(": ")
+            if key == "event":
+                event = value
+            elif key == "data":
+                data.append(value)
+
+    def close(self):
+        self.conn.close()
+
+
+def strict_loads(text):
+    """Parse JSON as JSON.parse does, without NaN or Infinity"""
+    def reject(constant):
+        raise ValueError("{0} is not valid JSON".format(constant))
+    return json.loads(text, parse_constant=reject)
+
+
+def get_json(figid):
+    server = get_figure_server()
+    conn = client.HTTPConnection(server.ip, server.port)
+    conn.request("GET", server.json_path(figid))
+    figure_json = strict_loads(conn.getresponse().read().decode('utf-8'))
+    conn.close()
+    return figure_json
+
+
+def test_figure_patch():
+    fig = make_figure()
+    old = fig_to_dict(fig)
+    assert _figure_patch(old, fig_to_dict(fig)) is None
+
+    # changed data is sent alone
+    line = fig.axes[0].lines[0]
+    line.set_ydata(np.sin(2 * X))
+    new = fig_to_dict(fig)
+    patch = _figure_patch(old, new)
+    label = new['axes'][0]['lines'][0]['data']
+    assert patch == {"data": {label: new['data'][label]}}
+
+    # so are changed styles and limits
+    line.set_color('red')
+    fig.axes[0].set_xlim(2, 5)
+    new = fig_to_dict(fig)
+    patch = _figure_patch(old, new)
+    assert sorted(patch) == ["axes", "data", "elements"]
+    ax = new['axes'][0]
+    assert patch['elements'] == {ax['lines'][0]['id']: ax['lines'][0]}
+    assert patch['axes'][ax['id']]['xlim'] == ax['xlim']
+
+    # new elements replace the figure
+    fig.axes[0].plot(X, X)
+    new = fig_to_dict(fig)
+    assert _figure_patch(old, new) == {"replace": new}
+    plt.close(fig)
+
+
+def test_update_events():
+    fig = make_figure()
+    figid = show_figure(fig)
+    events = EventClient(figid)
+    try:
+        assert update(fig) is None
+
+        fig.axes[0].lines[0].set_ydata(np.sin(2 * X))
+        patch = update(fig)
+        assert list(patch) == ["data"]
+        event, data = events.read()
+        assert event is None
+        assert json.loads(data) == json.loads(json.dumps(patch))
+
+        # pages loaded from now on get the updated figure
+        assert get_json(figid) == json.loads(json.dumps(fig_to_dict(fig)))
+
+        # NaN values are sent as null
+        y = np.sin(3 * X)
+        y[5] = np.nan
+        fig.axes[0].lines[0].set_ydata(y)
+        patch = update(fig)
+        event, data = events.read()
+        label, dataset = list(strict_loads(data)['data'].items())[0]
+        for col, ref in zip(decode_data(dataset),
+                            decode_data(patch['data'][label])):
+            assert_equal(col, ref)
+    finally:
+        events.close()
+        plt.close(fig)
+
+
+def test_show_nan():
+    x = np.linspace(0, 10, 1000)
+    y = np.sin(x)
+    y[500] = np.nan
+    fig, ax = plt.subplots()
+    ax.plot(x, y)
+    ax.plot(x, np.where(x > 5, np.inf, y), 'o')
+
+    # decimation adds NaN rows at the gaps
+    for kwargs in [{}, {"max_points_per_line": 100},
+                   {"data_format": "columns"}]:
+        figure_json = get_json(show_figure(fig, **kwargs))
+        line, = figure_json['axes'][0]['lines']
+        columns = decode_data(figure_json['data'][line['data']])
+        assert np.sum(np.isnan(columns[line['yindex']])) == 1
+    plt.close(fig)
+
+
+def test_update_not_shown():
+    fig = make_figure()
+    try:
+        with pytest.raises(ValueError):
+            update(fig)
+    finally:
+        plt.close(fig)
@@ -0,0 +1,45 @@
+"""
+Tests of the xsorted flag of lines, which lets mpld3.js draw only the part
+of a line in view
+"""
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from .. import fig_to_dict
+from ..mpld3renderer import is_xsorted
+
+
+def test_is_xsorted():
+    x = np.arange(10.0)
+    assert is_xsorted(np.column_stack([x, x ** 2]))
+    assert is_xsorted(np.column_stack([np.zeros(10), x]))
+    assert not is_xsorted(np.column_stack([x[::-1], x]))
+    assert not is_xsorted(np.zeros((1, 2)))
+
+    # NaN values in y do not matter, but in x they break the ordering
+    y = x.copy()
+    y[3] = np.nan
+    assert is_xsorted(np.column_stack([x, y]))
+    assert not is_xsorted(np.column_stack([y, x]))
+
+
+def test_xsorted_lines():
+    x = np.linspace(0, 10, 1000)
+    fig, ax = plt.subplots()
+    ax.plot(x, np.sin(x))
+    ax.plot(x[::-1], np.sin(x))
+    ax.plot(np.sin(x), x)
+    ax.plot(x, np.cos(x), transform=ax.transAxes)
+    figure_json = fig_to_dict(fig)
+    decimated = fig_to_dict(fig, max_points_per_line=100)
+    plt.close(fig)
+
+    flags = [line.get('xsorted', False)
+             for line in figure_json['axes'][0]['lines']]
+    assert flags == [True, False, False, False]
+
+    line = decimated['axes'][0]['lines'][0]
+    assert 'decimation' in line
+    assert line['xsorted']
@@ -1,19 +1,68 @@
 import os
 import warnings
 from functools import wraps
+from contextlib import contextmanager
 
 # Make sure that DeprecationWarning get printed
 warnings.simplefilter("always", DeprecationWarning)
 
 
+# The lists of elements in the axes of the figure JSON
+ELEMENT_LISTS = ("lines", "paths", "markers", "texts", "collections",
+                 "images")
+
+
+# Stack of the scopes of id_scope(): dicts with the "prefix", the "count"
+# of ids assigned, and the "ids" assigned, by id(obj)
+_ID_SCOPES = []
+
+
 def get_id(obj, suffix=None):
-    """Get a unique id for the object"""
-    objid = str(os.getpid()) + str(id(obj))
+    """Get a unique id for the object
+
+    The id is stored on the object the first time it is requested, so that
+    it stays the same if the object is pickled and sent to another process.
+    Ids assigned within an id_scope() are only kept by the scope: they are
+    not stored on the object, and do not leak into later exports.
+    """
+    objid = getattr(obj, '_mpld3_id', None)
+    if objid is None and _ID_SCOPES:
+        scope = _ID_SCOPES[-1]
+        if id(obj) in scope["ids"]:
+            objid = scope["ids"][id(obj)][1]
+        else:
+            objid = scope["prefix"] + str(scope["count"])
+            scope["count"] += 1
+            # keep a reference to obj, so that its id() is not reused
+            scope["ids"][id(obj)] = (obj, objid)
+    elif objid is None:
+        objid = str(os.getpid()) + str(id(obj))
+        try:
+            obj._mpld3_id = objid
+        except (AttributeError, TypeError):
+            pass
     if suffix:
         objid += str(suffix)
     return objid
 
 
+@contextmanager
+def id_scope(prefix):
+    """Context manager in which new ids are numbered sequentially
+
+    Within the scope, objects which do not have an id yet get the id
+    ``prefix + str(n)``, with n counting up from zero.  This makes ids
+    unique across processes (given distinct prefixes), and reproducible when
+    the objects are created in the same order.  Objects keep the ids they
+    had before the scope, and get a new id when exported outside of it.
+    """
+    _ID_SCOPES.append({"prefix": prefix, "count": 0, "ids": {}})
+    try:
+        yield
+    finally:
+        _ID_SCOPES.pop()
+
+
 def deprecated(func, old_name, new_name):
     """Decorator to mark functions as deprecated."""
     @wraps(func)
@@ -8,11 +8,11 @@ import os
 import glob
 import sys
 import mpld3_rewrite as mpld3
-from mpld3_rewrite import fig_to_html
+from mpld3_rewrite import export_many
 
 import matplotlib
 matplotlib.use('Agg') #don't display plots
-import pylab as plt
+import matplotlib.pyplot as plt
 plt.rcParams['figure.figsize'] = (6, 4.5)
 plt.rcParams['savefig.dpi'] = 80
 
@@ -50,9 +50,40 @@ TEMPLATE = """
 """
 
 
+class FigureFactory(object):
+    """Build the figure of a test plot, and save it as a png
+
+    Instances are passed to export_many, so that each figure is built (and
+    closed) in a worker process.  If the plot raises an exception, a figure
+    showing the error is returned instead.
+
+    Parameters
+    ----------
+    main : callable
+        the main() function of the test plot module, returning a figure
+    figfile : string
+        the png file to save the figure to
+    """
+    def __init__(self, main, figfile):
+        self.main = main
+        self.figfile = figfile
+
+    def __call__(self):
+        try:
+            fig = self.main()
+        except Exception as e:
+            message = "{0}: {1}".format(e.__class__.__name__, e)
+            print("Exception raised in {0}\n {1}".format(self.main.__module__,
+                                                          message))
+            fig = plt.figure()
+            fig.text(0.5, 0.5, message, ha='center', va='center')
+        fig.savefig(self.figfile)
+        return fig
+
+
 def combine_testplots(wildcard='test_plots/*.py',
                       outfile='test_plots.html',
-                      d3_url=None, mpld3_url=None):
+                      d3_url=None, mpld3_url=None, workers=None):
     """Generate figures from the plots and save to an HTML file
 
     Parameters
@@ -67,13 +98,16 @@ def combine_testplots(wildcard='test_plots/*.py',
     mpld3_url : string
         the URL of the mpld3 library to use.  If not specified, a standard web
         address will be used.
+    workers : int
+        the number of processes used to build the figures and convert them
+        to HTML.  If not specified, the number of CPUs is used.
     """
     if isinstance(wildcard, str):
         filenames = glob.glob(wildcard)
     else:
         filenames = sum([glob.glob(w) for w in wildcard], [])
 
-    fig_html = []
+    factories = []
     fig_png = []
     for filename in filenames:
         dirname, fname = os.path.split(filename)
@@ -84,32 +118,23 @@ def combine_testplots(wildcard='test_plots/*.py',
         try:
             f = __import__(modulename)
         except Exception as e:
-            print "!!!  Exception raised in {0}".format(filename)
-            print "!!!   {0}: {1}".format(e.__class__.__name__,
-                                          e.message)
+            print("!!!  Exception raised in {0}".format(filename))
+            print("!!!   {0}: {1}".format(e.__class__.__name__, e))
             continue
 
         if hasattr(f, 'main'):
             print("running {0}".format(filename))
-
-            try:
-                fig = f.main()
-            except Exception as e:
-                print "Exception raised in {0}".format(filename)
-                print " {0}: {1}".format(e.__class__.__name__,
-                                         e.message)
-                fig = None
-
-            if fig is not None:
-                fig_html.append("\n<div class='fig'>\n{0}\n</div>"
-                                "\n".format(fig_to_html(fig, d3_url=d3_url,
-                                                        mpld3_url=mpld3_url)))
-
-                figfile = os.path.splitext(filename)[0] + '.png'
-                fig.savefig(figfile)
-                fig_png.append("\n<div class='fig'><img src={0}>"
-                                 "</div>\n".format(figfile))
-                plt.close(fig)
+            figfile = os.path.splitext(filename)[0] + '.png'
+            factories.append(FigureFactory(f.main, figfile))
+            fig_png.append("\n<div class='fig'><img src={0}>"
+                           "</div>\n".format(figfile))
+
+    # the figures are built, saved as png, converted and closed by the
+    # workers, so that they are never all open at once
+    fig_html = ["\n<div class='fig'>\n{0}\n</div>\n".format(html)
+                for html in export_many(factories, workers=workers,
+                                        output="html", d3_url=d3_url,
+                                        mpld3_url=mpld3_url)]
 
     print("writing results to {0}".format(outfile))
     with open(outfile, 'w') as f:
@@ -132,6 +157,9 @@ def run_main():
                         help="output filename",
                         type=str, default='test_plots.html')
     parser.add_argument("-l", "--local", action="store_true")
+    parser.add_argument("-j", "--workers",
+                        help="number of processes used for the conversion",
+                        type=int, default=None)
     args = parser.parse_args()
 
     if len(args.files) == 0:
@@ -146,7 +174,8 @@ def run_main():
     combine_testplots(wildcard=wildcard,
                       outfile=args.output,
                       d3_url=args.d3_url,
-                      mpld3_url=args.mpld3_url)
+                      mpld3_url=args.mpld3_url,
+                      workers=args.workers)
     return args.output
     
 